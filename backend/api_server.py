@@ -1,11 +1,40 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+from typing import Optional
 import uvicorn
-from statement_parser import StatementParser
+from starlette.concurrency import run_in_threadpool
+from starlette.formparsers import MultiPartParser
+from statement_parser import StatementParser, analysis_json, parse_upload, stream_upload
+from parsers.jobs import DONE, FAILED, get_job_store
+from parsers.parse_pool import PoolSaturated, get_parse_pool, shutdown_parse_pool
+from parsers.serialize import dumps
+from parsers.uploads import (DEFAULT_SPOOL_BYTES, SharedUpload, UploadSizeLimit, UploadTooLarge,
+                             check_page_count, release_buffer, upload_buffer)
 import io
+import os
+import json
 
-app = FastAPI()
+# Page workers one request may ask for. Its parse fans out to them from inside its own pool
+# slot (or job worker process), so each admitted request may use up to this many cores.
+MAX_REQUEST_WORKERS = int(os.environ.get('STATEMENT_MAX_REQUEST_WORKERS', '4'))
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    # Stop the parse pool's worker processes with the server
+    shutdown_parse_pool()
+
+app = FastAPI(lifespan=lifespan)
+
+# Uploads stay in memory up to STATEMENT_UPLOAD_SPOOL_BYTES, then spill to a temporary file
+# (spool_max_size in current Starlette, max_file_size in older releases)
+MultiPartParser.spool_max_size = MultiPartParser.max_file_size = DEFAULT_SPOOL_BYTES
+
+# Refuse bodies over STATEMENT_MAX_UPLOAD_BYTES before they are spooled; added first so CORS wraps its 413s
+app.add_middleware(UploadSizeLimit)
 
 # Enable CORS with simpler configuration
 app.add_middleware(
@@ -28,46 +57,108 @@ class FileObject:
     def read(self, *args):
         return self._content
 
+    def getbuffer(self):
+        # Parsers read the spooled upload in place through this
+        return self._content
+
+def request_workers(workers):
+    """The page workers a request asked for, 1 when it did not ask; a 400 outside 1..MAX_REQUEST_WORKERS."""
+    if workers is None:
+        return 1
+    if not 1 <= workers <= MAX_REQUEST_WORKERS:
+        raise HTTPException(status_code=400, detail=f"workers must be between 1 and {MAX_REQUEST_WORKERS}")
+    return workers
+
+def open_upload(file, content, engine=None, workers=None, password=None):
+    """A StatementParser over an upload, opened so that bad files are rejected before any parsing.
+
+    Unsupported files, unknown engines, corrupt PDFs, missing or wrong
+    passwords are a 400; statements over the page limit a 413. Opening
+    blocks, so async endpoints call this through run_in_threadpool.
+    """
+    parser = None
+    try:
+        parser = StatementParser(FileObject(file.filename, content), engine=engine, workers=workers,
+                                 password=password)
+        # Decrypt in memory up front so a missing or wrong password is a 400, not a streamed error
+        check_page_count(parser.open())
+        return parser
+    except Exception as e:
+        if parser is not None:
+            parser.close()
+        if isinstance(e, ValueError):
+            raise HTTPException(status_code=e.status if isinstance(e, UploadTooLarge) else 400, detail=str(e))
+        raise
+
+async def stream_analysis(pages, shared=None):
+    """Relay the NDJSON a pool worker emits (see stream_upload): transactions page by page, then a summary.
+
+    A parse error ends the stream with an error record. `shared` is the
+    worker's SharedUpload, released when the stream ends.
+    """
+    try:
+        async for page in pages:
+            yield page
+    except Exception as e:
+        yield dumps({"type": "error", "error": f"Error processing file: {str(e)}"}) + "\n"
+    finally:
+        if shared is not None:
+            shared.release()
+
 @app.post("/analyze")
 async def analyze_statement(
     file: UploadFile = File(...),
-    platform: str = Form(...)
+    platform: str = Form(...),
+    engine: Optional[str] = Form(None),
+    workers: Optional[int] = Form(None),
+    stream: bool = Form(False),
+    password: Optional[str] = Form(None)
 ):
     try:
         if not file:
             raise HTTPException(status_code=400, detail="No file provided")
 
-        # Read the file content
-        content = await file.read()
-        
-        # Create a proper file-like object
-        file_obj = FileObject(file.filename, content)
-        
+        workers = request_workers(workers)
+
+        # The spooled upload, read in place rather than into memory
+        content = upload_buffer(file.file)
         try:
-            # Parse the statement
-            parser = StatementParser(file_obj)
-            df = parser.parse()
-            
-            # Convert to dictionary format
-            transactions = df.to_dict('records')
-            
-            # Calculate summary statistics
-            total_spent = sum(t['amount'] for t in transactions if t['amount'] < 0)
-            total_received = sum(t['amount'] for t in transactions if t['amount'] > 0)
-            
-            # Calculate category breakdown
-            category_breakdown = {}
-            for t in transactions:
-                if t['amount'] < 0:  # Only consider spending
-                    category = t['category']
-                    category_breakdown[category] = category_breakdown.get(category, 0) + t['amount']
-            
-            return {
-                "transactions": transactions,
-                "totalSpent": total_spent,
-                "totalReceived": total_received,
-                "categoryBreakdown": category_breakdown
-            }
+            parser = await run_in_threadpool(open_upload, file, content, engine, workers, password)
+        except Exception:
+            release_buffer(content)
+            raise
+
+        pool = get_parse_pool()
+        shared = None
+        try:
+            parser.close()
+            # One copy of the upload, into shared memory the pool worker parses in place; pickling
+            # the bytes would copy them into the pipe and again into the worker
+            try:
+                shared = SharedUpload(content)
+            finally:
+                release_buffer(content)
+            if stream:
+                # Parsed in a pool worker too, which sends back each page's records as it goes
+                pages = await pool.stream(stream_upload, shared, file.filename, engine, workers, password)
+                streamed, shared = shared, None
+                # The background task only matters if the stream never starts; releasing twice is a no-op
+                return StreamingResponse(stream_analysis(pages, streamed), media_type="application/x-ndjson",
+                                         background=BackgroundTask(streamed.release))
+            # Parse in the bounded process pool, so the event loop keeps serving other requests
+            batch, report = await pool.run(parse_upload, shared, file.filename, engine, workers, password)
+        except PoolSaturated as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
+        finally:
+            if shared is not None:
+                shared.release()
+
+        try:
+            return Response(content=analysis_json(batch, report), media_type="application/json")
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
             
@@ -76,11 +167,65 @@ async def analyze_statement(
             raise e
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/jobs", status_code=202)
+async def submit_job(
+    file: UploadFile = File(...),
+    platform: str = Form(...),
+    engine: Optional[str] = Form(None),
+    workers: Optional[int] = Form(None),
+    password: Optional[str] = Form(None)
+):
+    """Queue a statement for the job workers; poll /jobs/{id} for progress"""
+    workers = request_workers(workers)
+    content = upload_buffer(file.file)
+    try:
+        # Unsupported files, unknown engines, wrong passwords and page limits are checked now, not by a worker
+        parser = await run_in_threadpool(open_upload, file, content, engine, workers, password)
+        parser.close()
+        # Stored straight from the spooled upload; a password is stored sealed, or refused without a secret
+        job_id = await run_in_threadpool(get_job_store().submit, file.filename, content, password,
+                                         {"platform": platform, "engine": engine, "workers": workers})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        release_buffer(content)
+    return JSONResponse(
+        status_code=202,
+        content={"id": job_id, "status": "queued", "statusUrl": f"/jobs/{job_id}", "resultUrl": f"/jobs/{job_id}/result"},
+        headers={"Location": f"/jobs/{job_id}"}
+    )
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    """Status, page progress and partial summary of a job"""
+    status = get_job_store().status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return status
+
+@app.get("/jobs/{job_id}/result")
+def job_result(job_id: str):
+    """The /analyze response of a finished job; 202 while it is queued or running"""
+    job = get_job_store().result(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] == DONE:
+        return Response(content=job["result"], media_type="application/json")
+    if job["status"] == FAILED:
+        raise HTTPException(status_code=job["error_status"] or 500, detail=job["error"])
+    return JSONResponse(status_code=202, content={"id": job_id, "status": job["status"]}, headers={"Retry-After": "1"})
+
+@app.get("/metrics/parse-pool")
+async def parse_pool_metrics():
+    """Size, load and job totals of the parse pool"""
+    return get_parse_pool().stats()
+
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
     return JSONResponse(
         status_code=exc.status_code,
-        content={"error": exc.detail}
+        content={"error": exc.detail},
+        headers=exc.headers
     )
 
 if __name__ == "__main__":
@@ -0,0 +1,82 @@
+"""Pin worst-case per-page matching latency on adversarial page texts.
+
+Each page below is built to defeat the standard (backtracking) patterns:
+dates with no trailing amount, long runs of whitespace between a date and
+a near-miss amount, and one very long line. Every pattern set is timed on
+every page in both regex modes with the match budget disabled. The run
+fails if the slowest safe-mode page takes longer than --max-seconds.
+
+    python backend/benchmarks/bench_adversarial_patterns.py [--lines N] [--max-seconds S] [--skip-standard]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND))
+
+from parsers.patterns import (KOTAK_LINE_PATTERNS, KOTAK_TEXT_PATTERNS, STATEMENT_PATTERNS, WALLET_LINE_PATTERNS,
+                              MatchBudget, re2)
+
+# (name, pattern set, matched per line?)
+PATTERN_SETS = (
+    ('statement', STATEMENT_PATTERNS, False),
+    ('kotak_text', KOTAK_TEXT_PATTERNS, False),
+    ('kotak_line', KOTAK_LINE_PATTERNS, True),
+    ('wallet_line', WALLET_LINE_PATTERNS, True),
+)
+
+
+def adversarial_pages(lines: int):
+    """Page texts of roughly `lines` lines that match nothing, or almost nothing."""
+    narration = 'UPI PAYMENT TO MERCHANT ' * 3
+    return {
+        # Dates with descriptions but no amount anywhere on the page
+        'dates_no_amount': '\n'.join(f'Nov {day % 28 + 1:02d}, 2024 {narration}DEBIT' for day in range(lines)),
+        'dmy_no_amount': '\n'.join(f'{day % 28 + 1:02d} Nov 2024 {narration}' for day in range(lines)),
+        # Kotak rows whose amount lacks its (Dr)/(Cr) marker, padded with whitespace
+        'kotak_no_marker': '\n'.join(f'{day % 28 + 1:02d}-01-2024 {narration}' + ' ' * 40 + f'REF{day} 1,234.56 9,999.99X'
+                                     for day in range(lines)),
+        # The whole page on one line
+        'single_line': ' '.join(f'{day % 28 + 1:02d}-01-2024 {narration} REF{day}' for day in range(lines)),
+    }
+
+
+def time_page(pattern_set, text, per_line):
+    budget = MatchBudget(0)
+    started = time.perf_counter()
+    if per_line:
+        for line in text.splitlines():
+            pattern_set.match(line, budget)
+    else:
+        pattern_set.findall(text, budget)
+    return time.perf_counter() - started
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--lines', type=int, default=60, help='lines per adversarial page')
+    arg_parser.add_argument('--max-seconds', type=float, default=0.05, help='worst safe-mode page allowed')
+    arg_parser.add_argument('--skip-standard', action='store_true', help='time the safe mode only')
+    args = arg_parser.parse_args()
+
+    pages = adversarial_pages(args.lines)
+    modes = ('safe',) if args.skip_standard else ('safe', 'standard')
+    print(f"safe backend: {'re2' if re2 is not None else 're'}")
+    print(f"{'patterns':12} {'page':16} {'chars':>7} " + ' '.join(f'{mode:>10}' for mode in modes))
+
+    worst = 0.0
+    for set_name, pattern_set, per_line in PATTERN_SETS:
+        for page_name, text in pages.items():
+            timings = [time_page(pattern_set.with_mode(mode), text, per_line) for mode in modes]
+            worst = max(worst, timings[0])
+            print(f"{set_name:12} {page_name:16} {len(text):>7} " + ' '.join(f'{t:>10.4f}' for t in timings))
+
+    print(f"worst safe-mode page: {worst:.4f}s (limit {args.max_seconds:.4f}s)")
+    if worst > args.max_seconds:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
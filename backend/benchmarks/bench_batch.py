@@ -0,0 +1,119 @@
+"""Compare per-row transaction dicts with a columnar TransactionBatch.
+
+Builds the same synthetic transactions as a list of dicts (what page
+functions returned before) and as a TransactionBatch, measures the memory
+each holds with tracemalloc, then times the Kotak summary and chart
+aggregation over both and checks they agree.
+
+    python backend/benchmarks/bench_batch.py [--rows N] [--seed S]
+"""
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND))
+
+from benchmarks.sample import NARRATIONS
+from parsers.batch import TransactionBuilder
+from parsers.kotak_parser import build_chart_data, calculate_summary
+from parsers.summary import summarize
+
+CATEGORIES = ['food', 'shopping', 'travel', 'bills', 'transfer', 'Others']
+
+
+def make_rows(rows, seed):
+    rng = random.Random(seed)
+    result = []
+    for _ in range(rows):
+        amount = round(rng.uniform(10, 20000), 2) * (-1 if rng.random() < 0.7 else 1)
+        result.append((datetime(2024, rng.randint(1, 12), rng.randint(1, 28)),
+                       f"{rng.choice(NARRATIONS)} REF{rng.randint(1000, 9999)}", amount,
+                       round(rng.uniform(0, 500000), 2), rng.choice(CATEGORIES)))
+    return result
+
+
+def as_dicts(rows):
+    return [{
+        'date': date.strftime('%Y-%m-%d'),
+        'description': description,
+        'amount': amount,
+        'balance': balance,
+        'type': 'credit' if amount >= 0 else 'debit',
+        'category': category
+    } for date, description, amount, balance, category in rows]
+
+
+def as_batch(rows):
+    builder = TransactionBuilder()
+    for date, description, amount, balance, category in rows:
+        builder.append(date.strftime('%Y-%m-%d'), amount, description, category, balance=balance)
+    return builder.build([row[0] for row in rows])
+
+
+def held_bytes(build):
+    """Bytes still allocated once `build` returns, with its result alive."""
+    tracemalloc.start()
+    result = build()
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return held, result
+
+
+def dict_aggregates(transactions):
+    """calculate_summary and build_chart_data as they were over dict rows."""
+    total_credit = sum(t['amount'] for t in transactions if t['amount'] > 0)
+    total_debit = sum(t['amount'] for t in transactions if t['amount'] < 0)
+    category_totals = defaultdict(float)
+    for txn in transactions:
+        category_totals[txn['category']] += abs(txn['amount'])
+    return total_credit, total_debit, dict(category_totals)
+
+
+def batch_aggregates(batch):
+    statistics = summarize(batch)
+    summary = calculate_summary(statistics)
+    chart = build_chart_data(statistics)['data']
+    return (summary['total_credit'], -summary['total_debit'],
+            dict(zip(chart['labels'], chart['datasets'][0]['data'])))
+
+
+def best_of(repeat, fn):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--rows', type=int, default=50000)
+    arg_parser.add_argument('--seed', type=int, default=1)
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    args = arg_parser.parse_args()
+
+    rows = make_rows(args.rows, args.seed)
+    dict_bytes, transactions = held_bytes(lambda: as_dicts(rows))
+    batch_bytes, batch = held_bytes(lambda: as_batch(rows))
+    print(f"{args.rows} rows: dicts hold {dict_bytes / 2 ** 20:.1f} MiB ({dict_bytes / args.rows:.0f} B/row), "
+          f"batch {batch_bytes / 2 ** 20:.1f} MiB ({batch_bytes / args.rows:.0f} B/row, "
+          f"{batch_bytes / dict_bytes:.0%})")
+
+    dict_seconds, expected = best_of(args.repeat, lambda: dict_aggregates(transactions))
+    batch_seconds, found = best_of(args.repeat, lambda: batch_aggregates(batch))
+    if abs(expected[0] - found[0]) > 1e-6 or abs(expected[1] - found[1]) > 1e-6 or expected[2] != found[2]:
+        sys.exit("batch and dict aggregates disagree")
+    print(f"summary + chart: dicts {dict_seconds:.4f}s, batch {batch_seconds:.4f}s "
+          f"({dict_seconds / batch_seconds:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""Compare keyword categorization by per-category substring loops and by automaton.
+
+For each taxonomy in the shared index, categorizes the same synthetic
+descriptions with the old loop (`any(keyword in description ...)` per
+category, first category wins), with the automaton compiled in the
+process, with the index's automaton, and with the index behind a cold
+merchant cache; checks all give the same categories, and prints timings
+and the cache hit rate. Also counts how many descriptions change category
+when word boundaries are on, and compares building each automaton in the
+process with mapping the index: time and Python heap allocated.
+
+    python backend/benchmarks/bench_categorization.py [--rows N] [--seed S] [--repeat-share F]
+"""
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND))
+
+from benchmarks.sample import NARRATIONS
+from parsers.categorizer import Categorizer, ahocorasick
+from parsers.merchants import CategoryCache
+from parsers.taxonomy import TaxonomyIndex, load_taxonomies, open_index
+
+FILLER = ['payment', 'to', 'from', 'ref', 'txn', 'mumbai', 'bandra', 'maximum', 'rexine', 'landmark',
+          'store', 'india', 'pvt', 'ltd', 'online', 'services', 'upi', 'neft', 'imps', 'a/c']
+
+
+def loop_categorize(taxonomy, default, description):
+    """The categorizers' previous implementation."""
+    description = description.lower()
+    for category, keywords in taxonomy:
+        if any(keyword in description for keyword in keywords):
+            return category
+    return default
+
+
+def make_merchant(rng, keywords):
+    words = rng.sample(FILLER, 3)
+    if keywords and rng.random() < 0.7:
+        words.insert(rng.randint(0, len(words)), rng.choice(keywords).upper())
+    return ' '.join(words)
+
+
+def make_descriptions(taxonomy, rows, seed, repeat_share):
+    """UPI narrations with a fresh reference each; `repeat_share` of rows pay one of a few regular merchants."""
+    rng = random.Random(seed)
+    keywords = [keyword for _category, keywords in taxonomy for keyword in keywords]
+    regulars = [narration.split('/')[-1] for narration in NARRATIONS] + [make_merchant(rng, keywords) for _ in range(100)]
+    descriptions = []
+    for _ in range(rows):
+        merchant = rng.choice(regulars) if rng.random() < repeat_share else make_merchant(rng, keywords)
+        descriptions.append(f"UPI/{rng.randint(10 ** 11, 10 ** 12)}/{merchant.split()[0].lower()}@ybl/{merchant}")
+    return descriptions
+
+
+def best_of(repeat, fn):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--rows', type=int, default=10000)
+    arg_parser.add_argument('--seed', type=int, default=1)
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    arg_parser.add_argument('--repeat-share', type=float, default=0.7, help='share of rows paying a regular merchant')
+    args = arg_parser.parse_args()
+
+    taxonomies = load_taxonomies()
+    index_path = open_index().path
+
+    print(f"in-process automaton: {'pyahocorasick' if ahocorasick is not None else 'pure Python'}")
+    print(f"{'taxonomy':16} {'keywords':>8} {'loops':>8} {'in-process':>10} {'index':>8} {'cached':>8} "
+          f"{'hit rate':>8} {'boundary changes':>17}")
+    for name, (default, taxonomy) in taxonomies.items():
+        descriptions = make_descriptions(taxonomy, args.rows, args.seed, args.repeat_share)
+        in_process = Categorizer(taxonomy, default=default, word_boundary=False, cache=None)
+        categorizer = Categorizer(name, word_boundary=False, cache=None)
+        bounded = Categorizer(name, word_boundary=True, cache=None)
+        in_process_bounded = Categorizer(taxonomy, default=default, word_boundary=True, cache=None)
+
+        def cached_run():
+            # A cold cache per run, as for one uploaded statement
+            categorizer.cache = CategoryCache()
+            return categorizer.categorize_many(descriptions)
+
+        loop_seconds, expected = best_of(args.repeat, lambda: [loop_categorize(taxonomy, default, d) for d in descriptions])
+        in_process_seconds, in_process_found = best_of(args.repeat, lambda: in_process.categorize_many(descriptions))
+        index_seconds, found = best_of(args.repeat, lambda: categorizer.categorize_many(descriptions))
+        cached_seconds, cached = best_of(args.repeat, cached_run)
+        hit_rate = categorizer.cache.stats()['hitRate']
+        categorizer.cache = None
+        if not expected == in_process_found == found == cached:
+            sys.exit(f"{name}: automata and loops disagree")
+        bounded_found = bounded.categorize_many(descriptions)
+        if bounded_found != in_process_bounded.categorize_many(descriptions):
+            sys.exit(f"{name}: word-boundary automata disagree")
+        changed = sum(a != b for a, b in zip(found, bounded_found))
+        print(f"{name:16} {categorizer.automaton.size:>8} {loop_seconds:>8.3f} {in_process_seconds:>10.3f} "
+              f"{index_seconds:>8.3f} {cached_seconds:>8.3f} {hit_rate:>8.2%} {changed:>17}")
+
+    # What each worker pays to get every automaton: compiling them all, or mapping the index
+    tracemalloc.start()
+    started = time.perf_counter()
+    compiled = [Categorizer(taxonomy, default=default, cache=None).automaton
+                for default, taxonomy in taxonomies.values()]
+    compile_seconds = time.perf_counter() - started
+    compile_bytes = tracemalloc.get_traced_memory()[0]
+    del compiled
+    tracemalloc.stop()
+    tracemalloc.start()
+    started = time.perf_counter()
+    index = TaxonomyIndex(index_path)
+    mapped = [index.tables(name) for name in taxonomies]
+    map_seconds = time.perf_counter() - started
+    map_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"all automata: compiled in process {compile_seconds:.3f}s, {compile_bytes / 1024:.0f} KiB heap; "
+          f"mapped index {map_seconds:.4f}s, {map_bytes / 1024:.0f} KiB heap ({len(mapped)} taxonomies)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Compare per-page matching cost of regex and column-aware Kotak extraction.
+
+Word boxes are read once per page up front, so the timings below cover only
+what each mode does with them: rebuilding lines and running the transaction
+regex, or bucketing words into header-derived columns. Both modes share
+date and amount conversion; the 'table pass' row times the column bucketing
+on its own.
+
+    python backend/benchmarks/bench_column_extraction.py [statement.pdf] [--pages N] [--repeat R]
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND))
+
+from benchmarks.sample import make_statement
+from parsers.columns import extract_table_rows
+from parsers.document import StatementDocument, words_to_lines
+from parsers.kotak_parser import extract_transactions_from_text, extract_transactions_from_words
+
+
+def regex_page(page_number, words):
+    return extract_transactions_from_text(page_number, '\n'.join(words_to_lines(words)))
+
+
+def table_pass(_page_number, words):
+    rows, _layout = extract_table_rows(words)
+    return rows
+
+
+def time_mode(page_fn, pages, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        results = [page_fn(number, words) for number, words in pages]
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, results
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('pdf_path', nargs='?')
+    arg_parser.add_argument('--pages', type=int, default=20)
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    args = arg_parser.parse_args()
+
+    source = args.pdf_path or make_statement(args.pages)
+    with StatementDocument(source) as document:
+        pages = [(index + 1, document.page_words(index)) for index in range(document.page_count)]
+
+    stderr = sys.stderr
+    sys.stderr = open(os.devnull, 'w')
+    try:
+        regex_seconds, regex_results = time_mode(regex_page, pages, args.repeat)
+        column_seconds, column_results = time_mode(extract_transactions_from_words, pages, args.repeat)
+        table_seconds, table_results = time_mode(table_pass, pages, args.repeat)
+    finally:
+        sys.stderr.close()
+        sys.stderr = stderr
+
+    page_count = len(pages)
+    print(f"{'mode':10} {'rows':>6} {'ms/page':>8}")
+    for name, seconds, results in (('regex', regex_seconds, regex_results),
+                                   ('columns', column_seconds, column_results),
+                                   ('table pass', table_seconds, table_results)):
+        rows = sum(len(r) for r in results)
+        print(f"{name:10} {rows:>6} {seconds / page_count * 1000:>8.3f}")
+    print(f"identical rows: {regex_results == column_results}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""Count how many times each entry point parses the PDF structure.
+
+Every fitz.open / pdfplumber.open / PyPDF2.PdfReader call re-reads the xref
+table and object streams. This wraps those constructors, runs each parser
+entry point once and prints the opens it made next to what the same entry
+point did before StatementDocument (see LEGACY_OPENS).
+
+    python backend/benchmarks/bench_document_opens.py [statement.pdf] [--pages N]
+"""
+import argparse
+import importlib.util
+import logging
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND))
+
+import fitz  # PyMuPDF
+import pdfplumber
+import PyPDF2
+
+from benchmarks.sample import make_statement
+
+# Opens per call before the shared document handle; F = pages needing fallback
+LEGACY_OPENS = {
+    'parse_kotak_statement': '2 (PyPDF2 page count + pdfplumber)',
+    'KotakParser.parse': '1 (fitz)',
+    'StatementParser.parse': '1 (pdfplumber)',
+    'scripts StatementParser + main': '3 + F (PyPDF2 x2, pdfplumber, fitz per fallback page)',
+}
+
+opens = Counter()
+
+
+def counting(name, original):
+    def wrapper(*args, **kwargs):
+        opens[name] += 1
+        return original(*args, **kwargs)
+    return wrapper
+
+
+class Upload:
+    def __init__(self, name, data):
+        self.name = name
+        self._data = data
+
+    def read(self, *args):
+        return self._data
+
+
+def load_script_parser():
+    spec = importlib.util.spec_from_file_location('script_statement_parser',
+                                                  BACKEND.parent / 'scripts' / 'statement_parser.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('pdf_path', nargs='?')
+    arg_parser.add_argument('--pages', type=int, default=20)
+    args = arg_parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    if args.pdf_path:
+        pdf_path = args.pdf_path
+        data = Path(pdf_path).read_bytes()
+    else:
+        data = make_statement(args.pages)
+        handle = tempfile.NamedTemporaryFile(suffix='.pdf', delete=False)
+        handle.write(data)
+        handle.close()
+        pdf_path = handle.name
+
+    fitz.open = counting('fitz', fitz.open)
+    pdfplumber.open = counting('pdfplumber', pdfplumber.open)
+    PyPDF2.PdfReader = counting('PyPDF2', PyPDF2.PdfReader)
+
+    from parsers.kotak_parser import KotakParser, parse_kotak_statement
+    from statement_parser import StatementParser
+    script_module = load_script_parser()
+
+    def run_script():
+        parser = script_module.StatementParser(pdf_path)
+        parser.parse()
+        return parser.page_count
+
+    entry_points = {
+        'parse_kotak_statement': lambda: parse_kotak_statement(data),
+        'KotakParser.parse': lambda: KotakParser(Upload('statement.pdf', data)).parse(),
+        'StatementParser.parse': lambda: StatementParser(Upload('statement.pdf', data)).parse(),
+        'scripts StatementParser + main': run_script,
+    }
+
+    stderr = sys.stderr
+    print(f"{'entry point':32} {'opens now':>10} {'seconds':>8}  before")
+    for name, run in entry_points.items():
+        opens.clear()
+        sys.stderr = open(os.devnull, 'w')
+        try:
+            started = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - started
+        finally:
+            sys.stderr.close()
+            sys.stderr = stderr
+        detail = ', '.join(f"{k}={v}" for k, v in sorted(opens.items()))
+        print(f"{name:32} {sum(opens.values()):>10} {elapsed:>8.3f}  {LEGACY_OPENS[name]}  [{detail}]")
+
+    if not args.pdf_path:
+        os.unlink(pdf_path)
+
+
+if __name__ == '__main__':
+    main()
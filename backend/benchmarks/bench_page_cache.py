@@ -0,0 +1,63 @@
+"""Time cold and warm parses through the page cache.
+
+Parses a statement with an empty cache, parses it again, then parses a
+longer statement that shares its first pages (the 3-month then 6-month
+re-upload case) and prints timings with the cached page counts.
+
+    python backend/benchmarks/bench_page_cache.py [--pages N] [--workers W]
+"""
+import argparse
+import io
+import sys
+import time
+from contextlib import redirect_stderr
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND))
+
+import fitz  # PyMuPDF
+
+from benchmarks.sample import make_statement
+from parsers.kotak_parser import _parse_kotak_source
+from parsers.page_cache import get_page_cache
+
+
+def extend_statement(data: bytes, extra_pages: int) -> bytes:
+    """`data` followed by `extra_pages` pages that were never parsed."""
+    doc = fitz.open(stream=data, filetype='pdf')
+    extra = fitz.open(stream=make_statement(extra_pages, seed=2), filetype='pdf')
+    doc.insert_pdf(extra)
+    combined = doc.tobytes()
+    doc.close()
+    extra.close()
+    return combined
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--pages', type=int, default=30)
+    arg_parser.add_argument('--workers', type=int, default=1)
+    args = arg_parser.parse_args()
+
+    cache = get_page_cache()
+    if cache is None:
+        sys.exit('Page cache is disabled (STATEMENT_PAGE_CACHE_BYTES=0 and no STATEMENT_PAGE_CACHE_DIR)')
+    cache.clear()
+
+    short = make_statement(args.pages)
+    runs = (('cold', short), ('warm', short), ('overlapping', extend_statement(short, args.pages)))
+
+    print(f"{'run':12} {'pages':>6} {'cached':>7} {'seconds':>8}")
+    for name, data in runs:
+        with redirect_stderr(io.StringIO()):
+            started = time.perf_counter()
+            result = _parse_kotak_source(data, args.workers, None)
+            elapsed = time.perf_counter() - started
+        report = result['parseReport']
+        print(f"{name:12} {result['pageCount']:>6} {report['cachedPages']:>7} {elapsed:>8.3f}")
+    print(cache.stats())
+
+
+if __name__ == '__main__':
+    main()
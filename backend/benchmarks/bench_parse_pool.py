@@ -0,0 +1,109 @@
+"""Latency of small requests while large statements parse, inline vs in the parse pool.
+
+Generates a large statement PDF (200 pages by default), then runs
+`--parses` parses of it on the event loop the way /analyze used to
+(parse_upload called inline in the coroutine) and through ParsePool.run().
+Meanwhile a probe requests the app's cheap /metrics/parse-pool endpoint
+every few milliseconds. A probe's latency runs from when it was due, so
+time spent waiting for a blocked loop counts; the percentiles show how
+much each mode stalls everything else.
+
+    python backend/benchmarks/bench_parse_pool.py [--pages N] [--parses P] [--seed S]
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND))
+
+import httpx
+
+from benchmarks.sample import make_statement
+from parsers.parse_pool import ParsePool
+from statement_parser import parse_upload
+
+PROBE_INTERVAL = 0.005
+
+
+async def probe(client, latencies, stop):
+    due = time.perf_counter()
+    while True:
+        await client.get('/metrics/parse-pool')
+        finished = time.perf_counter()
+        latencies.append(finished - due)
+        if stop.is_set():
+            return
+        due = finished + PROBE_INTERVAL
+        await asyncio.sleep(PROBE_INTERVAL)
+
+
+async def inline_parse(content):
+    """What /analyze did before: the parse runs on the event loop."""
+    await asyncio.sleep(PROBE_INTERVAL * 4)
+    return parse_upload(content, 'statement.pdf', None, 1)
+
+
+async def pooled_parse(pool, content):
+    await asyncio.sleep(PROBE_INTERVAL * 4)
+    return await pool.run(parse_upload, content, 'statement.pdf', None, 1)
+
+
+async def measure(app, parses, parse):
+    latencies = []
+    stop = asyncio.Event()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://bench') as client:
+        prober = asyncio.create_task(probe(client, latencies, stop))
+        started = time.perf_counter()
+        results = await asyncio.gather(*[parse() for _ in range(parses)])
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await prober
+    return elapsed, latencies, results
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--pages', type=int, default=200)
+    arg_parser.add_argument('--parses', type=int, default=2)
+    arg_parser.add_argument('--seed', type=int, default=1)
+    args = arg_parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    from api_server import app
+
+    content = make_statement(args.pages, args.seed)
+    pool = ParsePool(size=args.parses, queue_depth=0)
+    modes = [
+        ('inline', lambda: inline_parse(content)),
+        ('parse pool', lambda: pooled_parse(pool, content)),
+    ]
+    try:
+        # Start the workers before timing
+        asyncio.run(pool.run(len, b''))
+        rows = None
+        print(f"{args.parses} parses of a {args.pages}-page statement; probe latency of /metrics/parse-pool:")
+        for label, parse in modes:
+            elapsed, latencies, results = asyncio.run(measure(app, args.parses, parse))
+            found = [len(batch) for batch, _report in results]
+            if rows is not None and found != rows:
+                sys.exit(f"{label} parsed {found} rows, expected {rows}")
+            rows = found
+            print(f"  {label:10} parses {elapsed:.2f}s, {len(latencies)} probes: "
+                  f"p50 {statistics.median(latencies) * 1000:.1f}ms, "
+                  f"p99 {percentile(latencies, 0.99) * 1000:.1f}ms, max {max(latencies) * 1000:.1f}ms")
+    finally:
+        pool.shutdown()
+
+
+if __name__ == '__main__':
+    main()
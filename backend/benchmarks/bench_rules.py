@@ -0,0 +1,98 @@
+"""Compare KotakParser's category post-processing by row-wise apply and by the rules engine.
+
+Builds a synthetic frame of transactions that exercises both rules (bill
+amounts with subscription narrations, large credits around month ends),
+post-processes it with the old per-row DataFrame.apply and with the
+vectorized RuleEngine, checks both give the same categories, and prints
+timings.
+
+    python backend/benchmarks/bench_rules.py [--rows N] [--seed S]
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND))
+
+from benchmarks.sample import NARRATIONS
+from parsers.kotak_parser import _KOTAK_POST_RULES
+
+CATEGORIES = ['food', 'shopping', 'travel', 'bills', 'entertainment', 'finance', 'income', 'salary', 'transfer',
+              'miscellaneous expenses']
+SUFFIXES = ['', ' MONTHLY PLAN', ' SUBSCRIPTION', ' AUTO RENEWAL', ' REF 12']
+
+
+def post_process_category(row):
+    """KotakParser._post_process_category before the rules engine."""
+    description = row['description'].lower() if isinstance(row['description'], str) else ''
+    amount = row['amount']
+    category = row['category']
+    recurring_bill_amounts = [199, 299, 399, 499, 999]
+    recurring_amounts_tolerance = 5
+    if any(abs(abs(amount) - bill) < recurring_amounts_tolerance for bill in recurring_bill_amounts):
+        if 'entertainment' not in category:
+            if any(x in description for x in ['subscription', 'monthly', 'renewal']):
+                return 'entertainment'
+    if amount > 10000 and amount > 0:
+        day = row['date'].day
+        if day >= 25 or day <= 7:
+            if 'salary' not in category:
+                return 'income'
+    return category
+
+
+def make_frame(rows, seed):
+    rng = random.Random(seed)
+    records = []
+    for _ in range(rows):
+        roll = rng.random()
+        if roll < 0.3:
+            amount = rng.choice([199, 299, 399, 499, 999]) + rng.uniform(-6, 6)
+        elif roll < 0.6:
+            amount = rng.uniform(5000, 90000)
+        else:
+            amount = rng.uniform(10, 20000)
+        records.append({
+            'date': datetime(2024, rng.randint(1, 12), rng.randint(1, 28)),
+            'amount': round(amount if rng.random() < 0.5 else -amount, 2),
+            'description': rng.choice(NARRATIONS) + rng.choice(SUFFIXES) if rng.random() < 0.98 else None,
+            'category': rng.choice(CATEGORIES),
+        })
+    return pd.DataFrame(records)
+
+
+def best_of(repeat, fn):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--rows', type=int, default=12000)
+    arg_parser.add_argument('--seed', type=int, default=1)
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    args = arg_parser.parse_args()
+
+    frame = make_frame(args.rows, args.seed)
+    apply_seconds, expected = best_of(args.repeat, lambda: frame.apply(post_process_category, axis=1))
+    engine_seconds, found = best_of(args.repeat, lambda: _KOTAK_POST_RULES.apply(frame))
+    if not expected.equals(found):
+        sys.exit(f"rules engine and apply disagree on {(expected != found).sum()} rows")
+    changed = (found != frame['category']).sum()
+    print(f"{args.rows} rows, {changed} recategorized: apply {apply_seconds:.3f}s, "
+          f"rules engine {engine_seconds:.4f}s ({apply_seconds / engine_seconds:.0f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""Compare the old response serialization paths with parsers.serialize.
+
+Builds a synthetic TransactionBatch and encodes its transactions the ways
+the endpoints used to (iterrows with per-row strftime, a formatted date
+column with DataFrame.to_dict, to_dict('records') through FastAPI's
+jsonable_encoder) and with records_json() + dumps(), checks every path
+decodes to the same rows, and prints timings.
+
+    python backend/benchmarks/bench_serialize.py [--rows N] [--seed S]
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND))
+
+from benchmarks.sample import NARRATIONS
+from parsers import serialize
+from parsers.batch import TransactionBuilder
+from parsers.serialize import dumps, records_json
+
+try:
+    from fastapi.encoders import jsonable_encoder
+except ImportError:  # the FastAPI path is skipped without it
+    jsonable_encoder = None
+
+CATEGORIES = ['food', 'shopping', 'travel', 'bills', 'transfer', 'Others']
+
+
+def make_batch(rows, seed):
+    rng = random.Random(seed)
+    builder = TransactionBuilder()
+    dates = []
+    for _ in range(rows):
+        date = datetime(2024, rng.randint(1, 12), rng.randint(1, 28))
+        amount = round(rng.uniform(10, 20000), 2) * (-1 if rng.random() < 0.7 else 1)
+        builder.append(date.strftime('%d-%m-%Y'), amount, f"{rng.choice(NARRATIONS)} REF{rng.randint(1000, 9999)}",
+                       rng.choice(CATEGORIES))
+        dates.append(date)
+    return builder.build(dates).sort_by_date()
+
+
+def iterrows_path(df):
+    """api_statement_parser main() before the serializer."""
+    transactions = []
+    for _, row in df.iterrows():
+        transactions.append({
+            'date': row['date'].strftime('%Y-%m-%d'),
+            'amount': float(row['amount']),
+            'description': str(row['description']) if 'description' in row else '',
+            'category': str(row['category'])
+        })
+    return json.dumps({'transactions': transactions})
+
+
+def to_dict_path(df):
+    """scripts/statement_parser main() before the serializer."""
+    df = df.copy()
+    df['date'] = df['date'].dt.strftime('%Y-%m-%d')
+    return json.dumps({'transactions': df.to_dict('records')})
+
+
+def fastapi_path(df):
+    """/analyze before the serializer: records through FastAPI's encoder, dates as ISO datetimes."""
+    content = jsonable_encoder({'transactions': df.to_dict('records')})
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(',', ':'))
+
+
+def best_of(repeat, fn):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--rows', type=int, default=10000)
+    arg_parser.add_argument('--seed', type=int, default=1)
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    args = arg_parser.parse_args()
+
+    batch = make_batch(args.rows, args.seed)
+    df = batch.to_frame()
+    expected = None
+    results = []
+    paths = [
+        ('iterrows + strftime', lambda: iterrows_path(df), '%Y-%m-%d'),
+        ('date column + to_dict', lambda: to_dict_path(df), '%Y-%m-%d'),
+    ]
+    if jsonable_encoder is not None:
+        paths.append(('to_dict + jsonable_encoder', lambda: fastapi_path(df), serialize.ISO_DATETIME))
+    paths.append(('records_json + dumps', lambda: dumps({'transactions': records_json(batch, date_format='%Y-%m-%d')}),
+                  '%Y-%m-%d'))
+    for label, encode, date_format in paths:
+        seconds, encoded = best_of(args.repeat, encode)
+        rows = json.loads(encoded)['transactions']
+        expected = expected or {fmt: json.loads(dumps(batch.to_records(date_format=fmt)))
+                                for fmt in ('%Y-%m-%d', serialize.ISO_DATETIME)}
+        if rows != expected[date_format]:
+            sys.exit(f"{label} encodes different rows")
+        results.append((label, seconds))
+
+    encoder = 'orjson' if serialize.orjson is not None else 'json'
+    baseline = results[-1][1]
+    print(f"{args.rows} rows ({encoder} encoder):")
+    for label, seconds in results:
+        print(f"  {label:28} {seconds:.4f}s ({seconds / baseline:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Memory held per upload: reading the spooled upload vs parsing it in place.
+
+Spools a synthetic statement the way the frameworks store multipart
+uploads (SpooledTemporaryFile, written in chunks), then opens it for
+parsing after file.read() and after upload_buffer(), measuring the Python
+heap each path allocates with tracemalloc. Below the spool threshold the
+upload is in memory either way; above it, upload_buffer() maps the
+temporary file instead of copying it onto the heap.
+
+    python backend/benchmarks/bench_uploads.py [--pages N] [--spool BYTES] [--seed S]
+"""
+import argparse
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND))
+
+from benchmarks.sample import make_statement
+from parsers.document import StatementDocument
+from parsers.uploads import release_buffer, upload_buffer
+
+CHUNK_BYTES = 64 * 1024
+
+
+def spool(content, spool_bytes):
+    spooled = tempfile.SpooledTemporaryFile(max_size=spool_bytes)
+    for start in range(0, len(content), CHUNK_BYTES):
+        spooled.write(content[start:start + CHUNK_BYTES])
+    return spooled
+
+
+def peak_bytes(open_upload, spooled):
+    """Peak heap allocated while `open_upload` reads the upload and opens it."""
+    tracemalloc.start()
+    buffer = open_upload(spooled)
+    with StatementDocument(buffer) as document:
+        pages = document.page_count
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    release_buffer(buffer)
+    return peak, pages
+
+
+def read_upload(spooled):
+    """What the endpoints did before: the whole upload as one bytes object."""
+    spooled.seek(0)
+    return spooled.read()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--pages', type=int, default=400)
+    # Below the default statement's size, so it spills to a temporary file as a large upload would
+    arg_parser.add_argument('--spool', type=int, default=256 * 1024)
+    arg_parser.add_argument('--seed', type=int, default=1)
+    args = arg_parser.parse_args()
+
+    content = make_statement(args.pages, args.seed)
+    with spool(content, args.spool) as spooled:
+        where = 'temporary file' if spooled._rolled else 'memory'
+        read_peak, pages = peak_bytes(read_upload, spooled)
+        buffer_peak, buffer_pages = peak_bytes(upload_buffer, spooled)
+    if pages != buffer_pages:
+        sys.exit("read() and upload_buffer() open different documents")
+    print(f"{pages}-page statement, {len(content) / 2 ** 20:.1f} MiB, spooled to {where}:")
+    print(f"  file.read()      peak heap {read_peak / 2 ** 20:.2f} MiB")
+    print(f"  upload_buffer()  peak heap {buffer_peak / 2 ** 20:.2f} MiB")
+
+
+if __name__ == '__main__':
+    main()
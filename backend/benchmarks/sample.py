@@ -0,0 +1,54 @@
+"""Synthetic Kotak-style statements for the benchmarks in this directory."""
+import random
+
+import fitz  # PyMuPDF
+
+NARRATIONS = [
+    'UPI/412345678901/swiggy@axis/Swiggy',
+    'UPI/498877665544/zomato@icici/Zomato',
+    'UPI/411122233344/uber@paytm/Uber India',
+    'NEFT-HDFC0001234-ACME CORP SALARY',
+    'IMPS-554433221100-Ramesh Kumar',
+    'POS/AMAZON RETAIL INDIA',
+    'ATM-CASH WITHDRAWAL MG ROAD',
+    'ECS/LIC PREMIUM',
+]
+
+ROWS_PER_PAGE = 40
+
+
+def make_statement(pages: int = 20, seed: int = 1) -> bytes:
+    """Return the bytes of a `pages`-page statement with ROWS_PER_PAGE rows per page."""
+    rng = random.Random(seed)
+    doc = fitz.open()
+    balance = 100000.0
+    for page_index in range(pages):
+        page = doc.new_page()
+        y = 50
+        if page_index == 0:
+            page.insert_text((40, y), 'Account Number : 1234567890', fontsize=9)
+            y += 14
+            page.insert_text((40, y), 'Account Name : TEST USER', fontsize=9)
+            y += 14
+        for x, header in ((40, 'Date'), (100, 'Narration'), (330, 'Chq/Ref No'),
+                          (420, 'Withdrawal(Dr)/Deposit(Cr)'), (530, 'Balance')):
+            page.insert_text((x, y), header, fontsize=8)
+        y += 14
+        for row in range(ROWS_PER_PAGE):
+            amount = round(rng.uniform(10, 20000), 2)
+            debit = rng.random() < 0.7
+            balance += -amount if debit else amount
+            cells = (
+                (40, f"{row % 28 + 1:02d}-{page_index % 12 + 1:02d}-2024"),
+                (100, rng.choice(NARRATIONS)),
+                (330, f"REF{rng.randint(1000, 9999)}"),
+                (420, f"{amount:,.2f}({'Dr' if debit else 'Cr'})"),
+                (530, f"{balance:,.2f}"),
+            )
+            for x, cell in cells:
+                page.insert_text((x, y), cell, fontsize=7)
+            y += 17
+        page.insert_text((40, 820), f"Page {page_index + 1} of {pages}", fontsize=7)
+    data = doc.tobytes(garbage=3, clean=True, deflate=True)
+    doc.close()
+    return data
@@ -0,0 +1,139 @@
+"""Worker process for queued parse jobs (see parsers/jobs.py).
+
+Runs next to the web processes and scales separately from them:
+
+    python job_worker.py [--processes N] [--db PATH]
+
+Each process claims one job at a time, parses it page by page, writes the
+page progress and a partial summary to the job, and stores the same JSON
+body /analyze returns. On SIGTERM or SIGINT a process finishes its current
+job and exits; a job whose worker is killed outright is queued again once
+its lease runs out.
+"""
+import os
+import time
+import signal
+import socket
+import logging
+import argparse
+import threading
+import traceback
+import multiprocessing
+
+from parsers.jobs import Job, JobStore
+from parsers.summary import StatementSummary
+from statement_parser import StatementParser, analysis_json
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROCESSES = int(os.environ.get('STATEMENT_JOB_WORKERS', '1'))
+
+# Seconds an idle worker waits before looking for new jobs
+POLL_SECONDS = float(os.environ.get('STATEMENT_JOB_POLL', '1'))
+
+# A job's progress is written at most this often, and after its last page
+PROGRESS_SECONDS = 0.5
+
+# Idle workers purge expired jobs at most this often
+PURGE_SECONDS = 600
+
+
+def run_job(store: JobStore, job: Job, worker: str):
+    """Parse one claimed job, reporting progress, and store its result or error."""
+    summary = StatementSummary()
+    last_report = 0.0
+
+    def on_page(page_number, page_count, batch):
+        nonlocal last_report
+        summary.update(batch)
+        now = time.monotonic()
+        if now - last_report < PROGRESS_SECONDS and page_number < page_count:
+            return
+        last_report = now
+        store.report_progress(job.id, worker, page_number, page_count, {
+            "transactionCount": len(summary),
+            "totalSpent": summary.total_spent,
+            "totalReceived": summary.total_received,
+            "categoryBreakdown": summary.spending_by_category()
+        })
+
+    started = time.perf_counter()
+    # The stored upload is parsed in place
+    parser = StatementParser(job.content, engine=job.options.get('engine'), workers=job.options.get('workers'),
+                             password=job.password, filename=job.filename)
+    try:
+        parser.open()
+        # Parse errors fail the job rather than finishing it with no transactions
+        batch = parser.parse_batch(on_page, raise_errors=True)
+        result = analysis_json(batch, parser.report.as_dict() if parser.report else None)
+    except ValueError as e:
+        store.fail(job.id, worker, str(e), 400)
+        return
+    except Exception as e:
+        # Any failure ends this job only; the worker goes on to the next one
+        logger.error(f"Job {job.id} failed: {str(e)}\n{traceback.format_exc()}")
+        store.fail(job.id, worker, f"Error processing file: {str(e)}", 500)
+        return
+    finally:
+        parser.close()
+    store.finish(job.id, worker, result)
+    logger.info(f"Job {job.id}: {len(batch)} transactions in {time.perf_counter() - started:.2f}s")
+
+
+def work(store: JobStore, worker: str, stop: threading.Event):
+    """Claim and run jobs until `stop` is set."""
+    last_purge = 0.0
+    while not stop.is_set():
+        job = store.claim(worker)
+        if job is not None:
+            logger.info(f"Job {job.id} ({job.filename}, {len(job.content)} bytes) claimed by {worker}")
+            run_job(store, job, worker)
+            continue
+        if time.monotonic() - last_purge >= PURGE_SECONDS:
+            purged = store.purge()
+            if purged:
+                logger.info(f"Purged {purged} expired jobs")
+            last_purge = time.monotonic()
+        stop.wait(POLL_SECONDS)
+
+
+def serve(db_path=None):
+    """Run one worker process until it is asked to stop."""
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    store = JobStore(db_path)
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    logger.info(f"Job worker {worker} polling {store.path}")
+    work(store, worker, stop)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Run parse job workers')
+    arg_parser.add_argument('--processes', type=int, default=DEFAULT_PROCESSES,
+                            help='worker processes to run (default STATEMENT_JOB_WORKERS or 1)')
+    arg_parser.add_argument('--db', help='job database (default STATEMENT_JOB_DB)')
+    args = arg_parser.parse_args()
+
+    if args.processes <= 1:
+        serve(args.db)
+        return
+
+    processes = [multiprocessing.Process(target=serve, args=(args.db,)) for _ in range(args.processes)]
+    for process in processes:
+        process.start()
+
+    def forward(signum, _frame):
+        for process in processes:
+            if process.is_alive():
+                os.kill(process.pid, signum)
+
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+    for process in processes:
+        process.join()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,269 @@
+"""Columnar batches of transactions shared by all parsers.
+
+Parsers used to carry each transaction as a dict from extraction to the
+response, through lists, DataFrames and back to dicts. A TransactionBatch
+keeps a document's transactions as typed columns instead:
+
+    dates           int32 proleptic Gregorian ordinals (date.toordinal())
+    amounts         float64, negative for debits
+    balances        float64, NaN where the statement shows none
+    debits          bool, the debit/credit side the statement states
+    category_codes  int16 indexes into `categories`
+    descriptions    object array of interned strings
+
+Page functions append raw fields to a TransactionBuilder, dates still as
+text; the builders of a document are concatenated and built into a batch
+once its dates are parsed. Aggregation reads the columns, and rows become
+records or a DataFrame only when a response is serialized.
+"""
+import sys
+import math
+from array import array
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+# date(1970, 1, 1).toordinal(), for converting ordinals to datetime64
+_EPOCH_ORDINAL = 719163
+
+RECORD_COLUMNS = ('date', 'amount', 'description', 'category')
+
+Index = Union[np.ndarray, Sequence[int]]
+
+
+def column_sum(values: np.ndarray, start: float = 0.0) -> float:
+    """`start` plus the values left to right: the same float as a running Python sum."""
+    if not len(values):
+        return float(start)
+    return float(np.cumsum(np.concatenate(([start], values)))[-1])
+
+
+class TransactionBuilder:
+    """Raw rows of a page or document, appended by extractors before dates are converted."""
+
+    def __init__(self):
+        self.raw_dates: List[str] = []
+        self.amounts = array('d')
+        self.balances = array('d')
+        self.debits = array('b')
+        self.descriptions: List[str] = []
+        self.categories: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.raw_dates)
+
+    def append(self, date_text: str, amount: float, description: str, category: str,
+               balance: Optional[float] = None, debit: Optional[bool] = None):
+        """Add a row; `debit` defaults to the amount's sign."""
+        self.raw_dates.append(date_text)
+        self.amounts.append(amount)
+        self.balances.append(math.nan if balance is None else balance)
+        self.debits.append(amount < 0 if debit is None else debit)
+        self.descriptions.append(sys.intern(description))
+        self.categories.append(sys.intern(category))
+
+    def extend(self, other: 'TransactionBuilder'):
+        self.raw_dates.extend(other.raw_dates)
+        self.amounts.extend(other.amounts)
+        self.balances.extend(other.balances)
+        self.debits.extend(other.debits)
+        self.descriptions.extend(other.descriptions)
+        self.categories.extend(other.categories)
+
+    @classmethod
+    def concat(cls, builders: Iterable['TransactionBuilder']) -> 'TransactionBuilder':
+        merged = cls()
+        for builder in builders:
+            merged.extend(builder)
+        return merged
+
+    def build(self, dates: Sequence[Optional[Union[date, datetime]]]) -> 'TransactionBatch':
+        """The batch of rows whose converted date (aligned with raw_dates) is not None."""
+        keep = np.fromiter((value is not None for value in dates), dtype=bool, count=len(dates))
+        # Interned names share one code each
+        codes: Dict[str, int] = {}
+        category_codes = np.fromiter((codes.setdefault(name, len(codes)) for name in self.categories),
+                                     dtype=np.int16, count=len(self.categories))
+        batch = TransactionBatch(
+            dates=np.fromiter((value.toordinal() if value is not None else 0 for value in dates),
+                              dtype=np.int32, count=len(dates)),
+            amounts=np.frombuffer(self.amounts, dtype=np.float64).copy(),
+            balances=np.frombuffer(self.balances, dtype=np.float64).copy(),
+            debits=np.frombuffer(self.debits, dtype=np.int8).astype(bool),
+            category_codes=category_codes,
+            categories=list(codes),
+            descriptions=np.array(self.descriptions, dtype=object) if self.descriptions else np.empty(0, object)
+        )
+        return batch if keep.all() else batch.take(keep)
+
+
+class TransactionBatch:
+    """A document's transactions as typed columns (see the module docstring)."""
+
+    __slots__ = ('dates', 'amounts', 'balances', 'debits', 'category_codes', 'categories', 'descriptions')
+
+    def __init__(self, dates: np.ndarray, amounts: np.ndarray, balances: np.ndarray, debits: np.ndarray,
+                 category_codes: np.ndarray, categories: List[str], descriptions: np.ndarray):
+        self.dates = dates
+        self.amounts = amounts
+        self.balances = balances
+        self.debits = debits
+        self.category_codes = category_codes
+        self.categories = categories
+        self.descriptions = descriptions
+
+    @classmethod
+    def empty(cls) -> 'TransactionBatch':
+        return TransactionBuilder().build([])
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame) -> 'TransactionBatch':
+        """A batch from a frame with date, amount, description and category columns (balance, type optional)."""
+        stamps = pd.to_datetime(frame['date'])
+        days = stamps.to_numpy('datetime64[D]').astype(np.int64) + _EPOCH_ORDINAL
+        category_codes, categories = pd.factorize(frame['category'])
+        amounts = frame['amount'].to_numpy(np.float64)
+        return cls(
+            dates=days.astype(np.int32),
+            amounts=amounts.copy(),
+            balances=frame['balance'].to_numpy(np.float64) if 'balance' in frame else np.full(len(frame), np.nan),
+            debits=(frame['type'] == 'debit').to_numpy(bool) if 'type' in frame else amounts < 0,
+            category_codes=category_codes.astype(np.int16),
+            categories=[sys.intern(str(name)) for name in categories],
+            descriptions=np.array([sys.intern(value) for value in frame['description']], dtype=object)
+        )
+
+    @classmethod
+    def concat(cls, batches: Sequence['TransactionBatch']) -> 'TransactionBatch':
+        batches = [batch for batch in batches if len(batch)]
+        if not batches:
+            return cls.empty()
+        if len(batches) == 1:
+            return batches[0]
+        # Re-code every batch's categories against the merged category list
+        codes: Dict[str, int] = {}
+        recoded = []
+        for batch in batches:
+            mapping = np.array([codes.setdefault(name, len(codes)) for name in batch.categories], dtype=np.int16)
+            recoded.append(mapping[batch.category_codes])
+        return cls(
+            dates=np.concatenate([batch.dates for batch in batches]),
+            amounts=np.concatenate([batch.amounts for batch in batches]),
+            balances=np.concatenate([batch.balances for batch in batches]),
+            debits=np.concatenate([batch.debits for batch in batches]),
+            category_codes=np.concatenate(recoded),
+            categories=list(codes),
+            descriptions=np.concatenate([batch.descriptions for batch in batches])
+        )
+
+    def __len__(self) -> int:
+        return len(self.amounts)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the columns, counting each distinct string once."""
+        strings = {id(value): sys.getsizeof(value) for value in self.descriptions}
+        strings.update((id(name), sys.getsizeof(name)) for name in self.categories)
+        arrays = (self.dates, self.amounts, self.balances, self.debits, self.category_codes, self.descriptions)
+        return sum(column.nbytes for column in arrays) + sum(strings.values())
+
+    def take(self, index: Index) -> 'TransactionBatch':
+        """Rows selected by a boolean mask or positions, in that order."""
+        return TransactionBatch(self.dates[index], self.amounts[index], self.balances[index], self.debits[index],
+                                self.category_codes[index], self.categories, self.descriptions[index])
+
+    def sort_by_date(self, descending: bool = False) -> 'TransactionBatch':
+        """Rows by date; rows of the same date keep their order."""
+        keys = -self.dates if descending else self.dates
+        return self.take(np.argsort(keys, kind='stable'))
+
+    def categorize(self, categorize: Callable[[str], str]) -> 'TransactionBatch':
+        """The batch with each row's category set from its description, calling `categorize` once per distinct one."""
+        codes, uniques = pd.factorize(self.descriptions)
+        names = [sys.intern(categorize(description)) for description in uniques]
+        categories = list(dict.fromkeys(names))
+        positions = {name: code for code, name in enumerate(categories)}
+        category_codes = np.array([positions[name] for name in names], dtype=np.int16)[codes]
+        return TransactionBatch(self.dates, self.amounts, self.balances, self.debits, category_codes,
+                                categories, self.descriptions)
+
+    def category_names(self) -> np.ndarray:
+        return np.array(self.categories, dtype=object)[self.category_codes]
+
+    def datetimes(self) -> np.ndarray:
+        return (self.dates.astype(np.int64) - _EPOCH_ORDINAL).astype('datetime64[D]')
+
+    def date_values(self, date_format: Optional[str] = None) -> List[Any]:
+        """Row dates as datetimes, or as strings in `date_format`, each distinct date converted once."""
+        unique, inverse = np.unique(self.dates, return_inverse=True)
+        values = [datetime.fromordinal(int(ordinal)) for ordinal in unique]
+        if date_format is not None:
+            values = [value.strftime(date_format) for value in values]
+        return [values[position] for position in inverse]
+
+    def fingerprints(self) -> np.ndarray:
+        """A 64-bit hash per row of its date, amount, description and balance."""
+        return pd.util.hash_pandas_object(pd.DataFrame({
+            'date': self.dates, 'amount': self.amounts, 'description': self.descriptions, 'balance': self.balances
+        }), index=False).to_numpy()
+
+    def to_records(self, columns: Sequence[str] = RECORD_COLUMNS, date_format: Optional[str] = None,
+                   type_labels: Tuple[str, str] = ('credit', 'debit')) -> List[Dict[str, Any]]:
+        """One dict per row with `columns`, built column by column.
+
+        Dates are datetimes unless `date_format` is given; 'type' is
+        type_labels[0] for credits and type_labels[1] for debits.
+        """
+        values = {
+            'date': lambda: self.date_values(date_format),
+            'amount': self.amounts.tolist,
+            'description': self.descriptions.tolist,
+            'category': lambda: self.category_names().tolist(),
+            'balance': self.balances.tolist,
+            'type': lambda: np.where(self.debits, type_labels[1], type_labels[0]).tolist(),
+        }
+        return [dict(zip(columns, row)) for row in zip(*(values[column]() for column in columns))]
+
+    def to_frame(self, columns: Sequence[str] = RECORD_COLUMNS,
+                 type_labels: Tuple[str, str] = ('credit', 'debit')) -> pd.DataFrame:
+        """A DataFrame with `columns`; dates as datetime64."""
+        values = {
+            'date': lambda: self.datetimes().astype('datetime64[ns]'),
+            'amount': lambda: self.amounts,
+            'description': lambda: self.descriptions,
+            'category': self.category_names,
+            'balance': lambda: self.balances,
+            'type': lambda: np.where(self.debits, type_labels[1], type_labels[0]),
+        }
+        return pd.DataFrame({column: values[column]() for column in columns}, columns=list(columns))
+
+
+class ReprintFilter:
+    """Drops the rows a statement reprints from an earlier page; feed it one document's pages in order.
+
+    Statements may repeat rows at the top of the next page. Only rows with a
+    balance can be told from a repeat: the running balance separates two
+    genuine same-day, same-amount transactions, so a row is a reprint when
+    its fingerprint, balance included, was on an earlier page. Rows without
+    a balance are always kept, as are repeats within a page, since the
+    matcher yields one row per span of text.
+    """
+
+    def __init__(self):
+        self._earlier = np.empty(0, dtype=np.uint64)
+
+    def drop(self, batch: TransactionBatch, pages: Optional[np.ndarray] = None) -> TransactionBatch:
+        """`batch` without its reprinted rows; `pages` numbers each row's page in ascending order (default one page)."""
+        if not len(batch):
+            return batch
+        fingerprints = batch.fingerprints()
+        has_balance = ~np.isnan(batch.balances)
+        keep = np.ones(len(batch), dtype=bool)
+        page_starts = [] if pages is None else np.flatnonzero(np.diff(pages)) + 1
+        for rows in np.split(np.arange(len(batch)), page_starts):
+            page = fingerprints[rows][has_balance[rows]]
+            keep[rows] = ~(has_balance[rows] & np.isin(fingerprints[rows], self._earlier))
+            self._earlier = np.union1d(self._earlier, page)
+        return batch if keep.all() else batch.take(keep)
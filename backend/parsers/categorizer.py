@@ -0,0 +1,286 @@
+"""Keyword categorization compiled into an Aho–Corasick automaton.
+
+Categorizers used to rebuild their keyword dict on every call and test
+every keyword of every category with `keyword in description`, hundreds
+of substring scans per transaction. A Categorizer compiles a taxonomy (an
+ordered mapping of category to keywords) once into an automaton and finds
+every keyword in one pass over the description. The category listed first
+among those matched wins, exactly as with the old loops.
+
+With word boundaries on, a keyword only matches where its word characters
+are not joined to other word characters, so 'and', 'max' and 'rex' stop
+matching inside 'bandra', 'maximum' or 'rexine' (the same rule as regex
+`\\b`). It is off by default, which keeps plain substring semantics:
+
+    STATEMENT_CATEGORY_WORD_BOUNDARY=1
+
+The parsers' own taxonomies are named entries of the shared taxonomy
+index (see parsers.taxonomy): `Categorizer('india')` maps the index on
+first use and walks its precompiled tables. Taxonomies given as a mapping
+are compiled in the process, with the `ahocorasick` module (pyahocorasick)
+when installed, otherwise a pure-Python automaton.
+
+Categories are memoized per merchant key (see parsers.merchants) in the
+cache shared by all categorizers, so a repeat merchant skips the
+automaton; a miss runs it over the description itself.
+"""
+import os
+import itertools
+from collections import deque
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+try:
+    import ahocorasick
+except ImportError:  # optional C implementation
+    ahocorasick = None
+
+from parsers.merchants import MERCHANT_CACHE, MISSING, CategoryCache, merchant_key
+from parsers.taxonomy import NO_MATCH, TaxonomyTables, get_index, is_word_char
+
+DEFAULT_WORD_BOUNDARY = os.environ.get('STATEMENT_CATEGORY_WORD_BOUNDARY', '0') not in ('0', 'false', 'no', '')
+
+# A name in the taxonomy index, or ordered (category, keywords) pairs
+Taxonomy = Union[str, Mapping[str, Sequence[str]], Iterable[Tuple[str, Sequence[str]]]]
+
+# Keeps the entries of different categorizers apart in the shared cache
+_namespaces = itertools.count()
+
+
+class KeywordAutomaton:
+    """Aho–Corasick automaton over keywords tagged with priorities; lower wins.
+
+    `best(text)` returns the lowest priority of any keyword found in `text`,
+    in a single pass over it.
+    """
+
+    def __init__(self, keywords: Iterable[Tuple[str, int]], word_boundary: bool = False):
+        self.word_boundary = word_boundary
+        # keyword -> lowest priority it was listed with
+        priorities: Dict[str, int] = {}
+        for keyword, priority in keywords:
+            if keyword and (keyword not in priorities or priority < priorities[keyword]):
+                priorities[keyword] = priority
+        self.size = len(priorities)
+        if ahocorasick is not None:
+            self._build_native(priorities)
+        else:
+            self._build(priorities)
+
+    def _output(self, keyword: str, priority: int) -> Tuple[int, int, bool, bool]:
+        # (priority, length, needs a boundary before, needs a boundary after)
+        return priority, len(keyword), is_word_char(keyword[0]), is_word_char(keyword[-1])
+
+    def _build_native(self, priorities: Dict[str, int]):
+        self._native = ahocorasick.Automaton()
+        for keyword, priority in priorities.items():
+            self._native.add_word(keyword, self._output(keyword, priority))
+        if priorities:
+            self._native.make_automaton()
+
+    def _build(self, priorities: Dict[str, int]):
+        self._native = None
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[List[Tuple[int, int, bool, bool]]] = [[]]
+        for keyword, priority in priorities.items():
+            state = 0
+            for char in keyword:
+                following = goto[state].get(char)
+                if following is None:
+                    following = len(goto)
+                    goto[state][char] = following
+                    goto.append({})
+                    outputs.append([])
+                state = following
+            outputs[state].append(self._output(keyword, priority))
+
+        # Breadth-first failure links; each state also reports its failure state's keywords
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, following in goto[state].items():
+                queue.append(following)
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                candidate = goto[fallback].get(char, 0)
+                fail[following] = candidate if candidate != following else 0
+                outputs[following] = outputs[following] + outputs[fail[following]]
+
+        self._goto = goto
+        self._fail = fail
+        # Sorted by priority so the first acceptable output at a position is the best there
+        self._outputs = [sorted(found) for found in outputs]
+        self._best = [found[0][0] if found else None for found in self._outputs]
+
+    def best(self, text: str) -> Optional[int]:
+        if self._native is not None:
+            return self._best_native(text)
+        goto, fail, outputs, best_here = self._goto, self._fail, self._outputs, self._best
+        best = None
+        state = 0
+        for end, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            priority = best_here[state]
+            if priority is None or (best is not None and priority >= best):
+                continue
+            if self.word_boundary:
+                priority = self._first_bounded(text, end, outputs[state], best)
+                if priority is None:
+                    continue
+            best = priority
+            if best == 0:
+                break
+        return best
+
+    def _best_native(self, text: str) -> Optional[int]:
+        if not self.size:
+            return None
+        best = None
+        for end, output in self._native.iter(text):
+            priority = output[0]
+            if best is not None and priority >= best:
+                continue
+            if self.word_boundary and self._first_bounded(text, end, [output], best) is None:
+                continue
+            best = priority
+            if best == 0:
+                break
+        return best
+
+    @staticmethod
+    def _first_bounded(text: str, end: int, found: List[Tuple[int, int, bool, bool]],
+                       best: Optional[int]) -> Optional[int]:
+        """Lowest priority among `found` (keywords ending at `end`) that sits on word boundaries."""
+        after = end + 1
+        for priority, length, left, right in found:
+            if best is not None and priority >= best:
+                return None
+            start = end - length + 1
+            if left and start > 0 and is_word_char(text[start - 1]):
+                continue
+            if right and after < len(text) and is_word_char(text[after]):
+                continue
+            return priority
+        return None
+
+
+def _char_before(data: bytes, index: int) -> str:
+    """The UTF-8 character ending just before byte `index`."""
+    start = index - 1
+    while start > 0 and data[start] & 0xC0 == 0x80:
+        start -= 1
+    return data[start:index].decode('utf-8', 'replace')
+
+
+def _char_at(data: bytes, index: int) -> str:
+    """The UTF-8 character starting at byte `index`."""
+    end = index + 1
+    while end < len(data) and data[end] & 0xC0 == 0x80:
+        end += 1
+    return data[index:end].decode('utf-8', 'replace')
+
+
+class IndexedAutomaton:
+    """KeywordAutomaton's interface over one taxonomy's tables in the shared index.
+
+    Walks the UTF-8 bytes of the text through the dense transition table,
+    which needs no failure links at match time.
+    """
+
+    def __init__(self, tables: TaxonomyTables, word_boundary: bool = False):
+        self.tables = tables
+        self.size = tables.size
+        self.word_boundary = word_boundary
+
+    def best(self, text: str) -> Optional[int]:
+        data = text.encode('utf-8')
+        delta, best_here, width = self.tables.delta, self.tables.best, self.tables.width
+        best = NO_MATCH
+        state = 0
+        for end, code in enumerate(data.translate(self.tables.table)):
+            state = delta[state * width + code]
+            priority = best_here[state]
+            if priority >= best:
+                continue
+            if self.word_boundary:
+                priority = self._first_bounded(data, end, state, best)
+                if priority >= best:
+                    continue
+            best = priority
+            if best == 0:
+                break
+        return None if best == NO_MATCH else best
+
+    def _first_bounded(self, data: bytes, end: int, state: int, best: int) -> int:
+        """Lowest priority below `best` among the keywords ending at `end` that sit on word boundaries."""
+        outputs = self.tables.outputs
+        after = end + 1
+        for entry in range(self.tables.out_start[state], self.tables.out_start[state + 1]):
+            priority, flags = outputs[2 * entry], outputs[2 * entry + 1]
+            if priority >= best:
+                break
+            start = end - (flags >> 2) + 1
+            if flags & 2 and start > 0 and is_word_char(_char_before(data, start)):
+                continue
+            if flags & 1 and after < len(data) and is_word_char(_char_at(data, after)):
+                continue
+            return priority
+        return NO_MATCH
+
+
+class Categorizer:
+    """Assigns the first category of a taxonomy that has a keyword in the description.
+
+    A taxonomy given by name comes from the shared index, mapped on first
+    use; its default category applies unless `default` is given.
+    """
+
+    def __init__(self, taxonomy: Taxonomy, default: Optional[str] = None, word_boundary: Optional[bool] = None,
+                 cache: Optional[CategoryCache] = MERCHANT_CACHE):
+        self.name = taxonomy if isinstance(taxonomy, str) else None
+        self.default = default
+        self.cache = cache
+        self._namespace = next(_namespaces)
+        self.word_boundary = DEFAULT_WORD_BOUNDARY if word_boundary is None else word_boundary
+        self._automaton = None
+        self.categories: List[str] = []
+        if self.name is None:
+            items = list(taxonomy.items() if isinstance(taxonomy, Mapping) else taxonomy)
+            self.categories = [category for category, _keywords in items]
+            self._automaton = KeywordAutomaton(
+                ((keyword.lower(), priority) for priority, (_category, keywords) in enumerate(items)
+                 for keyword in keywords),
+                word_boundary=self.word_boundary
+            )
+
+    @property
+    def automaton(self):
+        if self._automaton is None:
+            tables = get_index().tables(self.name)
+            self.categories = list(tables.categories)
+            if self.default is None:
+                self.default = tables.default
+            self._automaton = IndexedAutomaton(tables, word_boundary=self.word_boundary)
+        return self._automaton
+
+    def categorize(self, description: str) -> Optional[str]:
+        if not description:
+            return self.default
+        if self.cache is None:
+            return self._categorize(description)
+        key = (self._namespace, merchant_key(description))
+        category = self.cache.get(key)
+        if category is MISSING:
+            category = self._categorize(description)
+            self.cache.put(key, category)
+        return category
+
+    def _categorize(self, description: str) -> Optional[str]:
+        priority = self.automaton.best(description.lower())
+        return self.default if priority is None else self.categories[priority]
+
+    def categorize_many(self, descriptions: Iterable[str]) -> List[Optional[str]]:
+        return [self.categorize(description) for description in descriptions]
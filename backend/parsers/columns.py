@@ -0,0 +1,152 @@
+"""Column-aware extraction of statement tables from word boxes.
+
+Bank statements lay transactions out in fixed columns. Rather than
+rebuilding text lines and running regexes over them, the column
+x-boundaries are read once from the table header and every word on the page
+is bucketed into its cell by x position in a single pass. Wrapped
+narrations are joined back onto their transaction row.
+"""
+import os
+import re
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+
+from parsers.document import LINE_TOLERANCE, group_rows
+
+# Deployment-wide default, overridable per call
+DEFAULT_MODE = os.environ.get('STATEMENT_EXTRACTION_MODE', 'regex')
+
+# 'vectorized' matches every text line of the document at once (see kotak_parser.extract_transactions_frame)
+EXTRACTION_MODES = ('regex', 'columns', 'vectorized')
+
+# Header word prefixes per column, checked in order; the first match wins.
+# Words matching nothing (e.g. the 'No' of 'Chq/Ref No') extend the column before them.
+HEADER_KEYWORDS = (
+    ('amount', ('withdrawal(dr)/deposit(cr)', 'amount', 'dr/cr')),
+    ('date', ('date',)),
+    ('narration', ('narration', 'description', 'particulars', 'details', 'remarks')),
+    ('reference', ('chq', 'cheque', 'ref')),
+    ('withdrawal', ('withdrawal', 'debit')),
+    ('deposit', ('deposit', 'credit')),
+    ('balance', ('balance',)),
+)
+
+# Columns whose values are usually right-aligned under their header
+NUMERIC_COLUMNS = ('amount', 'withdrawal', 'deposit', 'balance')
+
+# Columns a wrapped narration line may carry text in
+TEXT_COLUMNS = ('narration', 'reference')
+
+DATE_TOKEN = re.compile(r'^\d{2}[-/.]\d{2}[-/.](?:\d{4}|\d{2})$')
+
+# A wrapped line further below its row than this many word heights starts a new block
+MAX_WRAP_GAP = 2.5
+
+
+def resolve_mode(mode: Optional[str] = None) -> str:
+    """Return a validated extraction mode, falling back to the deployment default."""
+    name = (mode or DEFAULT_MODE or 'regex').strip().lower()
+    if name not in EXTRACTION_MODES:
+        raise ValueError(f"Unknown extraction mode '{mode}'. Choose one of: {', '.join(EXTRACTION_MODES)}")
+    return name
+
+
+def classify_header_word(word: str) -> Optional[str]:
+    """Column key a header word names, or None if it names no column."""
+    lower = word.lower()
+    for key, prefixes in HEADER_KEYWORDS:
+        if lower.startswith(prefixes):
+            return key
+    return None
+
+
+class ColumnLayout:
+    """Column keys and x-boundaries of a statement table, read from its header row."""
+
+    def __init__(self, columns: List[Tuple[str, float, float]], header_bottom: float):
+        self.keys = [key for key, _x0, _x1 in columns]
+        self.header_bottom = header_bottom
+        # boundaries[i] separates column i from column i + 1
+        self.boundaries = []
+        for (_key, _x0, prev_x1), (key, x0, _x1) in zip(columns, columns[1:]):
+            if key in NUMERIC_COLUMNS:
+                # Right-aligned values can start left of their header
+                self.boundaries.append((prev_x1 + x0) / 2)
+            else:
+                self.boundaries.append(x0 - LINE_TOLERANCE)
+
+    @classmethod
+    def from_header(cls, row: List[tuple]) -> Optional['ColumnLayout']:
+        """Build a layout from a row of header words, or None if the row is not a table header."""
+        columns = []
+        for word in row:
+            key = classify_header_word(word[4])
+            if key is None:
+                if columns:
+                    name, x0, _x1 = columns[-1]
+                    columns[-1] = (name, x0, word[2])
+                continue
+            if any(name == key for name, _x0, _x1 in columns):
+                key = 'value_date' if key == 'date' else f'{key}_{len(columns)}'
+            columns.append((key, word[0], word[2]))
+
+        keys = {name for name, _x0, _x1 in columns}
+        if not ({'date', 'balance'} <= keys and 'narration' in keys
+                and keys & {'amount', 'withdrawal', 'deposit'}):
+            return None
+        return cls(columns, max(word[3] for word in row))
+
+    def bucket(self, row: List[tuple]) -> Dict[str, str]:
+        """Split a row of words into {column key: cell text} by word centre."""
+        cells = [[] for _ in self.keys]
+        for word in row:
+            cells[bisect_right(self.boundaries, (word[0] + word[2]) / 2)].append(word[4])
+        return {key: ' '.join(words) for key, words in zip(self.keys, cells) if words}
+
+
+def find_layout(rows: List[List[tuple]]) -> Tuple[Optional[ColumnLayout], int]:
+    """Return the table layout of a page and the index of the first row below its header."""
+    for index, row in enumerate(rows):
+        layout = ColumnLayout.from_header(row)
+        if layout is not None:
+            return layout, index + 1
+    return None, 0
+
+
+def extract_table_rows(words: List[tuple],
+                       layout: Optional[ColumnLayout] = None) -> Tuple[Optional[List[Dict[str, str]]], Optional[ColumnLayout]]:
+    """Extract transaction rows of a page as {column key: cell text} dicts.
+
+    The page's own header is used when it has one, otherwise `layout` (e.g.
+    the previous page's). Rows start at a date cell; lines below a row with
+    text only in the narration or reference columns are wrapped narration
+    and are appended to it. Returns (None, None) when no layout is known.
+    """
+    rows = group_rows(words)
+    page_layout, start = find_layout(rows)
+    if page_layout is not None:
+        layout = page_layout
+    elif layout is None:
+        return None, None
+
+    records = []
+    current = None
+    last_bottom = 0.0
+    for row in rows[start:]:
+        cells = layout.bucket(row)
+        bottom = row[0][3]
+        if DATE_TOKEN.match(cells.get('date', '')):
+            current = cells
+            records.append(current)
+            last_bottom = bottom
+            continue
+        height = max(w[3] - w[1] for w in row)
+        if (current is not None and bottom - last_bottom <= MAX_WRAP_GAP * height
+                and all(key in TEXT_COLUMNS for key in cells)):
+            for key, text in cells.items():
+                current[key] = f"{current[key]} {text}" if key in current else text
+            last_bottom = bottom
+        else:
+            # Footers, totals and other text below the table end the current row
+            current = None
+    return records, layout
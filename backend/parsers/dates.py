@@ -0,0 +1,158 @@
+"""Per-document date conversion.
+
+Parsers used to try every known format on every transaction with
+strptime, paying an exception per miss. A statement uses one date format
+throughout, so a DateParser infers it once from a sample of the document's
+date strings and converts all distinct strings with a single fixed-format
+pandas conversion. Each distinct string is converted once; strings the
+inferred format rejects fall back to trying each format in order, then to
+an optional fallback function, and are memoized as well.
+
+Use one DateParser per document: the inferred format sticks to it.
+"""
+import re
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+import pandas as pd
+
+# Distinct date strings looked at to infer a document's format
+SAMPLE_SIZE = 20
+
+# Formats StatementParser accepts, in its historical order of preference
+STATEMENT_DATE_FORMATS = (
+    '%d %b %Y',      # 06 Nov 2024
+    '%b %d %Y',      # Nov 06 2024
+    '%d %B %Y',      # 06 November 2024
+    '%B %d %Y',      # November 06 2024
+    '%m/%d/%Y',      # 11/06/2024
+    '%d/%m/%Y',      # 06/11/2024
+    '%Y-%m-%d',      # 2024-11-06
+    '%d-%m-%Y',      # 06-11-2024
+    '%b %d, %Y',     # Nov 06, 2024
+    '%d %b, %Y',     # 06 Nov, 2024
+    '%d-%b-%Y',      # 06-Nov-2024
+    '%b-%d-%Y'       # Nov-06-2024
+)
+
+# Kotak statements write DD-MM-YYYY; the others are seen in exports
+KOTAK_DATE_FORMATS = ('%d-%m-%Y', '%d/%m/%Y', '%d.%m.%Y')
+
+# Wallet / UPI app exports: "06/11/2024", "Nov 06, 2024"
+WALLET_DATE_FORMATS = ('%d/%m/%Y', '%b %d, %Y', '%b %d %Y')
+
+
+def _parses(value: str, fmt: str) -> bool:
+    try:
+        datetime.strptime(value, fmt)
+        return True
+    except ValueError:
+        return False
+
+
+def date_from_components(value: str) -> Optional[datetime]:
+    """Day, month and year read from the first three numbers of `value`."""
+    components = re.findall(r'\d+', value)
+    if len(components) < 3:
+        return None
+    day, month, year = map(int, components[:3])
+    if year < 100:
+        year += 2000 if year < 50 else 1900
+    try:
+        return datetime(year, month, day)
+    except ValueError:
+        return None
+
+
+def date_from_text(value: str) -> Optional[datetime]:
+    """Free-form parse of a wallet date; slash dates are always DD/MM/YYYY, so never guessed."""
+    if '/' in value:
+        return None
+    try:
+        return pd.to_datetime(value).to_pydatetime()
+    except (ValueError, OverflowError):
+        return None
+
+
+def not_after_this_year(value: datetime) -> datetime:
+    """Dates parsed into a future year are moved to the current year."""
+    year = datetime.now().year
+    return value.replace(year=year) if value.year > year else value
+
+
+class DateParser:
+    """Converts the date strings of one document, inferring its format once.
+
+    `adjust` is applied to every date a format parsed; `fallback` is tried
+    on strings no format parses and may return None.
+    """
+
+    def __init__(self, formats: Sequence[str], fallback: Optional[Callable[[str], Optional[datetime]]] = None,
+                 adjust: Optional[Callable[[datetime], datetime]] = None):
+        self.formats = tuple(formats)
+        self.fallback = fallback
+        self.adjust = adjust
+        self.format: Optional[str] = None
+        self._memo: Dict[str, Optional[datetime]] = {}
+        self._strings: Dict[str, Optional[str]] = {}
+
+    def infer_format(self, values: Sequence[str]) -> Optional[str]:
+        """The first format that parses every sampled value, else the one that parses the most."""
+        sample = [value for value in values[:SAMPLE_SIZE] if value]
+        if not sample:
+            return None
+        scores = [sum(_parses(value, fmt) for value in sample) for fmt in self.formats]
+        best = max(scores)
+        return self.formats[scores.index(best)] if best else None
+
+    def parse_many(self, values: Iterable[str]) -> List[Optional[datetime]]:
+        """Datetimes for `values` in order; None where nothing parses a value."""
+        values = [value.strip() if value else '' for value in values]
+        pending = [value for value in dict.fromkeys(values) if value not in self._memo]
+        if pending:
+            self._convert(pending)
+        return [self._memo[value] for value in values]
+
+    def parse(self, value: str) -> Optional[datetime]:
+        return self.parse_many([value])[0]
+
+    def format_many(self, values: Iterable[str], out_format: str = '%Y-%m-%d') -> List[Optional[str]]:
+        """parse_many() rendered with `out_format`, formatting each distinct date once."""
+        values = [value.strip() if value else '' for value in values]
+        for value, parsed in zip(values, self.parse_many(values)):
+            if value not in self._strings:
+                self._strings[value] = parsed.strftime(out_format) if parsed is not None else None
+        return [self._strings[value] for value in values]
+
+    def _convert(self, pending: List[str]):
+        if self.format is None:
+            self.format = self.infer_format(pending)
+        converted = [None] * len(pending)
+        if self.format is not None:
+            stamps = pd.to_datetime(pd.Series(pending, dtype=object), format=self.format, errors='coerce')
+            converted = [None if pd.isna(stamp) else stamp.to_pydatetime() for stamp in stamps]
+        for value, parsed in zip(pending, converted):
+            if parsed is None:
+                parsed = self._parse_one(value)
+            elif self.adjust is not None:
+                parsed = self.adjust(parsed)
+            self._memo[value] = parsed
+
+    def _parse_one(self, value: str) -> Optional[datetime]:
+        """A string the document's format rejected: every format in order, then the fallback."""
+        if not value:
+            return None
+        for fmt in self.formats:
+            if fmt == self.format:
+                continue
+            try:
+                parsed = datetime.strptime(value, fmt)
+            except ValueError:
+                continue
+            return self.adjust(parsed) if self.adjust is not None else parsed
+        return self.fallback(value) if self.fallback is not None else None
+
+
+def statement_date_parser() -> DateParser:
+    """DateParser with StatementParser's formats, component fallback and future-year clamp."""
+    return DateParser(STATEMENT_DATE_FORMATS, fallback=date_from_components, adjust=not_after_this_year)
@@ -0,0 +1,288 @@
+import io
+import os
+import hashlib
+import mmap
+import logging
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import fitz  # PyMuPDF
+import pdfplumber
+from pdfminer.pdfparser import PDFSyntaxError
+
+try:
+    from pdfplumber.utils.exceptions import PdfminerException
+except ImportError:  # pdfplumber < 0.11 lets pdfminer's errors through
+    PdfminerException = PDFSyntaxError
+
+logger = logging.getLogger(__name__)
+
+Buffer = Union[bytes, bytearray, memoryview, mmap.mmap]
+
+# Words whose baselines are within this many points are on the same line
+LINE_TOLERANCE = 3.0
+
+
+class PasswordError(ValueError):
+    """The statement is encrypted and no password, or a wrong one, was given."""
+
+
+class UnreadableDocument(ValueError):
+    """The upload is empty, corrupt or not a PDF at all."""
+
+
+def read_source(source) -> Tuple[Optional[str], Optional[Buffer]]:
+    """Split a parser input into (path, buffer); exactly one of them is set.
+
+    Buffers are returned as-is, never copied: bytes, bytearray, memoryview
+    and mmap objects pass straight through, in-memory uploads expose their
+    internal buffer and other file objects are read once.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return os.fspath(source), None
+    if isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+        return None, source
+    if hasattr(source, 'getbuffer'):
+        return None, source.getbuffer()
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    return None, source.read()
+
+
+class BufferReader(io.RawIOBase):
+    """Read-only, seekable file object over a buffer, for pdfplumber, without copying it."""
+
+    def __init__(self, buffer):
+        self._view = memoryview(buffer).cast('B')
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        n = min(len(b), len(self._view) - self._pos)
+        if n <= 0:
+            return 0
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        else:
+            self._pos = len(self._view) + offset
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    def close(self):
+        if not self.closed:
+            self._view.release()
+        super().close()
+
+
+def group_rows(words: List[tuple], tolerance: float = LINE_TOLERANCE) -> List[List[tuple]]:
+    """Group PyMuPDF word boxes into visual rows, top to bottom, each sorted left to right."""
+    rows = []
+    current = []
+    current_y = None
+    for word in sorted(words, key=lambda w: (w[3], w[0])):
+        y = word[3]
+        if current and abs(y - current_y) > tolerance:
+            rows.append(current)
+            current = []
+        if not current:
+            current_y = y
+        current.append(word)
+    if current:
+        rows.append(current)
+    return [sorted(row, key=lambda w: w[0]) for row in rows]
+
+
+def words_to_lines(words: List[tuple], tolerance: float = LINE_TOLERANCE) -> List[str]:
+    """Rebuild visual text rows from PyMuPDF word boxes.
+
+    PyMuPDF emits one line per text span, so a statement table row comes back
+    as five separate lines. Grouping words by baseline gives the same
+    row-per-line layout that pdfplumber produces and the regexes expect.
+    """
+    return [' '.join(w[4] for w in row) for row in group_rows(words, tolerance)]
+
+
+class StatementDocument:
+    """A statement PDF opened once and shared by every stage of a parse.
+
+    The PyMuPDF handle is opened eagerly and serves page count, metadata,
+    page text and word boxes. pdfplumber is only opened, over the same
+    buffer, the first time a page needs its layout analysis.
+
+    Buffers (bytes, bytearray, memoryview, mmap) are handed to both
+    backends without copying, and paths are memory-mapped, so a parse holds
+    one copy of the PDF at most.
+
+    Password-protected statements are decrypted in memory: `password`
+    authenticates the PyMuPDF handle and is passed on to pdfplumber, so no
+    unlocked copy is ever written out. PasswordError is raised when an
+    encrypted statement gets no password or a wrong one, and
+    UnreadableDocument when either backend cannot open the PDF.
+    """
+
+    # Number of times each backend parsed a document, for benchmarks
+    open_counts = {'pymupdf': 0, 'pdfplumber': 0}
+
+    def __init__(self, source, password: Optional[str] = None):
+        if isinstance(source, StatementDocument):
+            password = source.password if password is None else password
+            source = source.source
+        self.path, self.data = read_source(source)
+        self._mmap = None
+        if self.path is not None:
+            with open(self.path, 'rb') as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self.data = self._mmap
+        self._view = memoryview(self.data).cast('B')
+        self._fitz_doc = None
+        self._plumber_pdf = None
+        self._plumber_stream = None
+        try:
+            try:
+                self._fitz_doc = fitz.open(stream=self._view, filetype='pdf')
+            except TypeError:
+                # Older PyMuPDF releases only accept bytes streams
+                self._fitz_doc = fitz.open(stream=self._view.tobytes(), filetype='pdf')
+        except RuntimeError as e:
+            # FileDataError and EmptyFileError are RuntimeErrors
+            self.close()
+            raise UnreadableDocument(f"Could not open the PDF: {str(e)}") from e
+        StatementDocument.open_counts['pymupdf'] += 1
+        # (index, page, text page) of the last page read, so classification and extraction share it
+        self._textpage = None
+        self._content_hashes: Dict[int, str] = {}
+        self.password = password
+        self.is_encrypted = bool(self._fitz_doc.needs_pass)
+        if self.is_encrypted:
+            self._authenticate(password)
+
+    def _authenticate(self, password: Optional[str]):
+        if not password:
+            self.close()
+            raise PasswordError("This statement is password protected. Please provide the PDF password.")
+        if not self._fitz_doc.authenticate(password):
+            self.close()
+            raise PasswordError("Incorrect password for this statement.")
+        logger.info("Decrypted password-protected statement in memory")
+
+    @classmethod
+    def open(cls, source, password: Optional[str] = None) -> 'StatementDocument':
+        return cls(source, password)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._textpage = None
+        if self._fitz_doc is not None:
+            self._fitz_doc.close()
+            self._fitz_doc = None
+        if self._plumber_pdf is not None:
+            self._plumber_pdf.close()
+            self._plumber_stream.close()
+            self._plumber_pdf = None
+        if self._view is not None:
+            try:
+                self._view.release()
+                if self._mmap is not None:
+                    self._mmap.close()
+            except BufferError:
+                # A backend still holds the buffer; it is unmapped once that is collected
+                pass
+            self._view = None
+
+    @property
+    def source(self):
+        """Path or bytes that another process can use to reopen this document."""
+        if self.path is not None:
+            return self.path
+        return self.data if isinstance(self.data, bytes) else bytes(self._view)
+
+    @property
+    def fitz_doc(self):
+        return self._fitz_doc
+
+    @property
+    def plumber_pdf(self):
+        if self._plumber_pdf is None:
+            self._plumber_stream = BufferReader(self._view)
+            try:
+                self._plumber_pdf = pdfplumber.open(self._plumber_stream, password=self.password or '')
+            except (PDFSyntaxError, PdfminerException) as e:
+                self._plumber_stream.close()
+                raise UnreadableDocument(f"Could not open the PDF: {str(e)}") from e
+            StatementDocument.open_counts['pdfplumber'] += 1
+        return self._plumber_pdf
+
+    @property
+    def page_count(self) -> int:
+        return len(self._fitz_doc)
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        return dict(self._fitz_doc.metadata or {})
+
+    def _page_and_textpage(self, index: int):
+        if self._textpage is None or self._textpage[0] != index:
+            page = self._fitz_doc[index]
+            self._textpage = (index, page, page.get_textpage())
+        return self._textpage[1], self._textpage[2]
+
+    def page_words(self, index: int) -> List[tuple]:
+        """PyMuPDF word boxes (x0, y0, x1, y1, word, block, line, word_no) of a page."""
+        page, textpage = self._page_and_textpage(index)
+        return page.get_text('words', textpage=textpage)
+
+    def raw_text(self, index: int) -> str:
+        """PyMuPDF text in content-stream order, one span per line; cheap but unordered."""
+        page, textpage = self._page_and_textpage(index)
+        return page.get_text('text', textpage=textpage)
+
+    def content_hash(self, index: int) -> str:
+        """Digest of a page's content stream, fonts and geometry.
+
+        Identical pages hash alike across different PDFs, which makes the
+        digest usable as a cache key for anything extracted from the page.
+        """
+        digest = self._content_hashes.get(index)
+        if digest is None:
+            page = self._fitz_doc[index]
+            h = hashlib.blake2b(page.read_contents(), digest_size=16)
+            for font in page.get_fonts():
+                # Skip the xref number, which differs between files
+                h.update(repr(font[1:]).encode())
+            h.update(repr((tuple(page.rect), page.rotation)).encode())
+            digest = self._content_hashes[index] = h.hexdigest()
+        return digest
+
+    def has_images(self, index: int) -> bool:
+        return bool(self._fitz_doc[index].get_images())
+
+    def plumber_words(self, index: int) -> List[tuple]:
+        """pdfplumber word boxes of a page in PyMuPDF's (x0, y0, x1, y1, word) layout."""
+        return [(w['x0'], w['top'], w['x1'], w['bottom'], w['text'])
+                for w in self.plumber_pdf.pages[index].extract_words()]
+
+    def page_text(self, index: int) -> str:
+        """Fast page text with one visual row per line."""
+        return '\n'.join(words_to_lines(self.page_words(index)))
+
+    def plumber_text(self, index: int) -> str:
+        """pdfplumber's layout-analysed page text."""
+        return self.plumber_pdf.pages[index].extract_text() or ''
@@ -0,0 +1,266 @@
+"""SQLite-backed queue of parse jobs shared by the web and worker processes.
+
+A large statement no longer has to be parsed inside the request that
+uploaded it. The web process stores the upload as a queued job and
+returns its id; job_worker.py processes, scaled separately, claim jobs
+one at a time, record per-page progress with a partial summary while they
+parse, and store the encoded result. Everything lives in one SQLite file
+(WAL mode, so status reads don't wait on workers' writes), so queued jobs
+survive restarts of either side.
+
+A claimed job is leased to its worker: each progress update renews the
+lease, and a job whose lease runs out (its worker was killed) is queued
+again, up to MAX_ATTEMPTS claims in all. Uploads and passwords are
+dropped from the database as soon as a job finishes, and finished jobs
+are purged after STATEMENT_JOB_TTL seconds.
+
+Statement passwords are never written in plaintext: they are sealed with
+a key derived from STATEMENT_JOB_SECRET, which the web and worker
+processes share through their environment, and unsealed only in the
+worker's memory. Without the secret, password-protected statements cannot
+be queued.
+
+    STATEMENT_JOB_DB      database file (default backend/data/jobs.db)
+    STATEMENT_JOB_LEASE   seconds a worker may go without reporting progress
+    STATEMENT_JOB_TTL     seconds finished jobs and their results are kept
+    STATEMENT_JOB_SECRET  secret sealing queued jobs' passwords
+"""
+import os
+import json
+import time
+import uuid
+import base64
+import sqlite3
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, NamedTuple, Optional
+
+from cryptography.fernet import Fernet, InvalidToken
+
+from parsers.document import Buffer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.environ.get(
+    'STATEMENT_JOB_DB', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'jobs.db'))
+DEFAULT_LEASE_SECONDS = float(os.environ.get('STATEMENT_JOB_LEASE', '120'))
+DEFAULT_TTL_SECONDS = float(os.environ.get('STATEMENT_JOB_TTL', str(24 * 3600)))
+DEFAULT_SECRET = os.environ.get('STATEMENT_JOB_SECRET') or None
+
+# Claims of one job before it is failed instead of retried
+MAX_ATTEMPTS = 3
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    options TEXT NOT NULL,
+    password TEXT,  -- sealed with STATEMENT_JOB_SECRET, never plaintext
+    content BLOB,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    lease_expires REAL,
+    worker TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    pages_done INTEGER NOT NULL DEFAULT 0,
+    page_count INTEGER,
+    progress TEXT,
+    result TEXT,
+    error TEXT,
+    error_status INTEGER
+);
+CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, created_at);
+'''
+
+
+class Job(NamedTuple):
+    """A claimed job: what a worker needs to parse it, password unsealed."""
+    id: str
+    filename: str
+    content: bytes
+    password: Optional[str]
+    options: Dict[str, Any]
+    attempts: int
+
+
+class JobStore:
+    """The jobs table of one SQLite file; safe to use from several threads and processes."""
+
+    def __init__(self, path: Optional[str] = None, lease_seconds: Optional[float] = None,
+                 secret: Optional[str] = None):
+        self.path = path or DEFAULT_DB_PATH
+        self.lease_seconds = DEFAULT_LEASE_SECONDS if lease_seconds is None else lease_seconds
+        secret = secret or DEFAULT_SECRET
+        self._fernet = Fernet(base64.urlsafe_b64encode(hashlib.sha256(secret.encode('utf-8')).digest())) \
+            if secret else None
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as db:
+            db.execute('PRAGMA journal_mode=WAL')
+            db.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """A connection in autocommit mode; statements that must be atomic open their own transaction."""
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def submit(self, filename: str, content: Buffer, password: Optional[str] = None,
+               options: Optional[Dict[str, Any]] = None) -> str:
+        """Queue a parse of `content` and return the new job's id.
+
+        Raises ValueError for a password when no STATEMENT_JOB_SECRET is set to seal it with.
+        """
+        sealed = None
+        if password:
+            if self._fernet is None:
+                raise ValueError("Password-protected statements can only be queued when STATEMENT_JOB_SECRET is set")
+            sealed = self._fernet.encrypt(password.encode('utf-8')).decode('ascii')
+        job_id = uuid.uuid4().hex
+        with self._connect() as db:
+            db.execute('INSERT INTO jobs (id, status, filename, options, password, content, created_at) '
+                       'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                       (job_id, QUEUED, filename, json.dumps(options or {}), sealed, content, time.time()))
+        return job_id
+
+    def _unseal(self, sealed: Optional[str]) -> Optional[str]:
+        """The password sealed by submit(); None when it cannot be unsealed with this store's secret."""
+        if not sealed:
+            return None
+        if self._fernet is None:
+            logger.error("A queued job has a password but STATEMENT_JOB_SECRET is not set in this worker")
+            return None
+        try:
+            return self._fernet.decrypt(sealed.encode('ascii')).decode('utf-8')
+        except InvalidToken:
+            logger.error("A queued job's password was sealed with a different STATEMENT_JOB_SECRET")
+            return None
+
+    def claim(self, worker: str) -> Optional[Job]:
+        """Lease the oldest queued job (or one whose worker's lease ran out) to `worker`, or None."""
+        now = time.time()
+        with self._connect() as db:
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                self._fail_abandoned(db, now)
+                row = db.execute(
+                    'SELECT id, filename, content, password, options, attempts FROM jobs '
+                    'WHERE status = ? OR (status = ? AND lease_expires < ?) ORDER BY created_at LIMIT 1',
+                    (QUEUED, RUNNING, now)).fetchone()
+                if row is None:
+                    db.execute('COMMIT')
+                    return None
+                db.execute('UPDATE jobs SET status = ?, worker = ?, started_at = ?, lease_expires = ?, '
+                           'attempts = attempts + 1, pages_done = 0, progress = NULL WHERE id = ?',
+                           (RUNNING, worker, now, now + self.lease_seconds, row['id']))
+                db.execute('COMMIT')
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+        if row['attempts']:
+            logger.warning(f"Job {row['id']} re-queued after its worker stopped responding (claim {row['attempts'] + 1})")
+        return Job(row['id'], row['filename'], row['content'], self._unseal(row['password']),
+                   json.loads(row['options']), row['attempts'] + 1)
+
+    def _fail_abandoned(self, db: sqlite3.Connection, now: float):
+        """Fail expired jobs that have used up their claims, rather than retry them forever."""
+        db.execute('UPDATE jobs SET status = ?, finished_at = ?, content = NULL, password = NULL, '
+                   'error = ?, error_status = 500 WHERE status = ? AND lease_expires < ? AND attempts >= ?',
+                   (FAILED, now, f"Parsing stopped without finishing {MAX_ATTEMPTS} times", RUNNING, now,
+                    MAX_ATTEMPTS))
+
+    def report_progress(self, job_id: str, worker: str, pages_done: int, page_count: int,
+                        progress: Dict[str, Any]) -> bool:
+        """Record progress and renew the lease; False if the job is no longer leased to `worker`."""
+        now = time.time()
+        with self._connect() as db:
+            updated = db.execute('UPDATE jobs SET pages_done = ?, page_count = ?, progress = ?, lease_expires = ? '
+                                 'WHERE id = ? AND worker = ? AND status = ?',
+                                 (pages_done, page_count, json.dumps(progress), now + self.lease_seconds,
+                                  job_id, worker, RUNNING)).rowcount
+        return bool(updated)
+
+    def finish(self, job_id: str, worker: str, result: str):
+        """Store the encoded result of a job and drop its upload."""
+        self._close(job_id, worker, DONE, result=result)
+
+    def fail(self, job_id: str, worker: str, error: str, error_status: int = 500):
+        """Mark a job failed with the error (and HTTP status) to report."""
+        self._close(job_id, worker, FAILED, error=error, error_status=error_status)
+
+    def _close(self, job_id: str, worker: str, status: str, result: Optional[str] = None,
+               error: Optional[str] = None, error_status: Optional[int] = None):
+        with self._connect() as db:
+            updated = db.execute('UPDATE jobs SET status = ?, finished_at = ?, result = ?, error = ?, error_status = ?, '
+                                 'content = NULL, password = NULL, lease_expires = NULL, pages_done = '
+                                 'COALESCE(page_count, pages_done) WHERE id = ? AND worker = ? AND status = ?',
+                                 (status, time.time(), result, error, error_status, job_id, worker,
+                                  RUNNING)).rowcount
+        if not updated:
+            logger.warning(f"Job {job_id} was re-leased before worker {worker} finished it; result dropped")
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Status, page progress and partial summary of a job, or None for unknown ids."""
+        with self._connect() as db:
+            row = db.execute('SELECT id, status, filename, created_at, started_at, finished_at, attempts, '
+                             'pages_done, page_count, progress, error FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            'id': row['id'],
+            'status': row['status'],
+            'filename': row['filename'],
+            'createdAt': row['created_at'],
+            'startedAt': row['started_at'],
+            'finishedAt': row['finished_at'],
+            'attempts': row['attempts'],
+            'pagesDone': row['pages_done'],
+            'pageCount': row['page_count'],
+            'progress': json.loads(row['progress']) if row['progress'] else None,
+            'error': row['error']
+        }
+
+    def result(self, job_id: str) -> Optional[sqlite3.Row]:
+        """The status, result, error and error_status of a job, or None for unknown ids."""
+        with self._connect() as db:
+            return db.execute('SELECT status, result, error, error_status FROM jobs WHERE id = ?',
+                              (job_id,)).fetchone()
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs per status."""
+        with self._connect() as db:
+            rows = db.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall()
+        counts = {status: 0 for status in (QUEUED, RUNNING, DONE, FAILED)}
+        counts.update((status, count) for status, count in rows)
+        return counts
+
+    def purge(self, ttl_seconds: Optional[float] = None) -> int:
+        """Delete jobs finished more than `ttl_seconds` ago; returns how many."""
+        ttl_seconds = DEFAULT_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        with self._connect() as db:
+            return db.execute('DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?',
+                              (DONE, FAILED, time.time() - ttl_seconds)).rowcount
+
+
+_store: Optional[JobStore] = None
+_store_lock = threading.Lock()
+
+
+def get_job_store() -> JobStore:
+    """The process-wide job store, opened (and its schema created) on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = JobStore()
+        return _store
@@ -1,28 +1,59 @@
+import numpy as np
 import pandas as pd
-import pdfplumber
 import re
 from datetime import datetime
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Optional, Tuple
 from functools import lru_cache
+from contextlib import nullcontext
 import json
 import sys
-import PyPDF2
-from collections import defaultdict
 import logging
-import fitz  # PyMuPDF
 import io
+import os
+import argparse
+
+if __name__ == "__main__":
+    # Allow `python backend/parsers/kotak_parser.py` to import sibling modules as `parsers.*`
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parsers.batch import TransactionBatch, TransactionBuilder
+from parsers.categorizer import Categorizer
+from parsers.columns import extract_table_rows, resolve_mode
+from parsers.dates import KOTAK_DATE_FORMATS, DateParser
+from parsers.document import StatementDocument, words_to_lines
+from parsers.page_cache import MISSING, get_page_cache, page_key
+from parsers.page_classifier import DEFAULT_CLASSIFY, TRANSACTION, classify_text
+from parsers.patterns import (DEFAULT_MATCH_BUDGET, DEFAULT_REGEX_MODE, KOTAK_LINE_PATTERNS, KOTAK_TEXT_PATTERNS,
+                               MatchBudget, MatchBudgetExceeded, get_pattern)
+from parsers.pdf_engine import ExtractionReport, TextExtractor, resolve_engine
+from parsers.prefilter import KOTAK_LINE_PREFILTER
+from parsers.summary import StatementSummary, summarize
+from parsers.serialize import dumps
+from parsers.rules import (Rule, RuleEngine, all_of, amount_above, amount_near, category_lacks, day_of_month_in,
+                           description_contains)
+from parsers.parallel import parse_pages
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-@lru_cache(maxsize=32)
-def parse_kotak_statement(pdf_path: str) -> Dict[str, Any]:
+def parse_kotak_statement(source, workers: Optional[int] = None, engine: Optional[str] = None,
+                          mode: Optional[str] = None, password: Optional[str] = None) -> Dict[str, Any]:
     """
     Parse Kotak Bank statement PDF and extract transaction details.
-    Now with caching to prevent re-processing of the same PDF.
+    Results for file paths are cached to prevent re-processing of the same PDF.
     
     Args:
-        pdf_path (str): Path to the PDF file
+        source: Path to the PDF file, the PDF itself as bytes, bytearray,
+            memoryview or mmap (parsed in place, without copying), or an
+            already open StatementDocument, which the caller keeps open
+        workers (int): Worker processes for page-range sharding (None uses
+            STATEMENT_PARSE_WORKERS, 0 uses every CPU, 1 parses in-process)
+        engine (str): Text extraction engine (see parsers.pdf_engine)
+        mode (str): 'regex' matches rebuilt text lines, 'columns' buckets
+            word boxes into the table's columns (see parsers.columns),
+            'vectorized' matches every candidate line of the document at once
+        password (str): Password of an encrypted statement; it is decrypted
+            in memory and such parses are not cached
         
     Returns:
         Dict containing:
@@ -30,41 +61,66 @@ def parse_kotak_statement(pdf_path: str) -> Dict[str, Any]:
         - summary: Summary of credits, debits, and balance
         - account_info: Account holder details
         - statement_period: Start and end dates
+
+    Raises ValueError (PasswordError among them) when the statement cannot
+    be opened, decrypted or read.
     """
-    # Calculate page count first
-    page_count = len(PyPDF2.PdfReader(pdf_path).pages)
+    mode = resolve_mode(mode)
+    if isinstance(source, (str, os.PathLike)) and password is None:
+        return _parse_kotak_path(os.fspath(source), workers, engine, mode)
+    return _parse_kotak_source(source, workers, engine, mode, password)
+
+@lru_cache(maxsize=32)
+def _parse_kotak_path(pdf_path: str, workers: Optional[int], engine: Optional[str], mode: str) -> Dict[str, Any]:
+    """Path-keyed cache in front of _parse_kotak_source; buffers are never cached."""
+    return _parse_kotak_source(pdf_path, workers, engine, mode)
 
-    print(f"[DEBUG] parse_kotak_statement called with path: {pdf_path}", file=sys.stderr)
-    transactions = []
+def _parse_kotak_source(source, workers: Optional[int], engine: Optional[str], mode: str = 'regex',
+                        password: Optional[str] = None) -> Dict[str, Any]:
+    """Parse a Kotak statement from a path, an in-memory buffer or an open StatementDocument."""
+    page_rows = []
     account_info = {}
     
-    print("[DEBUG] Attempting to open PDF with pdfplumber", file=sys.stderr)
-    with pdfplumber.open(pdf_path) as pdf:
-        print("[DEBUG] Successfully opened PDF with pdfplumber", file=sys.stderr)
+    # Open the PDF once; page count, account info and page text all come from this handle
+    opened = nullcontext(source) if isinstance(source, StatementDocument) else StatementDocument(source, password)
+    with opened as document:
+        page_count = document.page_count
         
         # Extract account information from first page only
-        first_page = pdf.pages[0]
-        text = first_page.extract_text()
+        text = TextExtractor(document, engine=engine).extract_page(0) if page_count else ''
         if not text:
-            print(json.dumps({"error": "Could not extract text from the PDF. Please ensure this is a valid PDF file."}))
-            sys.exit(1)
+            raise ValueError("Could not extract text from the PDF. Please ensure this is a valid PDF file.")
             
         account_info = extract_account_info(text)
-        
-        # Process pages in batches for better memory management
-        batch_size = 5
-        for i in range(0, len(pdf.pages), batch_size):
-            batch_pages = pdf.pages[i:i + batch_size]
-            for page in batch_pages:
-                page_transactions = extract_transactions_from_page(page)
-                transactions.extend(page_transactions)
-                
-    # Sort transactions by date
-    if transactions:
-         transactions.sort(key=lambda x: datetime.strptime(x['date'], '%Y-%m-%d'))
+
+        # Extract and match page ranges, in parallel when workers > 1
+        report = ExtractionReport(resolve_engine(engine))
+        if mode == 'columns':
+            page_fn, layout = extract_transactions_from_words, 'words'
+        elif mode == 'vectorized':
+            page_fn, layout = extract_candidate_lines, 'text'
+        else:
+            page_fn, layout = extract_transactions_from_text, 'text'
+        page_rows = list(parse_pages(document, page_fn, engine=engine, workers=workers,
+                                     report=report, layout=layout))
+        report.log_summary()
+
+    if mode == 'vectorized':
+        # Pages yielded candidate lines; match and convert them all at once, already sorted by date
+        lines = [line for page_lines in page_rows for line in page_lines]
+        batch = TransactionBatch.from_frame(extract_transactions_frame(lines))
+    else:
+        batch = convert_dates(TransactionBuilder.concat(page_rows))
+        # Sort transactions by date, keeping page order within a day
+        batch = batch.sort_by_date()
+    
+    # Categorize transactions
+    batch = categorize_transactions(batch)
     
-    # Calculate summary
-    summary = calculate_summary(transactions)
+    # Totals, counts and chart series from one aggregation
+    statistics = summarize(batch)
+    summary = calculate_summary(statistics)
+    transactions = batch.to_records(TRANSACTION_COLUMNS, date_format='%Y-%m-%d')
     
     # Get statement period
     statement_period = {
@@ -72,20 +128,18 @@ def parse_kotak_statement(pdf_path: str) -> Dict[str, Any]:
         'end_date': transactions[-1]['date'] if transactions else None
     }
     
-    # Categorize transactions
-    categorized_transactions = categorize_transactions(transactions)
-    
     # Prepare the final result dictionary
     final_result = {
-        'transactions': categorized_transactions,
+        'transactions': transactions,
         'summary': summary,
         'account_info': account_info,
         'statement_period': statement_period
     }
     
     final_result['pageCount'] = page_count
+    final_result['parseReport'] = report.as_dict()
     
-    final_result['chartData'] = build_chart_data(categorized_transactions)
+    final_result['chartData'] = build_chart_data(statistics)
     
     return final_result
 
@@ -108,64 +162,41 @@ def extract_account_info(text: str) -> Dict[str, str]:
     
     return info
 
-def extract_transactions_from_page(page) -> List[Dict[str, Any]]:
+def extract_transactions_from_page(page) -> TransactionBuilder:
     """Extract transactions from a single page by extracting text and using regex."""
-    transactions = []
-    
-    # Extract text from page
-    text = page.extract_text()
+    return extract_transactions_from_text(page.page_number, page.extract_text())
+
+def extract_transactions_from_text(page_number: int, text: str) -> TransactionBuilder:
+    """Extract transactions from the text of a single page using regex.
+
+    Raises MatchBudgetExceeded when matching the page runs over its budget.
+    """
+    transactions = TransactionBuilder()
     
     if not text:
-        print(f"[DEBUG] No text extracted from page {page.page_number}", file=sys.stderr)
         return transactions
 
-    print(f"[DEBUG] Extracted text from page {page.page_number}:\n{text[:500]}...", file=sys.stderr) # Print first 500 chars
-    
-    # Refined regex pattern based on observed Kotak statement format:
-    # Date Narration/Description Chq/Ref No Withdrawal(Dr)/Deposit(Cr) Balance
-    # It seems Debit and Credit amounts might be in separate columns or one column with (Dr)/(Cr)
-    # Based on the output, it looks like one amount column followed by (Cr) or (Dr) and then balance.
-    transaction_pattern = re.compile(
-        r'^\s*'  # Optional leading whitespace
-        r'(?P<date>\d{2}-\d{2}-\d{4}|\d{2}-\d{2}-\d{2})\s+' # Date (DD-MM-YYYY or DD-MM-YY)
-        r'(?P<description>.+?)\s+' # Description (non-greedy)
-        # Attempt to capture either a Debit or Credit amount and the Balance
-        # This part is tricky and might need further refinement.
-        # Let's try to match two potential amount columns followed by (Cr) or (Dr) and then balance
-        # Or a single amount column with (Cr) or (Dr) and then balance
-
-        # Pattern for two amount columns (Debit and Credit) and Balance
-        # This seems less likely based on the sample, but including as a possibility.
-        # r'(?P<debit>-?\d{1,3}(?:,\d{3})*(?:\.\d{2})?|\-)?\s+'
-        # r'(?P<credit>-?\d{1,3}(?:,\d{3})*(?:\.\d{2})?|\-)?\s+'
-        # r'(?P<balance>-?\d{1,3}(?:,\d{3})*(?:\.\d{2})?)'
-
-        # Pattern for a single amount column followed by (Cr) or (Dr) and then Balance
-        # This matches the observed format better.
-        r'(?P<amount>-?\d{1,3}(?:,\d{3})*(?:\.\d{2})?)' # Amount - Removed trailing backslash
-        r'\((?P<type>Cr|Dr)\)\s+' # Transaction type (Cr or Dr) in parentheses
-        r'(?P<balance>-?\d{1,3}(?:,\d{3})*(?:\.\d{2})?)' # Balance - Removed trailing backslash
-    )
-    
-    # Split text into lines and process each line
-    lines = text.splitlines()
+    # Only lines that start with a date can be transactions; find them in one pass over the page
+    lines = KOTAK_LINE_PREFILTER.filter(text)
+    discarded = text.count('\n') + 1 - len(lines)
+    logger.debug(f"Page {page_number}: {len(lines)} candidate lines, {discarded} discarded by the prefilter")
+    budget = MatchBudget()
     for line in lines:
         # Skip lines that are likely headers or footers
         if 'Date Narration' in line or 'Withdrawal(Dr)/' in line or 'Statement Summary' in line or 'Page' in line or 'End of Statement' in line:
              continue
 
-        print(f"[DEBUG] Processing line for regex: {line}", file=sys.stderr)
-        match = transaction_pattern.search(line)
+        match = KOTAK_LINE_PATTERNS.match(line, budget)
         if match:
             try:
-                date_str = match.group('date')
-                description = match.group('description').strip()
-                amount_str = match.group('amount')
-                type_str = match.group('type')
-                balance_str = match.group('balance')
+                date_str = match.date
+                description = match.description.strip()
+                amount_str = match.amount
+                type_str = match.type
+                balance_str = match.balance
                 
-                # Parse date and amounts using existing functions
-                date = parse_date(date_str)
+                # Parse amounts; the raw date is converted with the rest of the document's
+                date = date_str
                 amount = parse_amount(amount_str)
                 balance = parse_amount(balance_str)
                 
@@ -175,38 +206,120 @@ def extract_transactions_from_page(page) -> List[Dict[str, Any]]:
                 else:
                     amount = abs(amount) # Ensure credit amounts are positive
                 
-                transaction = {
-                    'date': date,
-                    'description': description,
-                    'amount': amount,
-                    'balance': balance,
-                    'type': 'credit' if amount >= 0 else 'debit',
-                    'category': 'Others' # Default category, will be updated later
-                    # Add other fields if available in regex match
-                }
-                
-                transactions.append(transaction)
-                print(f"[DEBUG] Found transaction: {transaction}", file=sys.stderr)
+                # Category 'Others' by default, will be updated later
+                transactions.append(date, amount, description, 'Others', balance=balance)
                 
             except Exception as e:
-                print(f"[ERROR] Error parsing matched transaction line \'{line}': {e}", file=sys.stderr)
+                logger.warning(f"Error parsing matched transaction line '{line}': {e}")
 
-    print(f"[DEBUG] Finished processing page {page.page_number}. Found {len(transactions)} transactions.", file=sys.stderr)
+    logger.debug(f"Finished processing page {page_number}. Found {len(transactions)} transactions.")
     
     return transactions
 
-def parse_date(date_str: str) -> str:
-    """Parse date string to YYYY-MM-DD format."""
-    try:
-        # Handle common date formats in Kotak statements
-        for fmt in ['%d/%m/%Y', '%d-%m-%Y', '%d.%m.%Y']:
-            try:
-                return datetime.strptime(date_str.strip(), fmt).strftime('%Y-%m-%d')
-            except ValueError:
+def extract_transactions_from_words(page_number: int, words: List[tuple]) -> TransactionBuilder:
+    """Extract transactions from the word boxes of a single page by column position.
+
+    Pages without a recognisable table header fall back to the regex path.
+    """
+    rows, _layout = extract_table_rows(words)
+    if rows is None:
+        logger.debug(f"No table header on page {page_number}, falling back to regex")
+        return extract_transactions_from_text(page_number, '\n'.join(words_to_lines(words)))
+
+    transactions = TransactionBuilder()
+    for row in rows:
+        try:
+            amount = _row_amount(row)
+            if amount is None:
                 continue
-        raise ValueError(f"Unable to parse date: {date_str}")
-    except Exception:
-        raise ValueError(f"Invalid date format: {date_str}")
+            # Same description the regex path captures: narration then reference
+            description = ' '.join(row[key] for key in ('narration', 'reference') if key in row)
+            # Category 'Others' by default, will be updated later
+            transactions.append(row['date'], amount, description, 'Others',
+                                balance=parse_amount(row.get('balance', '')))
+        except Exception as e:
+            logger.warning(f"Error parsing table row {row}: {e}")
+
+    logger.debug(f"Finished processing page {page_number}. Found {len(transactions)} transactions.")
+    return transactions
+
+# Header and footer lines the regex path skips, as one pattern for Series.str.contains
+_NOISE_LINES = re.compile(r'Date Narration|Withdrawal\(Dr\)/|Statement Summary|Page|End of Statement')
+
+# The kotak_line pattern as an `re` pattern, for pandas (the registry may hold an RE2 object)
+_KOTAK_LINE = re.compile(get_pattern('kotak_line').pattern)
+
+TRANSACTION_COLUMNS = ['date', 'description', 'amount', 'balance', 'type', 'category']
+
+def extract_candidate_lines(page_number: int, text: str) -> List[str]:
+    """Page step of the vectorized mode: the page's candidate lines, unmatched."""
+    return KOTAK_LINE_PREFILTER.filter(text)
+
+def extract_transactions_frame(lines: List[str]) -> pd.DataFrame:
+    """Match and convert the candidate lines of a whole document column-wise.
+
+    Produces the same rows, fields and values as extract_transactions_from_text
+    over the same lines, sorted by date (stable, like the regex path's sort).
+    """
+    series = pd.Series(lines, dtype=object)
+    series = series[~series.str.contains(_NOISE_LINES)]
+    if DEFAULT_REGEX_MODE == 'safe':
+        # Safe-mode patterns match whitespace-collapsed lines (see parsers.patterns)
+        series = series.str.replace(r'[^\S\n]+', ' ', regex=True)
+    fields = series.str.extract(_KOTAK_LINE).dropna(subset=['date', 'amount'])
+
+    # Rows whose date does not parse are dropped, as convert_dates drops them on the regex path
+    dates = pd.Series(DateParser(KOTAK_DATE_FORMATS).format_many(fields['date']), index=fields.index, dtype=object)
+    fields = fields[dates.notna()]
+    dates = dates[dates.notna()]
+
+    amount = _amount_column(fields['amount']).abs()
+    amount = amount.where(fields['type'] != 'Dr', -amount)
+    frame = pd.DataFrame({
+        'date': dates,
+        'description': fields['description'].str.strip(),
+        'amount': amount,
+        'balance': _amount_column(fields['balance']),
+        'type': np.where(amount >= 0, 'credit', 'debit'),
+        'category': 'Others'
+    }, columns=TRANSACTION_COLUMNS)
+    return frame.sort_values('date', kind='stable').reset_index(drop=True)
+
+def _amount_column(values: pd.Series) -> pd.Series:
+    """parse_amount over a column: currency symbols and commas removed, unparseable as 0.0."""
+    cleaned = values.fillna('').str.strip().str.replace(r'[₹,]', '', regex=True)
+    return pd.to_numeric(cleaned, errors='coerce').fillna(0.0).astype(float)
+
+_AMOUNT_CELL = re.compile(r'(-?[\d,]+(?:\.\d+)?)\s*(?:\(\s*(Cr|Dr)\s*\))?', re.IGNORECASE)
+
+def _row_amount(row: Dict[str, str]) -> Optional[float]:
+    """Signed amount of a table row; a (Dr)/(Cr) marker wins over the column it is in."""
+    for key, sign in (('amount', 0), ('withdrawal', -1), ('deposit', 1)):
+        match = _AMOUNT_CELL.search(row.get(key, ''))
+        if not match:
+            continue
+        amount = parse_amount(match.group(1))
+        if not amount:
+            continue
+        marker = (match.group(2) or '').lower()
+        if marker == 'dr' or (not marker and sign < 0):
+            return -abs(amount)
+        if marker == 'cr' or sign > 0:
+            return abs(amount)
+        return amount
+    return None
+
+def convert_dates(transactions: TransactionBuilder) -> TransactionBatch:
+    """Build the batch of a whole document's rows, converting their raw dates.
+
+    The format is inferred once per document and each distinct date string
+    is converted once; rows whose date does not parse are dropped.
+    """
+    dates = DateParser(KOTAK_DATE_FORMATS).parse_many(transactions.raw_dates)
+    for raw_date, date in zip(transactions.raw_dates, dates):
+        if date is None:
+            logger.warning(f"Invalid date format: {raw_date}")
+    return transactions.build(dates)
 
 def parse_amount(amount_str: str) -> float:
     """Parse amount string to float."""
@@ -220,107 +333,87 @@ def parse_amount(amount_str: str) -> float:
     except ValueError:
         return 0.0
 
-def calculate_summary(transactions: List[Dict[str, Any]]) -> Dict[str, Any]:
+def calculate_summary(statistics: StatementSummary) -> Dict[str, Any]:
     """Calculate summary of transactions."""
-    total_credit = sum(t['amount'] for t in transactions if t['amount'] > 0)
-    total_debit = sum(t['amount'] for t in transactions if t['amount'] < 0)
-    
-    credit_count = sum(1 for t in transactions if t['amount'] > 0)
-    debit_count = sum(1 for t in transactions if t['amount'] < 0)
-    
     return {
-        'total_credit': total_credit,
-        'total_debit': abs(total_debit),
-        'net_balance': total_credit + total_debit,
-        'credit_count': credit_count,
-        'debit_count': debit_count,
-        'total_transactions': len(transactions)
+        'total_credit': statistics.total_received,
+        'total_debit': abs(statistics.total_spent),
+        'net_balance': statistics.net,
+        'credit_count': statistics.credit_count,
+        'debit_count': statistics.debit_count,
+        'total_transactions': len(statistics)
     }
 
-def categorize_transactions(transactions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """Categorize transactions based on description."""
-    # Updated categories based on user's provided list
-    categories = {
-        'Food & Dining': ['swiggy', 'zomato', 'restaurant', 'food', 'dining', 'cafe', 'hotel', 'milk', 'tea', 'coffee'],
-        'Shopping': ['amazon', 'flipkart', 'myntra', 'retail', 'mart', 'shop', 'store', 'market', 'purchase'],
-        'Transport': ['uber', 'ola', 'petrol', 'fuel', 'metro', 'bus', 'train', 'transport', 'auto', 'taxi'],
-        'Bills & Utilities': ['airtel', 'jio', 'vodafone', 'electricity', 'water', 'gas', 'bill', 'dth', 'broadband'],
-        'Recharge': ['recharge', 'mobile recharge', 'phone recharge'],
-        'Entertainment': ['netflix', 'amazon prime', 'hotstar', 'movie', 'game', 'spotify', 'entertainment'],
-        'Health': ['medical', 'hospital', 'pharmacy', 'doctor', 'clinic', 'medicine', 'health'],
-        'Education': ['school', 'college', 'university', 'course', 'training', 'tuition', 'education'],
-        'Transfer': ['transfer', 'sent', 'received', 'upi', 'neft', 'imps', 'payment'],
-        'Finance': ['emi', 'loan', 'insurance', 'investment', 'mutual fund', 'finance', 'bank']
-    }
-    
-    # Ensure a default 'Others' category exists if no keywords match
-    default_category = 'Others'
-    
-    categorized_transactions = []
-    for transaction in transactions:
-        description = transaction['description'].lower() # Convert description to lowercase for case-insensitive matching
-        
-        # Find matching category
-        found_category = default_category
-        for category, keywords in categories.items():
-            if any(keyword in description for keyword in keywords):
-                found_category = category
-                break
-                
-        transaction['category'] = found_category
-        
-        print(f"[DEBUG] Categorized transaction: Description='{transaction['description']}', Category='{transaction['category']}'", file=sys.stderr) # Added logging
-                
-        # The transaction type (UPI, NEFT, etc.) is already being extracted by the regex
-        # in extract_transactions_from_page and included in the description.
-        # The original logic to add 'transaction_type' separately is redundant now.
-        # If specific extraction of transaction type is still needed, the regex in
-        # extract_transactions_from_page should be updated to capture it explicitly.
-        
-        categorized_transactions.append(transaction) # Append to new list
-        
-    return categorized_transactions # Return the new list
+# Categories from the shared taxonomy index ('Others' when no keyword matches); the first category with a keyword
+# in the description wins
+_CATEGORIZER = Categorizer('kotak')
 
-def build_chart_data(transactions):
-    # Group by category and sum amounts
-    category_totals = defaultdict(float)
-    for txn in transactions:
-        category_totals[txn['category']] += abs(txn['amount'])
+def categorize_transactions(batch: TransactionBatch) -> TransactionBatch:
+    """Categorize transactions based on description, once per distinct description."""
+    # The transaction type (UPI, NEFT, etc.) is already being extracted by the regex
+    # in extract_transactions_from_page and included in the description.
+    # The original logic to add 'transaction_type' separately is redundant now.
+    # If specific extraction of transaction type is still needed, the regex in
+    # extract_transactions_from_page should be updated to capture it explicitly.
+    return batch.categorize(_CATEGORIZER.categorize)
 
-    labels = list(category_totals.keys())
-    data = [category_totals[label] for label in labels]
-    backgroundColor = [
-        '#FF6384', '#36A2EB', '#FFCE56', '#4BC0C0', '#9966FF',
-        '#FF9F40', '#FF6384', '#36A2EB', '#FFCE56', '#4BC0C0'
-    ]
+def build_chart_data(statistics: StatementSummary):
+    # Sum of absolute amounts per category, in order of first appearance
+    return statistics.chart_data('magnitude')
 
-    return {
-        'data': {
-            'labels': labels,
-            'datasets': [{
-                'data': data,
-                'backgroundColor': backgroundColor[:len(labels)]
-            }]
-        }
-    }
+# KotakParser rules, checked in order; 'upi' sends the description on to _KOTAK_UPI_CATEGORIES
+_KOTAK_RULES = Categorizer('kotak_rules')
+_KOTAK_UPI_CATEGORIES = Categorizer('kotak_upi')
+# Standard categories
+_KOTAK_CATEGORIES = Categorizer('kotak_standard')
+
+# Post-processing on combined description, amount and date patterns, in priority order
+_KOTAK_POST_RULES = RuleEngine([
+    # Streaming services by amount: monthly bill amounts, allowing small variations
+    Rule('entertainment', all_of(amount_near((199, 299, 399, 499, 999), tolerance=5),
+                                 category_lacks('entertainment'),
+                                 description_contains(('subscription', 'monthly', 'renewal')))),
+    # Salary is a large credit at the end or beginning of the month
+    Rule('income', all_of(amount_above(10000),
+                          day_of_month_in(list(range(1, 8)) + list(range(25, 32))),
+                          category_lacks('salary'))),
+])
 
 class KotakParser:
-    def __init__(self, file_obj):
+    def __init__(self, file_obj, password=None):
+        # An upload object, a path, or the PDF as bytes / memoryview / mmap
         self.file_obj = file_obj
+        # Encrypted statements are decrypted in memory with this password
+        self.password = password
         
     def parse(self):
         """Parse Kotak bank statement PDF with enhanced accuracy"""
         try:
-            pdf_stream = io.BytesIO(self.file_obj.read())
-            doc = fitz.open(stream=pdf_stream, filetype="pdf")
+            document = StatementDocument(self.file_obj, password=self.password)
             all_text = []
+            skipped = 0
+            cache = get_page_cache()
             
             # Extract text with better layout preservation
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-                # Use "text" mode with preserved layout
-                text = page.get_text("text")
+            for page_num in range(document.page_count):
+                # Pages seen in an earlier upload come from the page cache
+                key = page_key(document.content_hash(page_num), 'raw') if cache is not None else None
+                cached = cache.get(key) if cache is not None else MISSING
+                if cached is MISSING:
+                    # Use "text" mode with preserved layout
+                    text = document.raw_text(page_num)
+                    page_type = classify_text(text, document.has_images(page_num))
+                    if cache is not None:
+                        cache.put(key, (page_type, text), persist=not document.is_encrypted)
+                else:
+                    page_type, text = cached
+                # Cover, summary and terms pages never hold transactions
+                if DEFAULT_CLASSIFY and page_type != TRANSACTION:
+                    skipped += 1
+                    continue
                 all_text.append(text)
+            if skipped:
+                logger.info(f"Skipped {skipped} non-transaction pages")
             
             full_text = "\n".join(all_text)
             
@@ -328,18 +421,14 @@ class KotakParser:
             full_text = self._preprocess_text(full_text)
             
             # Extract transactions with Kotak-specific patterns
-            transactions = self._extract_transactions(full_text)
+            batch = self._extract_transactions(full_text, pages=len(all_text))
             
-            if transactions:
-                df = pd.DataFrame(transactions)
-                df['amount'] = pd.to_numeric(df['amount'], errors='coerce')
-                df = df[df['amount'].abs() > 0]
-                df = df.drop_duplicates(subset=['date', 'amount', 'description'])
-                df = df.sort_values('date')
-                df['date'] = pd.to_datetime(df['date'])
+            if len(batch):
+                # The patterns claim the text they match, so no row is extracted twice
+                df = batch.take(batch.amounts != 0).sort_by_date().to_frame()
                 
                 # Post-process to improve categorization
-                df['category'] = df.apply(lambda row: self._post_process_category(row), axis=1)
+                df['category'] = _KOTAK_POST_RULES.apply(df)
                 
                 logger.info(f"Successfully extracted {len(df)} transactions from Kotak statement")
                 return df
@@ -351,8 +440,8 @@ class KotakParser:
             logger.error(f"Error parsing Kotak PDF: {str(e)}")
             raise
         finally:
-            if 'doc' in locals():
-                doc.close()
+            if 'document' in locals():
+                document.close()
     
     def _preprocess_text(self, text):
         """Pre-process text to handle Kotak's formatting quirks"""
@@ -372,85 +461,41 @@ class KotakParser:
         
         return text
                 
-    def _extract_transactions(self, text):
+    def _extract_transactions(self, text, pages=1):
         """Extract transactions with Kotak-specific patterns"""
-        transactions = []
+        transactions = TransactionBuilder()
         
-        # Multiple patterns to catch different Kotak statement formats
-        patterns = [
-            # Standard format with explicit columns
-            re.compile(
-                r'(\d{2}-\d{2}-\d{4})\s+'  # Date
-                r'([^0-9]+?)\s+'  # Description (non-greedy, no numbers)
-                r'(?:[A-Z0-9]+\s+)?'  # Optional reference number
-                r'([\d,]+\.\d{2})?\s+'  # Optional withdrawal amount
-                r'([\d,]+\.\d{2})?\s+'  # Optional deposit amount
-                r'([\d,]+\.\d{2})',  # Balance
-                re.MULTILINE
-            ),
-            
-            # Format with Dr/Cr indicators
-            re.compile(
-                r'(\d{2}-\d{2}-\d{4})\s+'  # Date
-                r'([^(]+?)\s+'  # Description
-                r'([\d,]+\.\d{2})\s*\((\w{2})\)',  # Amount with Dr/Cr
-                re.MULTILINE
-            ),
-            
-            # UPI/IMPS specific format
-            re.compile(
-                r'(\d{2}-\d{2}-\d{4})\s+'  # Date
-                r'((?:UPI|IMPS|NEFT|ATM|POS)[^0-9]*?)'  # UPI/IMPS description
-                r'(?:.*?)'  # Any text in between
-                r'([\d,]+\.\d{2})\s*\((\w{2})\)',  # Amount with Dr/Cr
-                re.MULTILINE
-            )
-        ]
-        
-        for pattern in patterns:
-            matches = pattern.finditer(text)
-            for match in matches:
-                try:
-                    if len(match.groups()) >= 5:  # First pattern
-                        date_str = match.group(1)
-                        description = match.group(2).strip()
-                        withdrawal = match.group(3)
-                        deposit = match.group(4)
-                        
-                        if withdrawal and withdrawal.strip():
-                            amount = -float(withdrawal.replace(',', ''))
-                        elif deposit and deposit.strip():
-                            amount = float(deposit.replace(',', ''))
-                        else:
-                            continue
-                            
-                    elif len(match.groups()) >= 4:  # Second or third pattern
-                        date_str = match.group(1)
-                        description = match.group(2).strip()
-                        amount_str = match.group(3).replace(',', '')
-                        txn_type = match.group(4).upper()
-                        
-                        amount = float(amount_str)
-                        if txn_type == 'DR':
-                            amount = -amount
+        # Kotak statement formats, each scanned once over the whole text.
+        # The text spans every page, so it gets the per-page budget once per page.
+        try:
+            matches = KOTAK_TEXT_PATTERNS.findall(text, MatchBudget(DEFAULT_MATCH_BUDGET * max(pages, 1)))
+        except MatchBudgetExceeded as e:
+            logger.error(f"Skipping Kotak statement text: {e}")
+            return TransactionBatch.empty()
+        for match in matches:
+            try:
+                if match.amount is None:  # Separate withdrawal / deposit columns
+                    if match.withdrawal and match.withdrawal.strip():
+                        amount = -float(match.withdrawal.replace(',', ''))
+                    elif match.deposit and match.deposit.strip():
+                        amount = float(match.deposit.replace(',', ''))
                     else:
                         continue
-                    
-                    # Clean up description
-                    description = self._clean_description(description)
-                    date = self._parse_date(date_str)
-                    
-                    # Add transaction with enhanced categorization
-                    transactions.append({
-                        'date': date,
-                        'amount': amount,
-                        'description': description,
-                        'category': self._categorize_transaction(description, amount)
-                    })
-                except Exception as e:
-                    logger.warning(f"Could not process Kotak transaction: {e}")
+                else:  # Single amount with Dr/Cr
+                    amount = float(match.amount.replace(',', ''))
+                    if match.type.upper() == 'DR':
+                        amount = -amount
+                
+                # Clean up description
+                description = self._clean_description(match.description.strip())
+                date = match.date  # converted with the statement's other dates below
+                
+                # Add transaction with enhanced categorization
+                transactions.append(date, amount, description, self._categorize_transaction(description, amount))
+            except Exception as e:
+                logger.warning(f"Could not process Kotak transaction: {e}")
         
-        return transactions
+        return self._parse_dates(transactions)
     
     def _clean_description(self, description):
         """Clean up transaction descriptions"""
@@ -477,71 +522,32 @@ class KotakParser:
             
         return description.strip()
     
-    def _parse_date(self, date_str):
-        """Parse Kotak date formats"""
-        try:
-            # Try common Kotak date formats
-            for fmt in ['%d-%m-%Y', '%d/%m/%Y', '%d.%m.%Y']:
-                try:
-                    return datetime.strptime(date_str, fmt)
-                except:
-                    continue
-                    
-            # If all formats fail, log and return today
-            logger.warning(f"Could not parse date: {date_str}")
-            return datetime.now()
-        except:
-            return datetime.now()
+    def _parse_dates(self, transactions):
+        """Build the batch of a TransactionBuilder; one inferred date format per statement, each distinct date once"""
+        now = datetime.now()
+        dates = DateParser(KOTAK_DATE_FORMATS).parse_many(transactions.raw_dates)
+        for index, date in enumerate(dates):
+            if date is None:
+                # If all formats fail, log and use today
+                logger.warning(f"Could not parse date: {transactions.raw_dates[index]}")
+                dates[index] = now
+        return transactions.build(dates)
     
     def _categorize_transaction(self, description, amount):
         """Kotak-specific transaction categorization"""
         try:
             if not description:
                 return 'miscellaneous expenses'
-                
-            description = description.lower()
             
-            # Kotak-specific patterns
-            if 'salary' in description or 'sal cr' in description:
-                return 'income'
-                
-            if any(x in description for x in ['upi-', 'upi/', 'upi ', 'imps-', 'imps/', 'neft-', 'neft/']):
+            # Kotak-specific patterns, then the standard categories
+            category = _KOTAK_RULES.categorize(description)
+            if category == 'upi':
                 # Further analyze UPI transactions
-                if any(x in description for x in ['swiggy', 'zomato', 'food']):
-                    return 'food'
-                if any(x in description for x in ['uber', 'ola', 'rapido']):
-                    return 'travel'
-                if any(x in description for x in ['amazon', 'flipkart', 'myntra']):
-                    return 'shopping'
-                return 'transfer'
-                
-            if 'atm' in description or 'cash withdrawal' in description:
-                return 'transfer'
-                
-            if 'pos ' in description or 'pos/' in description:
-                # POS is usually shopping
-                return 'shopping'
-                
-            if 'emi' in description or 'loan' in description:
-                return 'finance'
-                
-            # Standard categories
-            categories = {
-                'food': ['restaurant', 'food', 'swiggy', 'zomato', 'dining', 'cafe', 'hotel'],
-                'shopping': ['amazon', 'flipkart', 'myntra', 'retail', 'store', 'shop', 'mall'],
-                'travel': ['uber', 'ola', 'metro', 'petrol', 'fuel', 'travel', 'irctc', 'railway'],
-                'bills': ['electricity', 'water', 'gas', 'mobile', 'phone', 'internet', 'dth', 'recharge'],
-                'entertainment': ['movie', 'netflix', 'prime', 'hotstar', 'subscription'],
-                'finance': ['emi', 'loan', 'interest', 'insurance', 'premium', 'investment'],
-                'health': ['hospital', 'doctor', 'medical', 'pharmacy', 'medicine'],
-                'education': ['school', 'college', 'tuition', 'course', 'fee'],
-                'income': ['salary', 'interest earned', 'dividend', 'refund', 'cashback'],
-                'transfer': ['transfer', 'sent', 'received', 'payment', 'deposit', 'withdraw']
-            }
-            
-            for category, keywords in categories.items():
-                if any(keyword in description for keyword in keywords):
-                    return category
+                return _KOTAK_UPI_CATEGORIES.categorize(description)
+            if category is None:
+                category = _KOTAK_CATEGORIES.categorize(description)
+            if category is not None:
+                return category
                     
             # Amount-based categorization as fallback
             if amount > 10000:  # Large credits often income
@@ -555,45 +561,30 @@ class KotakParser:
         except Exception as e:
             logger.error(f"Error categorizing transaction: {str(e)}")
             return 'miscellaneous expenses'
-    
-    def _post_process_category(self, row):
-        """Post-process categories based on transaction patterns"""
-        # Re-categorize based on combined description and amount patterns
-        description = row['description'].lower() if isinstance(row['description'], str) else ''
-        amount = row['amount']
-        category = row['category']
-        
-        # Monthly patterns
-        recurring_bill_amounts = [199, 299, 399, 499, 999]
-        recurring_amounts_tolerance = 5  # Allow small variations
-        
-        # Check for streaming services by amount
-        if any(abs(abs(amount) - bill) < recurring_amounts_tolerance for bill in recurring_bill_amounts):
-            if 'entertainment' not in category:
-                if any(x in description for x in ['subscription', 'monthly', 'renewal']):
-                    return 'entertainment'
-        
-        # Salary typically comes at month end and is a large credit
-        if amount > 10000 and amount > 0:
-            day = row['date'].day
-            if day >= 25 or day <= 7:  # End or beginning of month
-                if 'salary' not in category:
-                    return 'income'
-        
-        # Keep original category if no post-processing applied
-        return category
 
 # Add a top-level try...except block to catch any error
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("[ERROR] Usage: python kotak_parser.py <pdf_path>", file=sys.stderr)
-        sys.exit(1)
-        
-    pdf_path = sys.argv[1]
+    arg_parser = argparse.ArgumentParser(description='Parse a Kotak Bank statement')
+    arg_parser.add_argument('pdf_path', help='Path to the PDF statement file')
+    arg_parser.add_argument('--workers', type=int, default=None,
+                            help='Worker processes for page-parallel parsing (0 = all CPUs)')
+    arg_parser.add_argument('--engine', default=None,
+                            help='Text extraction engine: auto, pymupdf or pdfplumber')
+    arg_parser.add_argument('--mode', default=None,
+                            help='Extraction mode: regex (text lines), columns (word positions) '
+                                 'or vectorized (all lines at once)')
+    arg_parser.add_argument('--password', default=None,
+                            help='Password of an encrypted statement (decrypted in memory)')
+    args = arg_parser.parse_args()
     
     try:
-        results = parse_kotak_statement(pdf_path)
-        print(json.dumps(results))
+        results = parse_kotak_statement(args.pdf_path, workers=args.workers, engine=args.engine,
+                                        mode=args.mode, password=args.password)
+        print(dumps(results))
+    except ValueError as e:
+        # Wrong passwords and unreadable statements, as a JSON error
+        print(json.dumps({"error": str(e)}))
+        sys.exit(1)
     except Exception as e:
         print(f"[ERROR] An unexpected error occurred: {str(e)}", file=sys.stderr)
         sys.exit(1) 
\ No newline at end of file
@@ -0,0 +1,95 @@
+"""Merchant keys for narrations and a shared merchant-to-category cache.
+
+UPI and IMPS narrations repeat the same merchant with a fresh reference
+number on every row (`UPI/412345678901/swiggy@axis/Swiggy`). merchant_key()
+lowercases a narration and drops its reference numbers, keeping the
+separators around them, so the scheme and the VPA, merchant name or
+NEFT/IMPS counterparty remain as a stable key (`upi//swiggy@axis/swiggy`).
+Keywords such as 'upi/' or 'pos ' match the key wherever they match the
+narration, so narrations sharing a key share their category.
+
+Categorizers look the key up in a bounded LRU shared by all of them before
+running their keyword automaton over the narration, so repeat merchants
+cost a dictionary lookup:
+
+    STATEMENT_MERCHANT_CACHE_SIZE  entries kept (default 50000, 0 disables)
+
+merchant_cache_stats() reports its hit rate.
+"""
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+DEFAULT_MAX_ENTRIES = int(os.environ.get('STATEMENT_MERCHANT_CACHE_SIZE', '50000'))
+
+# Returned by get() on a miss, since None is a legitimate category
+MISSING = object()
+
+# A field of six or more digits, optionally behind one letter (UTRs like N123456789012), between separators
+_REFERENCE = re.compile(r'(?<![^\s/:|-])[a-z]?\d{6,}(?=$|[\s/:|-])')
+
+
+def merchant_key(description: str) -> str:
+    """Lowercased narration without reference numbers, e.g. 'IMPS-554433221100-Ramesh' -> 'imps--ramesh'."""
+    return _REFERENCE.sub('', description.lower())
+
+
+class CategoryCache:
+    """Thread-safe LRU of categories keyed by merchant key, bounded by entry count."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: 'OrderedDict[Hashable, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            value = self._entries.get(key, MISSING)
+            if value is MISSING:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'maxEntries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hitRate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'evictions': self.evictions
+        }
+
+
+# Shared by every Categorizer in the process
+MERCHANT_CACHE: Optional[CategoryCache] = CategoryCache() if DEFAULT_MAX_ENTRIES > 0 else None
+
+
+def merchant_cache_stats() -> Dict[str, Any]:
+    """Hit rate and size of the shared merchant cache; empty when it is disabled."""
+    return MERCHANT_CACHE.stats() if MERCHANT_CACHE is not None else {}
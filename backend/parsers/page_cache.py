@@ -0,0 +1,154 @@
+"""Content-addressed cache of extracted page text and matched rows.
+
+Users re-upload overlapping statements (a 6-month statement after the
+3-month one), so most pages of a new upload have been parsed before. Pages
+are keyed by a digest of their content stream and fonts plus
+EXTRACTOR_VERSION, so a page seen in any earlier upload costs one hash.
+
+Entries live in an in-memory LRU bounded by a byte budget, optionally
+backed by an on-disk tier shared between processes:
+
+    STATEMENT_PAGE_CACHE_BYTES  in-memory budget (default 64 MiB, 0 disables)
+    STATEMENT_PAGE_CACHE_DIR    directory for the on-disk tier (unset disables)
+
+Values are stored pickled, so callers always get a private copy they may
+mutate.
+"""
+import os
+import pickle
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever extraction or row matching changes output, to orphan stale entries
+EXTRACTOR_VERSION = '7'
+
+DEFAULT_MAX_BYTES = int(os.environ.get('STATEMENT_PAGE_CACHE_BYTES', str(64 * 1024 * 1024)))
+DEFAULT_DIRECTORY = os.environ.get('STATEMENT_PAGE_CACHE_DIR') or None
+
+# Returned by get() on a miss, since None is a legitimate cached value
+MISSING = object()
+
+
+def page_key(digest: str, *parts) -> str:
+    """Cache key for one kind of page data, e.g. page_key(digest, 'text', engine).
+
+    Parts must name every setting the data depends on: rows, for example,
+    are keyed by engine, layout, regex mode, taxonomy version, keyword
+    matching and page function.
+    """
+    return ':'.join((EXTRACTOR_VERSION, digest) + tuple(str(part) for part in parts))
+
+
+class PageCache:
+    """Byte-budgeted LRU of pickled page data with an optional on-disk tier."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, directory: Optional[str] = DEFAULT_DIRECTORY):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            blob = self._entries.get(key)
+            if blob is not None:
+                self._entries.move_to_end(key)
+        if blob is None and self.directory:
+            blob = self._read_disk(key)
+            if blob is not None:
+                self._remember(key, blob)
+        if blob is None:
+            self.misses += 1
+            return MISSING
+        self.hits += 1
+        return pickle.loads(blob)
+
+    def put(self, key: str, value: Any, persist: bool = True):
+        """Store `value`; with persist=False it is kept in memory only."""
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self._remember(key, blob)
+        if self.directory and persist:
+            self._write_disk(key, blob)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self.bytes,
+            'maxBytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hitRate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'evictions': self.evictions
+        }
+
+    def _remember(self, key: str, blob: bytes):
+        if len(blob) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= len(previous)
+            self._entries[key] = blob
+            self.bytes += len(blob)
+            while self.bytes > self.max_bytes:
+                _key, evicted = self._entries.popitem(last=False)
+                self.bytes -= len(evicted)
+                self.evictions += 1
+
+    def _disk_path(self, key: str) -> str:
+        name = hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+        return os.path.join(self.directory, name[:2], f'{name}.pkl')
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._disk_path(key), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_disk(self, key: str, blob: bytes):
+        path = self._disk_path(key)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                f.write(blob)
+            # Atomic rename so concurrent workers never read a partial entry
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write page cache entry {path}: {e}")
+
+
+_cache: Optional[PageCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_page_cache() -> Optional[PageCache]:
+    """The process-wide page cache, or None when both tiers are disabled."""
+    global _cache
+    if DEFAULT_MAX_BYTES <= 0 and not DEFAULT_DIRECTORY:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = PageCache()
+        return _cache
@@ -0,0 +1,75 @@
+"""Cheap page classification ahead of full extraction.
+
+Statements carry cover, summary, terms-and-conditions and advertising pages
+besides the transaction table. Each page is classified from its raw PyMuPDF
+text layer (no layout analysis) so only transaction pages are sent through
+the expensive extractor and the transaction regexes.
+"""
+import os
+import re
+
+from parsers.document import StatementDocument
+from parsers.pdf_engine import MIN_PAGE_CHARS, is_low_confidence
+
+# Deployment-wide switch; set STATEMENT_CLASSIFY_PAGES=0 to extract every page
+DEFAULT_CLASSIFY = os.environ.get('STATEMENT_CLASSIFY_PAGES', '1') not in ('0', 'false', 'no')
+
+TRANSACTION = 'transaction'
+SUMMARY = 'summary'
+BOILERPLATE = 'boilerplate'
+SCANNED = 'scanned'
+
+PAGE_TYPES = (TRANSACTION, SUMMARY, BOILERPLATE, SCANNED)
+
+_MONTH = r'(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*'
+
+# A line carrying a date anywhere in it, in any of the formats the parsers accept:
+# bank rows lead with the date, wallet rows often put it mid-line ("Paid to Swiggy on Nov 01, 2024")
+LINE_DATE = re.compile(
+    r'^[^\n]*?(?<![\w/.-])(?:'
+    r'\d{1,2}[-/.]\d{1,2}[-/.]\d{2,4}'                  # 06-11-2024, 06/11/24
+    r'|\d{4}-\d{2}-\d{2}'                              # 2024-11-06
+    r'|\d{1,2}[ -]' + _MONTH + r',?[ -]\d{2,4}'          # 06 Nov 2024, 06-Nov-2024
+    r'|' + _MONTH + r'[ -]\d{1,2},?[ -]\d{2,4}'          # Nov 06, 2024
+    r')\b',
+    re.MULTILINE | re.IGNORECASE
+)
+
+# Column headings of a transaction table; a page naming two of them has a table header
+HEADER_KEYWORDS = ('narration', 'withdrawal', 'deposit', 'particulars', 'description',
+                   'debit', 'credit', 'chq', 'balance')
+
+SUMMARY_KEYWORDS = ('statement summary', 'account summary', 'opening balance', 'closing balance',
+                    'total withdrawal', 'total deposit', 'total debit', 'total credit')
+
+# Lines with a date needed to call a page without a table header a transaction page
+MIN_TRANSACTION_DATES = 2
+
+
+def classify_text(text: str, has_images: bool = False) -> str:
+    """Classify a page from its raw text layer.
+
+    Pages whose text is present but undecodable are kept as transaction
+    pages so the extractor can still try its pdfplumber fallback on them.
+    """
+    stripped = (text or '').strip()
+    if len(stripped) < MIN_PAGE_CHARS:
+        return SCANNED if has_images else BOILERPLATE
+    if is_low_confidence(stripped):
+        return TRANSACTION
+
+    dates = len(LINE_DATE.findall(text))
+    lower = stripped.lower()
+    has_header = sum(1 for keyword in HEADER_KEYWORDS if keyword in lower) >= 2
+    if dates >= MIN_TRANSACTION_DATES or (has_header and dates):
+        return TRANSACTION
+    if any(keyword in lower for keyword in SUMMARY_KEYWORDS):
+        return SUMMARY
+    return BOILERPLATE
+
+
+def classify_page(document: StatementDocument, index: int) -> str:
+    """Classify the zero-based page `index` of an open document."""
+    text = document.raw_text(index)
+    has_images = len(text.strip()) < MIN_PAGE_CHARS and document.has_images(index)
+    return classify_text(text, has_images)
@@ -0,0 +1,241 @@
+import os
+import math
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+from parsers.categorizer import DEFAULT_WORD_BOUNDARY
+from parsers.document import StatementDocument
+from parsers.page_cache import MISSING, PageCache, get_page_cache, page_key
+from parsers.page_classifier import DEFAULT_CLASSIFY, TRANSACTION, classify_page
+from parsers.patterns import DEFAULT_REGEX_MODE, MatchBudgetExceeded
+from parsers.pdf_engine import ExtractionReport, TextExtractor, resolve_engine
+from parsers.taxonomy import TAXONOMY_VERSION
+
+logger = logging.getLogger(__name__)
+
+# Deployment-wide default; 1 keeps parsing in-process, 0 means one worker per CPU
+DEFAULT_WORKERS = int(os.environ.get('STATEMENT_PARSE_WORKERS', '1'))
+
+# Documents shorter than this per worker are not worth the process start-up cost
+MIN_PAGES_PER_WORKER = 4
+
+# Each worker gets this many shards so a slow page range does not stall the pool
+SHARDS_PER_WORKER = 2
+
+PageFn = Callable[[int, Any], Any]
+
+# What page_fn receives for each page: extracted text or word boxes
+LAYOUTS = ('text', 'words')
+
+# Page type of pages whose page_fn ran over its match budget: reported as skipped, never cached,
+# so the next parse tries the page again
+OVER_BUDGET = 'over_budget'
+
+
+def resolve_workers(workers: Optional[int] = None) -> int:
+    """Return the number of worker processes to use; 0 or less means all CPUs."""
+    if workers is None:
+        workers = DEFAULT_WORKERS
+    workers = int(workers)
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    return workers
+
+
+def plan_shards(page_count: int, workers: int) -> List[Tuple[int, int]]:
+    """Split [0, page_count) into contiguous (start, end) page ranges."""
+    if page_count <= 0:
+        return []
+    shard_count = min(page_count, workers * SHARDS_PER_WORKER)
+    shard_size = math.ceil(page_count / shard_count)
+    return [(start, min(start + shard_size, page_count)) for start in range(0, page_count, shard_size)]
+
+
+def _page_reader(extractor: TextExtractor, layout: str):
+    return extractor.extract_words if layout == 'words' else extractor.extract_page
+
+
+def _page_fn_id(page_fn: PageFn) -> str:
+    """Stable name of a page function; part of the cache key of its results."""
+    fn = getattr(page_fn, '__func__', page_fn)
+    return f"{fn.__module__}.{fn.__qualname__}"
+
+
+def _run_page(extractor: TextExtractor, index: int, page_fn: PageFn, read_page,
+              classify: bool) -> Tuple[str, Any]:
+    """Classify and parse one page; returns (page_type, result), result None for skipped pages.
+
+    A page_fn raising MatchBudgetExceeded skips its page as OVER_BUDGET.
+    """
+    if classify:
+        started = time.perf_counter()
+        page_type = classify_page(extractor.document, index)
+        extractor.report.classify_seconds += time.perf_counter() - started
+        if page_type != TRANSACTION:
+            extractor.report.add_skip(index + 1, page_type)
+            return page_type, None
+    text = read_page(index)
+    try:
+        return TRANSACTION, page_fn(index + 1, text)
+    except MatchBudgetExceeded as e:
+        logger.warning(f"Skipping page {index + 1}: {e}")
+        extractor.report.add_skip(index + 1, OVER_BUDGET)
+        return OVER_BUDGET, None
+
+
+def _parse_shard(source, indices: List[int], engine: str, page_fn: PageFn,
+                 layout: str = 'text', classify: bool = False, password: Optional[str] = None):
+    """Worker entry point: open the PDF independently and parse the given pages."""
+    with TextExtractor(source, engine=engine, password=password) as extractor:
+        read_page = _page_reader(extractor, layout)
+        results = [(index,) + _run_page(extractor, index, page_fn, read_page, classify) for index in indices]
+        return results, extractor.report
+
+
+class _PageResultCache:
+    """Page types and page_fn results of one parse, keyed by page content in the page cache."""
+
+    def __init__(self, cache: PageCache, document: StatementDocument, engine: str,
+                 layout: str, page_fn: PageFn, classify: bool):
+        self.cache = cache
+        self.classify = classify
+        self.persist = not document.is_encrypted
+        self.digests = [document.content_hash(index) for index in range(document.page_count)]
+        # Safe and standard patterns may disagree on odd pages, so rows are cached per regex mode;
+        # page functions categorize their rows, so per taxonomy version and keyword matching too
+        self.rows_parts = ('rows', engine, layout, DEFAULT_REGEX_MODE, TAXONOMY_VERSION,
+                           f'wb{int(DEFAULT_WORD_BOUNDARY)}', _page_fn_id(page_fn))
+
+    def lookup(self, index: int) -> Optional[Tuple[str, Any]]:
+        """(page_type, result) of a page seen before, or None."""
+        digest = self.digests[index]
+        if self.classify:
+            page_type = self.cache.get(page_key(digest, 'type'))
+            if page_type is MISSING:
+                return None
+            if page_type != TRANSACTION:
+                return page_type, None
+        rows = self.cache.get(page_key(digest, *self.rows_parts))
+        return None if rows is MISSING else (TRANSACTION, rows)
+
+    def store(self, index: int, page_type: str, result: Any):
+        if page_type == OVER_BUDGET:
+            # Timed out, not found empty: a later parse may well finish the page
+            return
+        digest = self.digests[index]
+        if self.classify:
+            self.cache.put(page_key(digest, 'type'), page_type, self.persist)
+        if page_type == TRANSACTION:
+            self.cache.put(page_key(digest, *self.rows_parts), result, self.persist)
+
+
+def iter_page_results(source, page_fn: PageFn, engine: Optional[str] = None,
+                      workers: Optional[int] = None,
+                      report: Optional[ExtractionReport] = None,
+                      layout: str = 'text',
+                      classify: Optional[bool] = None) -> Iterator[Tuple[int, Any]]:
+    """Yield (page_number, page_fn(page_number, page)) for each page, in page order.
+
+    `page` is the page text, or its word boxes when layout is 'words'. With
+    classify (default STATEMENT_CLASSIFY_PAGES) summary, boilerplate and
+    scanned pages are skipped and counted in the report instead, as are
+    pages whose page_fn raises MatchBudgetExceeded (OVER_BUDGET).
+
+    Pages already in the page cache are answered from it. The rest run
+    in-process or, with more than one worker, in page shards across a
+    process pool; each worker opens the PDF itself and results are yielded
+    back in page order as shards complete.
+    """
+    engine = resolve_engine(engine)
+    workers = resolve_workers(workers)
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown page layout '{layout}'. Choose one of: {', '.join(LAYOUTS)}")
+    if classify is None:
+        classify = DEFAULT_CLASSIFY
+    if report is None:
+        report = ExtractionReport(engine)
+    cache = get_page_cache()
+
+    # Reuse the caller's open document; otherwise open the source once here
+    owns_document = not isinstance(source, StatementDocument)
+    document = StatementDocument(source) if owns_document else source
+    try:
+        page_count = document.page_count
+        results_cache = None
+        cached_rows = {}
+        skipped = set()
+        if cache is not None:
+            results_cache = _PageResultCache(cache, document, engine, layout, page_fn, classify)
+            for index in range(page_count):
+                hit = results_cache.lookup(index)
+                if hit is None:
+                    continue
+                page_type, result = hit
+                if page_type == TRANSACTION:
+                    cached_rows[index] = result
+                    report.cached_pages += 1
+                else:
+                    skipped.add(index)
+                    report.add_skip(index + 1, page_type)
+        misses = [index for index in range(page_count) if index not in cached_rows and index not in skipped]
+
+        workers = min(workers, max(1, len(misses) // MIN_PAGES_PER_WORKER))
+        report.workers = workers
+
+        if workers <= 1:
+            extractor = TextExtractor(document, engine=engine, cache=cache)
+            extractor.report = report
+            read_page = _page_reader(extractor, layout)
+            for index in range(page_count):
+                if index in cached_rows:
+                    yield index + 1, cached_rows.pop(index)
+                elif index not in skipped:
+                    page_type, result = _run_page(extractor, index, page_fn, read_page, classify)
+                    if results_cache is not None:
+                        results_cache.store(index, page_type, result)
+                    if page_type == TRANSACTION:
+                        yield index + 1, result
+            return
+        source = document.source
+        password = document.password
+    finally:
+        if owns_document:
+            document.close()
+
+    shards = [misses[start:end] for start, end in plan_shards(len(misses), workers)]
+    logger.info(f"Parsing {len(misses)} of {page_count} pages in {len(shards)} shards across {workers} processes")
+    cached_order = sorted(cached_rows)
+    next_cached = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_parse_shard, source, indices, engine, page_fn, layout, classify, password)
+                   for indices in shards]
+        try:
+            for future in futures:
+                results, shard_report = future.result()
+                report.merge(shard_report)
+                for index, page_type, result in results:
+                    # Interleave cached pages so results stay in page order
+                    while next_cached < len(cached_order) and cached_order[next_cached] < index:
+                        yield cached_order[next_cached] + 1, cached_rows[cached_order[next_cached]]
+                        next_cached += 1
+                    if results_cache is not None:
+                        results_cache.store(index, page_type, result)
+                    if page_type == TRANSACTION:
+                        yield index + 1, result
+            for index in cached_order[next_cached:]:
+                yield index + 1, cached_rows[index]
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def parse_pages(source, page_fn: PageFn, engine: Optional[str] = None,
+                workers: Optional[int] = None,
+                report: Optional[ExtractionReport] = None,
+                layout: str = 'text',
+                classify: Optional[bool] = None) -> List[Any]:
+    """Run page_fn over every extracted page and return the per-page results in page order."""
+    return [result for _page_number, result in iter_page_results(source, page_fn, engine, workers, report,
+                                                                 layout, classify)]
@@ -0,0 +1,299 @@
+"""Bounded process pool for CPU-bound parsing behind the async API.
+
+Parsing a statement is pure CPU work. Run inline in an `async def`
+endpoint it stalls the event loop, and every other request on that
+worker, for as long as the PDF takes. A ParsePool runs jobs in worker
+processes instead and admits at most `size` running plus `queue_depth`
+waiting jobs; beyond that, run() raises PoolSaturated straight away with
+a retry estimate rather than queueing without bound.
+
+    STATEMENT_POOL_SIZE          worker processes (0 = one per CPU)
+    STATEMENT_POOL_QUEUE         jobs allowed to wait for a free worker
+    STATEMENT_POOL_RETRY_AFTER   seconds suggested to rejected clients
+                                 before any job has finished
+
+Jobs are handed to the executor only once a worker is free, so the
+running and queued counts in stats() are exact and a waiting job can be
+abandoned without ever reaching a process. stream() runs a job that
+produces its result piece by piece, such as a streamed parse, in a worker
+too, relaying each piece back through a queue as it is made; work that
+has to run in the calling process can still take a slot with acquire().
+"""
+import os
+import math
+import time
+import queue
+import asyncio
+import logging
+import functools
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Optional
+
+from parsers.parallel import resolve_workers
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = int(os.environ.get('STATEMENT_POOL_SIZE', '2'))
+DEFAULT_QUEUE_DEPTH = int(os.environ.get('STATEMENT_POOL_QUEUE', '8'))
+DEFAULT_RETRY_AFTER = int(os.environ.get('STATEMENT_POOL_RETRY_AFTER', '5'))
+
+# Seconds a stream relay waits for its next piece before checking whether the worker died
+STREAM_POLL_SECONDS = 0.5
+
+
+class PoolSaturated(RuntimeError):
+    """Every worker is busy and the queue is full; retry after `retry_after` seconds."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Parse queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+def _stream_job(fn: Callable[..., Any], pieces, *args) -> Any:
+    """Worker side of ParsePool.stream(): fn(emit, *args), then None to end the stream."""
+    try:
+        return fn(pieces.put, *args)
+    finally:
+        pieces.put(None)
+
+
+class ParsePool:
+    """A process pool with a fixed number of workers and a bounded wait queue."""
+
+    def __init__(self, size: Optional[int] = None, queue_depth: Optional[int] = None):
+        self.size = resolve_workers(DEFAULT_POOL_SIZE if size is None else size)
+        self.queue_depth = max(0, DEFAULT_QUEUE_DEPTH if queue_depth is None else queue_depth)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Serves the queues stream() relays pieces through; started by the first stream
+        self._manager = None
+        self._lock = threading.Lock()
+        self._running = 0
+        self._waiting: Deque[Future] = deque()
+        self._created = time.monotonic()
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.busy_seconds = 0.0
+        self.wait_seconds = 0.0
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """Await fn(*args) in a worker process; `fn` and its arguments must pickle.
+
+        Raises PoolSaturated when `size` jobs are running and `queue_depth`
+        more are waiting. Exceptions raised by `fn` are re-raised here.
+        """
+        future = self._submit(await self.acquire(), fn, *args)
+        try:
+            return await asyncio.wrap_future(future)
+        except BrokenProcessPool as e:
+            self._restart_if_broken(e)
+            raise
+
+    async def stream(self, fn: Callable[..., Any], *args) -> AsyncIterator[Any]:
+        """Run fn(emit, *args) in a worker process; the returned iterator yields each piece fn emits.
+
+        Admission is as for run() and done before this returns, so
+        PoolSaturated is raised here rather than by the iterator. Pieces must
+        pickle and must not be None. The iterator ends when fn returns and
+        then re-raises any exception of fn's; if the caller stops iterating,
+        fn still runs to the end and keeps its slot until then.
+        """
+        release = await self.acquire()
+        try:
+            pieces = self._get_manager().Queue()
+        except Exception:
+            release(failed=True)
+            raise
+        future = self._submit(release, _stream_job, fn, pieces, *args)
+        return self._relay(future, pieces)
+
+    async def _relay(self, future: Future, pieces) -> AsyncIterator[Any]:
+        loop = asyncio.get_running_loop()
+        while True:
+            finished = future.done()
+            try:
+                piece = await loop.run_in_executor(None, functools.partial(pieces.get, timeout=STREAM_POLL_SECONDS))
+            except queue.Empty:
+                if finished:
+                    # The worker died before it could end the stream
+                    break
+                continue
+            if piece is None:
+                break
+            yield piece
+        try:
+            await asyncio.wrap_future(future)
+        except BrokenProcessPool as e:
+            self._restart_if_broken(e)
+            raise
+
+    def _submit(self, release: Callable[..., None], fn: Callable[..., Any], *args) -> Future:
+        """Hand an admitted job to the executor; `release` is called when it ends."""
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception as e:
+            release(failed=True)
+            self._restart_if_broken(e)
+            raise
+        # The worker is released when the job ends, even if its caller has gone
+        future.add_done_callback(lambda done: release(failed=done.cancelled() or done.exception() is not None))
+        return future
+
+    async def acquire(self) -> Callable[..., None]:
+        """Admit a job and wait for a free slot; returns release(failed=False), to call when the job ends.
+
+        Raises PoolSaturated as run() does. Releasing more than once is a no-op.
+        """
+        with self._lock:
+            if self._running + len(self._waiting) >= self.size + self.queue_depth:
+                self.rejected += 1
+                raise PoolSaturated(self._retry_after())
+            slot = None
+            if self._running < self.size:
+                self._running += 1
+            else:
+                slot = Future()
+                self._waiting.append(slot)
+
+        queued_at = time.monotonic()
+        if slot is not None:
+            try:
+                await asyncio.wrap_future(slot)
+            except asyncio.CancelledError:
+                self._abandon(slot)
+                raise
+        started = time.monotonic()
+        released = False
+
+        def release(failed: bool = False):
+            nonlocal released
+            with self._lock:
+                if released:
+                    return
+                released = True
+            self._release(started, queued_at, failed)
+
+        return release
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.size)
+            return self._executor
+
+    def _get_manager(self):
+        with self._lock:
+            if self._manager is None:
+                self._manager = multiprocessing.Manager()
+            return self._manager
+
+    def _release(self, started: float, queued_at: float, failed: bool):
+        """Account for a finished job and hand its worker to the next waiting job."""
+        with self._lock:
+            self.busy_seconds += time.monotonic() - started
+            self.wait_seconds += started - queued_at
+            if failed:
+                self.failed += 1
+            else:
+                self.completed += 1
+            self._running -= 1
+            next_slot = self._next_slot()
+        if next_slot is not None:
+            next_slot.set_result(None)
+
+    def _abandon(self, slot: Future):
+        """Withdraw a cancelled waiting job, passing on the worker if one was already handed to it."""
+        with self._lock:
+            if slot in self._waiting:
+                self._waiting.remove(slot)
+                return
+            if slot.cancelled():
+                # Skipped by _next_slot, never given a worker
+                return
+            self._running -= 1
+            next_slot = self._next_slot()
+        if next_slot is not None:
+            next_slot.set_result(None)
+
+    def _next_slot(self) -> Optional[Future]:
+        """Claim a free worker for the oldest waiting job still waiting; call with the lock held."""
+        while self._waiting and self._running < self.size:
+            slot = self._waiting.popleft()
+            # Marks the slot running, so its job can no longer be cancelled out of it
+            if slot.set_running_or_notify_cancel():
+                self._running += 1
+                return slot
+        return None
+
+    def _retry_after(self) -> int:
+        """Seconds until the queue has likely drained by one job at the average job time."""
+        finished = self.completed + self.failed
+        if not finished:
+            return DEFAULT_RETRY_AFTER
+        average = self.busy_seconds / finished
+        return max(1, math.ceil(average * (len(self._waiting) + 1) / self.size))
+
+    def _restart_if_broken(self, error: BaseException):
+        """Drop the executor after a worker died, so the next job starts a fresh pool."""
+        if not isinstance(error, BrokenProcessPool):
+            return
+        logger.error(f"Parse pool worker died, restarting the pool: {error}")
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool size, current load and totals since the pool was created."""
+        with self._lock:
+            finished = self.completed + self.failed
+            uptime = time.monotonic() - self._created
+            return {
+                'size': self.size,
+                'queueDepth': self.queue_depth,
+                'running': self._running,
+                'queued': len(self._waiting),
+                'utilization': round(self._running / self.size, 3),
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'busyFraction': round(min(1.0, self.busy_seconds / (self.size * uptime)), 3) if uptime else 0.0,
+                'averageJobSeconds': round(self.busy_seconds / finished, 6) if finished else None,
+                'averageWaitSeconds': round(self.wait_seconds / finished, 6) if finished else None
+            }
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+            manager, self._manager = self._manager, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+        if manager is not None:
+            manager.shutdown()
+
+
+_pool: Optional[ParsePool] = None
+_pool_lock = threading.Lock()
+
+
+def get_parse_pool() -> ParsePool:
+    """The process-wide parse pool, created on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ParsePool()
+            logger.info(f"Parse pool: {_pool.size} workers, queue depth {_pool.queue_depth}")
+        return _pool
+
+
+def shutdown_parse_pool():
+    """Stop the process-wide parse pool's workers, if it was started."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown()
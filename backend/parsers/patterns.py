@@ -0,0 +1,409 @@
+"""Registry of precompiled, named transaction patterns.
+
+Every parser used to carry its own regex list, compiled (or not) on each
+call, and some tested a line with re.search and then searched it again to
+get the match. Patterns now live here, compiled once at import, under a
+name. A PatternSet picks registered patterns in a given order and matches
+each line or page once per pattern, returning TransactionMatch tuples.
+Over a page, every match claims the text it spans: a later match that
+overlaps a claimed span is dropped and its pattern resumes past the span,
+so each transaction line yields one match however many patterns fit it.
+
+Orders can be overridden per deployment with a comma-separated list of
+pattern names in the PatternSet's environment setting, e.g.
+
+    STATEMENT_PATTERNS=kotak_table,day_month_year
+
+Each pattern has a standard form (the historical regex) and a safe form
+that is line-anchored where rows start with their date, crosses at most
+MAX_FIELD_LINES line breaks (multi-line wallet records) and bounds every
+wildcard run, so matching is linear in the page length. Stacked lazy groups and DOTALL `.*?` in the standard forms
+scan quadratically on pages without a trailing amount. Safe mode also
+collapses runs of spaces and tabs to one space before matching, so
+adjacent whitespace groups cannot split a run in many ways; match offsets
+then refer to the collapsed text.
+
+    STATEMENT_REGEX_MODE    safe (default) or standard
+    STATEMENT_MATCH_BUDGET  seconds of matching allowed per page (default 0.5, 0 disables)
+
+Safe forms are compiled with RE2 (the `re2` module) when it is installed,
+otherwise with `re`.
+"""
+import os
+import re
+import time
+import logging
+from bisect import bisect_right
+from typing import Dict, Iterator, List, NamedTuple, Optional, Pattern, Sequence, Tuple
+
+try:
+    import re2
+except ImportError:  # optional linear-time backend
+    re2 = None
+
+logger = logging.getLogger(__name__)
+
+REGEX_MODES = ('safe', 'standard')
+DEFAULT_REGEX_MODE = os.environ.get('STATEMENT_REGEX_MODE', 'safe')
+DEFAULT_MATCH_BUDGET = float(os.environ.get('STATEMENT_MATCH_BUDGET', '0.5'))
+
+# Longest run a wildcard may cover in a safe pattern (descriptions, skipped columns)
+MAX_FIELD_CHARS = 200
+# Most words a safe pattern lets a narration or skipped column span
+MAX_FIELD_WORDS = 40
+# Most line breaks a safe pattern lets a multi-line record span between two fields
+MAX_FIELD_LINES = 4
+
+# Safe-pattern building blocks
+_TEXT = r'[^\n]{0,%d}?' % MAX_FIELD_CHARS  # lazy text within one line
+# Lazy text over at most MAX_FIELD_LINES line breaks; the breaks fix where each line's run ends
+_LINES = r'[^\n]{0,%d}?(?:\n[^\n]{0,%d}?){0,%d}?' % (MAX_FIELD_CHARS, MAX_FIELD_CHARS, MAX_FIELD_LINES)
+_BREAKS = r'[^\S\n]*(?:\n[^\S\n]*){0,%d}' % MAX_FIELD_LINES  # whitespace over at most MAX_FIELD_LINES line breaks
+_SPACE = r'[^\S\n]+'  # whitespace within one line
+_LINE_START = r'^[^\S\n]*'  # line anchor (compile with MULTILINE)
+_WORDS = r'\S+(?: \S+){0,%d}?' % (MAX_FIELD_WORDS - 1)  # lazy run of whole words, after collapsing
+_MONTH = r'(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)'
+
+_INLINE_FLAGS = ((re.IGNORECASE, 'i'), (re.MULTILINE, 'm'), (re.DOTALL, 's'))
+_HORIZONTAL_SPACE = re.compile(r'[^\S\n]+')
+
+
+def resolve_regex_mode(mode: Optional[str] = None) -> str:
+    mode = (mode or DEFAULT_REGEX_MODE).lower()
+    if mode not in REGEX_MODES:
+        raise ValueError(f"Unknown regex mode '{mode}'. Choose one of: {', '.join(REGEX_MODES)}")
+    return mode
+
+
+class TransactionMatch(NamedTuple):
+    """A transaction found by a registered pattern; dates and amounts are the raw matched text."""
+    pattern: str
+    date: str
+    description: Optional[str]
+    amount: Optional[str]
+    type: Optional[str]
+    balance: Optional[str]
+    withdrawal: Optional[str]
+    deposit: Optional[str]
+    time: Optional[str]
+    start: int
+    end: int
+
+
+class MatchBudgetExceeded(RuntimeError):
+    """Matching one page took longer than its budget; the page should be skipped."""
+
+
+class MatchBudget:
+    """Wall-clock allowance for matching one page, checked between matches.
+
+    Python's `re` cannot be interrupted mid-search, so the budget bounds the
+    page only as tightly as its single longest search; safe mode keeps each
+    search short.
+    """
+
+    def __init__(self, seconds: Optional[float] = None):
+        self.seconds = DEFAULT_MATCH_BUDGET if seconds is None else seconds
+        self.started = time.perf_counter()
+
+    def check(self):
+        if self.seconds <= 0:
+            return
+        elapsed = time.perf_counter() - self.started
+        if elapsed > self.seconds:
+            raise MatchBudgetExceeded(f"pattern matching took {elapsed:.2f}s, over the {self.seconds:.2f}s page budget")
+
+
+_registry: Dict[str, Dict[str, Pattern]] = {}
+
+
+def _compile_safe(name: str, pattern: str, flags: int):
+    """Compile a safe form with RE2 when available, falling back to `re`."""
+    if re2 is not None:
+        inline = ''.join(letter for flag, letter in _INLINE_FLAGS if flags & flag)
+        try:
+            return re2.compile(f'(?{inline}){pattern}' if inline else pattern)
+        except Exception as e:
+            logger.warning(f"RE2 rejected transaction pattern '{name}', using re: {e}")
+    return re.compile(pattern, flags)
+
+
+def register_pattern(name: str, pattern: str, flags: int = 0,
+                     safe: Optional[str] = None, safe_flags: Optional[int] = None) -> Pattern:
+    """Compile `pattern` and register it under `name`; it must have a 'date' group.
+
+    `safe` is the linear-time form used in safe mode; patterns that are
+    already bounded to one line may leave it out.
+    """
+    if name in _registry:
+        raise ValueError(f"Transaction pattern '{name}' is already registered")
+    compiled = {
+        'standard': re.compile(pattern, flags),
+        'safe': _compile_safe(name, safe or pattern, flags if safe_flags is None else safe_flags)
+    }
+    for form in compiled.values():
+        if 'date' not in form.groupindex:
+            raise ValueError(f"Transaction pattern '{name}' has no 'date' group")
+    _registry[name] = compiled
+    return compiled['standard']
+
+
+def get_pattern(name: str, mode: Optional[str] = None) -> Pattern:
+    try:
+        return _registry[name][resolve_regex_mode(mode)]
+    except KeyError:
+        raise ValueError(f"Unknown transaction pattern '{name}'. Registered: {', '.join(_registry)}")
+
+
+def registered_patterns(mode: Optional[str] = None) -> Dict[str, Pattern]:
+    mode = resolve_regex_mode(mode)
+    return {name: forms[mode] for name, forms in _registry.items()}
+
+
+def _to_match(name: str, match) -> TransactionMatch:
+    groups = match.groupdict()
+    return TransactionMatch(
+        pattern=name,
+        date=groups['date'],
+        description=groups.get('description', groups.get('narration')),
+        amount=groups.get('amount'),
+        type=groups.get('type'),
+        balance=groups.get('balance'),
+        withdrawal=groups.get('withdrawal'),
+        deposit=groups.get('deposit'),
+        time=groups.get('time'),
+        start=match.start(),
+        end=match.end()
+    )
+
+
+class SpanClaims:
+    """Disjoint [start, end) text spans claimed by accepted matches, kept sorted."""
+
+    def __init__(self):
+        self._starts: List[int] = []
+        self._ends: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def overlap(self, start: int, end: int) -> Optional[Tuple[int, int]]:
+        """The first claimed span overlapping [start, end), or None."""
+        index = bisect_right(self._starts, start)
+        if index and self._ends[index - 1] > start:
+            return self._starts[index - 1], self._ends[index - 1]
+        if index < len(self._starts) and self._starts[index] < end:
+            return self._starts[index], self._ends[index]
+        return None
+
+    def claim(self, start: int, end: int):
+        index = bisect_right(self._starts, start)
+        self._starts.insert(index, start)
+        self._ends.insert(index, end)
+
+
+class PatternSet:
+    """An ordered selection of registered patterns with a single-pass dispatcher.
+
+    `setting` names an environment variable that may override the default
+    order with a comma-separated list of registered pattern names.
+    """
+
+    def __init__(self, names: Sequence[str], setting: Optional[str] = None, mode: Optional[str] = None):
+        override = os.environ.get(setting) if setting else None
+        if override:
+            names = [name.strip() for name in override.split(',') if name.strip()]
+        self.names = tuple(names)
+        self.mode = resolve_regex_mode(mode)
+        self._patterns = [(name, get_pattern(name, self.mode)) for name in self.names]
+        self._collapse = self.mode == 'safe'
+
+    def with_mode(self, mode: Optional[str]) -> 'PatternSet':
+        """The same patterns, in the same order, compiled for `mode`."""
+        if mode is None or resolve_regex_mode(mode) == self.mode:
+            return self
+        return PatternSet(self.names, mode=mode)
+
+    def match(self, line: str, budget: Optional[MatchBudget] = None) -> Optional[TransactionMatch]:
+        """The first pattern, in order, that matches `line`; each pattern is searched once."""
+        if self._collapse:
+            line = _HORIZONTAL_SPACE.sub(' ', line)
+        for name, pattern in self._patterns:
+            found = pattern.search(line)
+            if budget is not None:
+                budget.check()
+            if found:
+                return _to_match(name, found)
+        return None
+
+    def finditer(self, text: str, budget: Optional[MatchBudget] = None) -> Iterator[TransactionMatch]:
+        """The matches of the patterns over `text`, one scan per pattern, in pattern order.
+
+        Each match claims its span; matches overlapping an earlier claim are
+        skipped, and a pattern whose match starts inside a claimed span
+        resumes searching at that span's end. Raises MatchBudgetExceeded once
+        matching has used up `budget`.
+        """
+        if self._collapse:
+            text = _HORIZONTAL_SPACE.sub(' ', text)
+        claims = SpanClaims()
+        for name, pattern in self._patterns:
+            position = 0
+            while position <= len(text):
+                found = pattern.search(text, position)
+                if budget is not None:
+                    budget.check()
+                if not found:
+                    break
+                start, end = found.span()
+                claimed = claims.overlap(start, max(end, start + 1))
+                if claimed is None:
+                    claims.claim(start, end)
+                    yield _to_match(name, found)
+                    position = end if end > start else start + 1
+                elif claimed[0] <= start:
+                    # Inside a claimed span: nothing can start before its end
+                    position = claimed[1]
+                else:
+                    position = start + 1
+            if budget is not None:
+                budget.check()
+
+    def findall(self, text: str, budget: Optional[MatchBudget] = None) -> List[TransactionMatch]:
+        """finditer() collected up front, so an exceeded budget leaves no partial page."""
+        return list(self.finditer(text, budget))
+
+
+# Kotak table row: Date Narration Chq/RefNo Withdrawal(Dr)/Deposit(Cr) Balance
+register_pattern(
+    'kotak_table',
+    r'(?P<date>\d{2}-\d{2}-\d{4})\s+'  # Date (DD-MM-YYYY)
+    r'(?P<narration>.*?)\s+'  # Narration/Description (non-greedy match)
+    r'(?:.*?)\s+'  # Skip Chq/Ref No column (non-capturing, non-greedy)
+    r'(?P<amount>[\d,]+\.?\d{2})\((?P<type>Cr|Dr)\)',  # Amount with Dr/Cr type
+    re.IGNORECASE,
+    safe=(_LINE_START + r'(?P<date>\d{2}-\d{2}-\d{4})' + _SPACE
+          + r'(?P<narration>' + _WORDS + r')' + _SPACE
+          + r'(?:' + _WORDS + r')' + _SPACE
+          + r'(?P<amount>[\d,]{1,20}\.?\d{2})\((?P<type>Cr|Dr)\)'),
+    safe_flags=re.IGNORECASE | re.MULTILINE
+)
+
+# "Nov 06, 2024 <description> DEBIT ₹1,234.00"
+register_pattern(
+    'month_day_year',
+    r'(?P<date>(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s*\d{1,2},\s*\d{4})\s*'
+    r'(?P<description>.*?)'
+    r'(?P<type>DEBIT|CREDIT|Dr|Cr)?\s*'
+    r'(?:₹|Rs\.?)\s*(?P<amount>[\d,]+\.?\d*)',
+    re.IGNORECASE | re.MULTILINE | re.DOTALL,
+    # Records may put the date, time, payee and amount on lines of their own
+    safe=(r'(?P<date>' + _MONTH + r'[^\S\n]*\d{1,2},[^\S\n]*\d{4})' + _BREAKS
+          + r'(?P<description>' + _LINES + r')'
+          + r'(?P<type>DEBIT|CREDIT|Dr|Cr)?' + _BREAKS
+          + r'(?:₹|Rs\.?)' + _BREAKS + r'(?P<amount>[\d,]{1,20}\.?\d{0,6})'),
+    safe_flags=re.IGNORECASE | re.MULTILINE
+)
+
+# "06 Nov 2024 <description> -₹1,234.00"
+register_pattern(
+    'day_month_year',
+    r'(?P<date>\d{1,2}\s*(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s*\d{4})\s*'
+    r'(?P<description>.*?)'
+    r'(?P<amount>[-+]?₹?\s*[\d,]+\.?\d*)',
+    re.IGNORECASE | re.MULTILINE | re.DOTALL,
+    safe=(r'(?P<date>\d{1,2}[^\S\n]*' + _MONTH + r'[^\S\n]*\d{4})' + _BREAKS
+          + r'(?P<description>' + _LINES + r')'
+          + r'(?P<amount>[-+]?₹?' + _BREAKS + r'[\d,]{1,20}\.?\d{0,6})'),
+    safe_flags=re.IGNORECASE | re.MULTILINE
+)
+
+# One Kotak statement line: date, description, amount(Dr|Cr), balance
+register_pattern(
+    'kotak_line',
+    r'^\s*'  # Optional leading whitespace
+    r'(?P<date>\d{2}-\d{2}-\d{4}|\d{2}-\d{2}-\d{2})\s+'  # Date (DD-MM-YYYY or DD-MM-YY)
+    r'(?P<description>.+?)\s+'  # Description (non-greedy)
+    r'(?P<amount>-?\d{1,3}(?:,\d{3})*(?:\.\d{2})?)'  # Amount
+    r'\((?P<type>Cr|Dr)\)\s+'  # Transaction type (Cr or Dr) in parentheses
+    r'(?P<balance>-?\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',  # Balance
+    safe=(r'^\s*(?P<date>\d{2}-\d{2}-\d{4}|\d{2}-\d{2}-\d{2})\s+'
+          r'(?P<description>[^\n]{1,%d}?)\s+' % MAX_FIELD_CHARS
+          + r'(?P<amount>-?\d{1,3}(?:,\d{3})*(?:\.\d{2})?)'
+          r'\((?P<type>Cr|Dr)\)\s+'
+          r'(?P<balance>-?\d{1,3}(?:,\d{3})*(?:\.\d{2})?)')
+)
+
+# Kotak full-text formats (KotakParser); the text is pre-processed so every date starts a line
+register_pattern(
+    'kotak_columns',
+    r'(?P<date>\d{2}-\d{2}-\d{4})\s+'  # Date
+    r'(?P<description>[^0-9]+?)\s+'  # Description (non-greedy, no numbers)
+    r'(?:[A-Z0-9]+\s+)?'  # Optional reference number
+    r'(?P<withdrawal>[\d,]+\.\d{2})?\s+'  # Optional withdrawal amount
+    r'(?P<deposit>[\d,]+\.\d{2})?\s+'  # Optional deposit amount
+    r'(?P<balance>[\d,]+\.\d{2})',  # Balance
+    re.MULTILINE,
+    safe=(_LINE_START + r'(?P<date>\d{2}-\d{2}-\d{4})' + _SPACE
+          + r'(?P<description>[^0-9\n]{1,%d}?)' % MAX_FIELD_CHARS + _SPACE
+          + r'(?:[A-Z0-9]{1,40}' + _SPACE + r')?'
+          + r'(?P<withdrawal>[\d,]{1,20}\.\d{2})?' + _SPACE
+          + r'(?P<deposit>[\d,]{1,20}\.\d{2})?' + _SPACE
+          + r'(?P<balance>[\d,]{1,20}\.\d{2})')
+)
+register_pattern(
+    'kotak_drcr',
+    r'(?P<date>\d{2}-\d{2}-\d{4})\s+'  # Date
+    r'(?P<description>[^(]+?)\s+'  # Description
+    r'(?P<amount>[\d,]+\.\d{2})\s*\((?P<type>\w{2})\)',  # Amount with Dr/Cr
+    re.MULTILINE,
+    safe=(_LINE_START + r'(?P<date>\d{2}-\d{2}-\d{4})' + _SPACE
+          + r'(?P<description>[^(\n]{1,%d}?)' % MAX_FIELD_CHARS + _SPACE
+          + r'(?P<amount>[\d,]{1,20}\.\d{2})[^\S\n]*\((?P<type>\w{2})\)')
+)
+register_pattern(
+    'kotak_upi',
+    r'(?P<date>\d{2}-\d{2}-\d{4})\s+'  # Date
+    r'(?P<description>(?:UPI|IMPS|NEFT|ATM|POS)[^0-9]*?)'  # UPI/IMPS description
+    r'(?:.*?)'  # Any text in between
+    r'(?P<amount>[\d,]+\.\d{2})\s*\((?P<type>\w{2})\)',  # Amount with Dr/Cr
+    re.MULTILINE,
+    safe=(_LINE_START + r'(?P<date>\d{2}-\d{2}-\d{4})' + _SPACE
+          # The standard form's lazy description always stops at the keyword when a row matches
+          + r'(?P<description>(?:UPI|IMPS|NEFT|ATM|POS))'
+          + r'(?:' + _TEXT + r')'
+          + r'(?P<amount>[\d,]{1,20}\.\d{2})[^\S\n]*\((?P<type>\w{2})\)')
+)
+
+# Wallet / UPI app lines (scripts/statement_parser.py), matched one line at a time
+register_pattern(
+    'wallet_typed',  # Date at start, amount at end
+    r'(?P<date>(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s+\d{1,2},?\s+\d{4}).*?'
+    r'(?P<type>(?:CREDIT|DEBIT|Paid|Received)).*?(?:₹|Rs|INR)\s*(?P<amount>\d+(?:,\d+)*(?:\.\d{2})?)',
+    re.IGNORECASE,
+    safe=(r'(?P<date>' + _MONTH + r'\s+\d{1,2},?\s+\d{4})' + _TEXT
+          + r'(?P<type>(?:CREDIT|DEBIT|Paid|Received))' + _TEXT
+          + r'(?:₹|Rs|INR)\s*(?P<amount>\d+(?:,\d+)*(?:\.\d{2})?)')
+)
+register_pattern(
+    'wallet_timed',  # Date with time
+    r'(?P<date>(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s+\d{1,2},?\s+\d{4})\s+'
+    r'(?P<time>\d{1,2}:\d{2}\s*(?:AM|PM)?)\s*(?P<description>.*?)(?:₹|Rs|INR)\s*(?P<amount>\d+(?:,\d+)*(?:\.\d{2})?)',
+    re.IGNORECASE,
+    safe=(r'(?P<date>' + _MONTH + r'\s+\d{1,2},?\s+\d{4})\s+'
+          + r'(?P<time>\d{1,2}:\d{2}\s*(?:AM|PM)?)\s*(?P<description>' + _TEXT + r')'
+          + r'(?:₹|Rs|INR)\s*(?P<amount>\d+(?:,\d+)*(?:\.\d{2})?)')
+)
+register_pattern(
+    'wallet_slash_date',  # Simplified date and amount
+    r'(?P<date>\d{1,2}/\d{1,2}/\d{4}).*?(?:₹|Rs|INR)\s*(?P<amount>\d+(?:,\d+)*(?:\.\d{2})?)',
+    re.IGNORECASE,
+    safe=(r'(?P<date>\d{1,2}/\d{1,2}/\d{4})' + _TEXT
+          + r'(?:₹|Rs|INR)\s*(?P<amount>\d+(?:,\d+)*(?:\.\d{2})?)')
+)
+
+# Pattern orders used by the parsers
+STATEMENT_PATTERNS = PatternSet(('kotak_table', 'month_day_year', 'day_month_year'), 'STATEMENT_PATTERNS')
+KOTAK_LINE_PATTERNS = PatternSet(('kotak_line',), 'KOTAK_LINE_PATTERNS')
+KOTAK_TEXT_PATTERNS = PatternSet(('kotak_columns', 'kotak_drcr', 'kotak_upi'), 'KOTAK_TEXT_PATTERNS')
+WALLET_LINE_PATTERNS = PatternSet(('wallet_typed', 'wallet_timed', 'wallet_slash_date'), 'WALLET_LINE_PATTERNS')
@@ -0,0 +1,225 @@
+import os
+import time
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from parsers.document import StatementDocument
+from parsers.merchants import merchant_cache_stats
+from parsers.prefilter import prefilter_stats
+from parsers.page_cache import MISSING, PageCache, get_page_cache, page_key
+
+logger = logging.getLogger(__name__)
+
+# Deployment-wide default, overridable per call
+DEFAULT_ENGINE = os.environ.get('STATEMENT_PDF_ENGINE', 'auto')
+
+ENGINES = ('auto', 'pymupdf', 'pdfplumber')
+
+# Below these thresholds the fast engine's text is considered unreliable
+MIN_PAGE_CHARS = 20
+MAX_GARBAGE_RATIO = 0.1
+
+def resolve_engine(engine: Optional[str] = None) -> str:
+    """Return a validated engine name, falling back to the deployment default."""
+    name = (engine or DEFAULT_ENGINE or 'auto').strip().lower()
+    if name in ('fitz', 'mupdf'):
+        name = 'pymupdf'
+    if name not in ENGINES:
+        raise ValueError(f"Unknown extraction engine '{engine}'. Choose one of: {', '.join(ENGINES)}")
+    return name
+
+
+def is_low_confidence(text: Optional[str]) -> bool:
+    """True when extracted text is empty, too short or mostly undecodable glyphs."""
+    if not text:
+        return True
+    stripped = text.strip()
+    if len(stripped) < MIN_PAGE_CHARS:
+        return True
+    garbage = sum(1 for ch in stripped if ch == '�' or (not ch.isprintable() and not ch.isspace()))
+    return garbage / len(stripped) > MAX_GARBAGE_RATIO
+
+
+class ExtractionReport:
+    """Which engine produced each page and how long it took."""
+
+    def __init__(self, engine: str):
+        self.engine = engine
+        self.workers = 1
+        self.pages: List[Dict[str, Any]] = []
+        # Pages the classifier kept away from the extractor, and pages over their match budget, by page type
+        self.skipped: Dict[str, int] = {}
+        self.classify_seconds = 0.0
+        # Pages whose rows came straight from the page cache
+        self.cached_pages = 0
+
+    def add_page(self, page_number: int, engine: str, seconds: float, chars: int, fallback: bool = False):
+        self.pages.append({
+            'page': page_number,
+            'engine': engine,
+            'seconds': round(seconds, 6),
+            'chars': chars,
+            'fallback': fallback
+        })
+
+    def add_skip(self, page_number: int, page_type: str):
+        self.skipped[page_type] = self.skipped.get(page_type, 0) + 1
+        logger.debug(f"Skipping {page_type} page {page_number}")
+
+    def merge(self, other: 'ExtractionReport'):
+        """Fold in the report of a shard parsed in another process."""
+        self.pages.extend(other.pages)
+        for page_type, count in other.skipped.items():
+            self.skipped[page_type] = self.skipped.get(page_type, 0) + count
+        self.classify_seconds += other.classify_seconds
+        self.cached_pages += other.cached_pages
+
+    @property
+    def skipped_pages(self) -> int:
+        return sum(self.skipped.values())
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(p['seconds'] for p in self.pages)
+
+    @property
+    def fallback_pages(self) -> int:
+        return sum(1 for p in self.pages if p['fallback'])
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'engine': self.engine,
+            'workers': self.workers,
+            'pageCount': len(self.pages),
+            'fallbackPages': self.fallback_pages,
+            'cachedPages': self.cached_pages,
+            'skippedPages': self.skipped_pages,
+            'skippedByType': dict(self.skipped),
+            'classifySeconds': round(self.classify_seconds, 6),
+            'totalSeconds': round(self.total_seconds, 6),
+            'pages': self.pages,
+            # Process-wide, since the process started: the parse worker that assembled this report
+            # (lines matched in page shards are counted by the shard processes)
+            'merchantCache': merchant_cache_stats(),
+            'prefilter': prefilter_stats()
+        }
+
+    def log_summary(self):
+        logger.info(
+            f"Extracted {len(self.pages)} pages with engine '{self.engine}' in {self.total_seconds:.3f}s "
+            f"({self.fallback_pages} pages fell back to pdfplumber, {self.cached_pages} served from cache, "
+            f"{self.skipped_pages} non-transaction "
+            f"pages skipped: {self.skipped or 'none'})"
+        )
+        if self.skipped.get('scanned'):
+            logger.warning(f"{self.skipped['scanned']} scanned pages have no text layer and were not parsed")
+
+
+class TextExtractor:
+    """Extract page text through a selectable engine over one StatementDocument.
+
+    Engines:
+        pymupdf    - PyMuPDF word boxes regrouped into rows (fast path)
+        pdfplumber - pdfplumber's layout-analysing extract_text()
+        auto       - pymupdf, retrying with pdfplumber only on pages whose
+                     fast text is empty or low confidence
+
+    `source` may be a path, bytes, a file object or an already open
+    StatementDocument; in the last case the caller keeps ownership of it.
+    `password` unlocks encrypted statements in memory.
+    Extracted pages are looked up in and added to the page cache (see
+    parsers.page_cache) unless `cache` is None.
+    """
+
+    def __init__(self, source, engine: Optional[str] = None, cache: Optional[PageCache] = MISSING,
+                 password: Optional[str] = None):
+        self.engine = resolve_engine(engine)
+        self.report = ExtractionReport(self.engine)
+        self.cache = get_page_cache() if cache is MISSING else cache
+        self._owns_document = not isinstance(source, StatementDocument)
+        self.document = StatementDocument(source, password) if self._owns_document else source
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._owns_document:
+            self.document.close()
+
+    @property
+    def page_count(self) -> int:
+        return self.document.page_count
+
+    def _cached(self, index: int, kind: str, extract):
+        if self.cache is None:
+            return extract(index)
+        started = time.perf_counter()
+        key = page_key(self.document.content_hash(index), kind, self.engine)
+        value = self.cache.get(key)
+        if value is MISSING:
+            value = extract(index)
+            # Text of encrypted statements never goes to the on-disk tier
+            self.cache.put(key, value, persist=not self.document.is_encrypted)
+        else:
+            chars = len(value) if kind == 'text' else sum(len(w[4]) for w in value)
+            self.report.add_page(index + 1, 'cache', time.perf_counter() - started, chars)
+        return value
+
+    def extract_page(self, index: int) -> str:
+        """Extract text of the zero-based page `index`, recording engine and timing."""
+        return self._cached(index, 'text', self._extract_page)
+
+    def _extract_page(self, index: int) -> str:
+        started = time.perf_counter()
+        if self.engine == 'pdfplumber':
+            text = self.document.plumber_text(index)
+            self.report.add_page(index + 1, 'pdfplumber', time.perf_counter() - started, len(text))
+            return text
+
+        text = self.document.page_text(index)
+        used = 'pymupdf'
+        fallback = False
+        if self.engine == 'auto' and is_low_confidence(text):
+            try:
+                plumber_text = self.document.plumber_text(index)
+            except Exception as e:
+                logger.warning(f"pdfplumber fallback failed on page {index + 1}: {e}")
+                plumber_text = ''
+            if len(plumber_text.strip()) > len(text.strip()):
+                text = plumber_text
+                used = 'pdfplumber'
+            fallback = True
+        self.report.add_page(index + 1, used, time.perf_counter() - started, len(text), fallback)
+        return text
+
+    def extract_words(self, index: int) -> List[tuple]:
+        """Word boxes (x0, y0, x1, y1, word, ...) of the zero-based page `index`.
+
+        Used by column-aware extraction. Engine selection mirrors
+        extract_page(); auto falls back to pdfplumber when PyMuPDF finds no words.
+        """
+        return self._cached(index, 'words', self._extract_words)
+
+    def _extract_words(self, index: int) -> List[tuple]:
+        started = time.perf_counter()
+        used = 'pdfplumber' if self.engine == 'pdfplumber' else 'pymupdf'
+        fallback = False
+        words = self.document.plumber_words(index) if used == 'pdfplumber' else self.document.page_words(index)
+        if self.engine == 'auto' and not words:
+            try:
+                words = self.document.plumber_words(index)
+            except Exception as e:
+                logger.warning(f"pdfplumber fallback failed on page {index + 1}: {e}")
+            used = 'pdfplumber' if words else used
+            fallback = True
+        chars = sum(len(w[4]) for w in words)
+        self.report.add_page(index + 1, used, time.perf_counter() - started, chars, fallback)
+        return words
+
+    def iter_pages(self) -> Iterator[Tuple[int, str]]:
+        """Yield (page_number, text) for every page, page numbers starting at 1."""
+        for index in range(self.page_count):
+            yield index + 1, self.extract_page(index)
@@ -0,0 +1,73 @@
+"""Line prefilter ahead of the transaction regexes.
+
+Most lines on a statement page (headers, balances, notes, footers) cannot
+start a transaction. A prefilter finds the candidate lines of a whole page
+with one multiline scan for a date token, so the per-line header checks and
+the transaction patterns only see lines that can match.
+
+Each prefilter counts the lines it has seen and discarded in this process;
+prefilter_stats() reports them, and parse reports carry them.
+"""
+import re
+import logging
+import threading
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+class LinePrefilter:
+    """Selects the lines of a text that carry a date token, in one scan.
+
+    With `leading=True` the date must start the line (after whitespace);
+    otherwise it may appear anywhere in it. `token` must not match across a
+    line break.
+    """
+
+    def __init__(self, name: str, token: str, leading: bool = True, flags: int = 0):
+        prefix = r'^[^\S\n]*' if leading else r'^[^\n]*?'
+        self.name = name
+        self._pattern = re.compile(prefix + r'(?:' + token + r')[^\n]*', re.MULTILINE | flags)
+        self._lock = threading.Lock()
+        self.lines = 0
+        self.candidates = 0
+
+    @property
+    def discarded(self) -> int:
+        return self.lines - self.candidates
+
+    def filter(self, text: str) -> List[str]:
+        """The candidate lines of `text`, in order."""
+        if not text:
+            return []
+        found = self._pattern.findall(text)
+        total = text.count('\n') + 1
+        with self._lock:
+            self.lines += total
+            self.candidates += len(found)
+        logger.debug(f"Prefilter '{self.name}' kept {len(found)} of {total} lines")
+        return found
+
+    def stats(self) -> Dict[str, int]:
+        return {'lines': self.lines, 'candidates': self.candidates, 'discarded': self.discarded}
+
+
+_MONTH = r'(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)'
+
+# Kotak rows start with DD-MM-YYYY or DD-MM-YY (the kotak_line pattern)
+KOTAK_LINE_PREFILTER = LinePrefilter('kotak_line', r'\d{2}-\d{2}-(?:\d{4}|\d{2})[^\S\n]')
+
+# Wallet rows carry "Nov 06, 2024" or "06/11/2024" somewhere in the line (the wallet_* patterns)
+WALLET_LINE_PREFILTER = LinePrefilter(
+    'wallet_line',
+    _MONTH + r'[^\S\n]+\d{1,2},?[^\S\n]+\d{4}|\d{1,2}/\d{1,2}/\d{4}',
+    leading=False,
+    flags=re.IGNORECASE
+)
+
+PREFILTERS = (KOTAK_LINE_PREFILTER, WALLET_LINE_PREFILTER)
+
+
+def prefilter_stats() -> Dict[str, Dict[str, int]]:
+    """Lines seen, kept and discarded by each prefilter in this process."""
+    return {prefilter.name: prefilter.stats() for prefilter in PREFILTERS}
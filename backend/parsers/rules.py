@@ -0,0 +1,141 @@
+"""Vectorized category rules over a DataFrame of transactions.
+
+Post-processing rules used to run per row through DataFrame.apply, which
+builds a Series and lowercases the description for every transaction. A
+RuleEngine evaluates each rule as one boolean mask over whole columns
+(amount, day of month, description, current category) and applies the
+rules in priority order: a row takes the category of the first rule that
+fires for it and keeps its own when none does. Adding a rule adds column
+operations, not per-row Python work.
+
+Predicates receive a RuleFrame, which derives columns such as the
+lowercased descriptions once and shares them between rules. Text columns
+are factorized, so text tests run once per distinct value (statements
+repeat the same few narrations and categories) and are spread back to the
+rows with one take.
+"""
+import re
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+class RuleFrame:
+    """Columns of a transaction frame as predicates use them, each derived at most once."""
+
+    def __init__(self, frame: pd.DataFrame, column: str = 'category'):
+        self.frame = frame
+        self.column = column
+        self._derived: Dict[str, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def _get(self, name: str, build: Callable[[], Any]) -> Any:
+        if name not in self._derived:
+            self._derived[name] = build()
+        return self._derived[name]
+
+    @property
+    def amount(self) -> np.ndarray:
+        return self._get('amount', lambda: pd.to_numeric(self.frame['amount'], errors='coerce').to_numpy(float))
+
+    @property
+    def day(self) -> np.ndarray:
+        """Day of month, 0 where the date is missing."""
+        return self._get('day', lambda: pd.to_datetime(self.frame['date']).dt.day.fillna(0).to_numpy(int))
+
+    @property
+    def description(self) -> 'TextColumn':
+        """Lowercased descriptions; '' where the description is not a string."""
+        return self._get('description', lambda: TextColumn(
+            self.frame['description'], lambda value: value.lower() if isinstance(value, str) else ''))
+
+    @property
+    def category(self) -> 'TextColumn':
+        return self._get('category', lambda: TextColumn(self.frame[self.column], str))
+
+
+class TextColumn:
+    """A factorized text column: row i holds values[codes[i]]."""
+
+    def __init__(self, series: pd.Series, normalize: Callable[[Any], str]):
+        self.codes, uniques = pd.factorize(series, use_na_sentinel=False)
+        self.values: List[str] = [normalize(value) for value in uniques]
+
+    def mask(self, test: Callable[[str], bool]) -> np.ndarray:
+        """Rows whose value passes `test`, calling it once per distinct value."""
+        passed = np.fromiter((bool(test(value)) for value in self.values), dtype=bool, count=len(self.values))
+        return passed[self.codes]
+
+
+Predicate = Callable[[RuleFrame], np.ndarray]
+
+
+def _contains_any(column: TextColumn, needles: Iterable[str]) -> np.ndarray:
+    pattern = re.compile('|'.join(re.escape(needle) for needle in needles))
+    return column.mask(pattern.search)
+
+
+def amount_near(amounts: Sequence[float], tolerance: float) -> Predicate:
+    """Absolute amount less than `tolerance` away from any of `amounts`."""
+    targets = np.asarray(amounts, dtype=float)
+    return lambda rows: (np.abs(np.abs(rows.amount)[:, None] - targets) < tolerance).any(axis=1)
+
+
+def amount_above(threshold: float) -> Predicate:
+    """Signed amount above `threshold`, i.e. credits larger than it."""
+    return lambda rows: rows.amount > threshold
+
+
+def day_of_month_in(days: Iterable[int]) -> Predicate:
+    days = sorted(set(days))
+    return lambda rows: np.isin(rows.day, days)
+
+
+def description_contains(keywords: Iterable[str]) -> Predicate:
+    """Lowercased description contains any of `keywords` (lowercase)."""
+    keywords = tuple(keywords)
+    return lambda rows: _contains_any(rows.description, keywords)
+
+
+def category_lacks(text: str) -> Predicate:
+    """Current category does not contain `text`."""
+    return lambda rows: ~_contains_any(rows.category, (text,))
+
+
+def all_of(*predicates: Predicate) -> Predicate:
+    def mask(rows: RuleFrame) -> np.ndarray:
+        result = np.ones(len(rows), dtype=bool)
+        for predicate in predicates:
+            if not result.any():
+                break
+            result &= predicate(rows)
+        return result
+    return mask
+
+
+class Rule(NamedTuple):
+    category: str
+    when: Predicate
+
+
+class RuleEngine:
+    """Rules applied in order; the first rule that fires for a row sets its category."""
+
+    def __init__(self, rules: Sequence[Rule]):
+        self.rules = list(rules)
+
+    def apply(self, frame: pd.DataFrame, column: str = 'category') -> pd.Series:
+        """The new `column` of `frame`; rows no rule fires for keep their value."""
+        result = frame[column].to_numpy(dtype=object, copy=True)
+        rows = RuleFrame(frame, column)
+        undecided = np.ones(len(frame), dtype=bool)
+        for rule in self.rules:
+            if not undecided.any():
+                break
+            fired = rule.when(rows) & undecided
+            result[fired] = rule.category
+            undecided &= ~fired
+        return pd.Series(result, index=frame.index, name=column)
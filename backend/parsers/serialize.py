@@ -0,0 +1,145 @@
+"""JSON encoding of parse results straight from TransactionBatch columns.
+
+Responses used to turn every row into a dict (via DataFrame.to_dict,
+iterrows or per-row strftime) and hand the lot to a generic encoder. Here
+each column is encoded once: dates are formatted once per distinct day,
+descriptions and categories once per distinct string, amounts with
+float repr, and rows are joined from those fragments. dumps() encodes the
+rest of a response with orjson when it is installed and the standard json
+module otherwise; batches inside a response are spliced in as encoded
+fragments, so they are never converted to Python objects.
+
+Non-finite amounts and balances are encoded as null, which both encoders
+agree on and which keeps the output valid JSON.
+"""
+import json
+import math
+import uuid
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from parsers.batch import RECORD_COLUMNS, TransactionBatch
+
+try:
+    import orjson
+except ImportError:  # optional fast encoder
+    orjson = None
+
+ISO_DATETIME = '%Y-%m-%dT%H:%M:%S'
+
+
+class RawJSON(str):
+    """Already-encoded JSON, placed as is by dumps()."""
+
+
+def _default(value: Any) -> Any:
+    """Encode what neither encoder knows natively: numpy scalars and arrays, pandas timestamps."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _plain_floats(value: Any) -> Any:
+    """`value` with non-finite floats as None, for the standard encoder (orjson already does this)."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _plain_floats(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain_floats(item) for item in value]
+    return value
+
+
+def dumps(value: Any) -> str:
+    """Compact JSON of `value`; RawJSON values anywhere in it are inserted verbatim."""
+    value, raw = _extract_raw(value)
+    if orjson is not None:
+        encoded = orjson.dumps(value, default=_default, option=orjson.OPT_SERIALIZE_NUMPY).decode('utf-8')
+    else:
+        encoded = json.dumps(_plain_floats(value), default=_default, ensure_ascii=False, separators=(',', ':'))
+    for token, fragment in raw.items():
+        encoded = encoded.replace(f'"{token}"', fragment, 1)
+    return encoded
+
+
+def _extract_raw(value: Any) -> Tuple[Any, Dict[str, str]]:
+    """`value` with each top-level or nested RawJSON replaced by a unique placeholder string."""
+    raw: Dict[str, str] = {}
+    prefix = uuid.uuid4().hex
+
+    def replace(item):
+        if isinstance(item, RawJSON):
+            token = f'{prefix}:{len(raw)}'
+            raw[token] = str(item)
+            return token
+        if isinstance(item, dict):
+            return {key: replace(entry) for key, entry in item.items()}
+        if isinstance(item, list):
+            return [replace(entry) for entry in item]
+        return item
+
+    return replace(value), raw
+
+
+def _string(value: str) -> str:
+    if orjson is not None:
+        return orjson.dumps(value).decode('utf-8')
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _numbers(values: np.ndarray) -> List[str]:
+    encoded = [repr(value) for value in values.tolist()]
+    for position in np.flatnonzero(~np.isfinite(values)).tolist():
+        encoded[position] = 'null'
+    return encoded
+
+
+def _column(batch: TransactionBatch, column: str, date_format: str,
+            type_labels: Tuple[str, str]) -> List[str]:
+    """The encoded values of one column, each distinct value encoded once."""
+    if column == 'date':
+        unique, inverse = np.unique(batch.dates, return_inverse=True)
+        encoded = [_string(datetime.fromordinal(ordinal).strftime(date_format)) for ordinal in unique.tolist()]
+        return [encoded[position] for position in inverse.tolist()]
+    if column in ('amount', 'balance'):
+        return _numbers(batch.amounts if column == 'amount' else batch.balances)
+    if column == 'description':
+        strings: Dict[str, str] = {}
+        return [strings.get(value) or strings.setdefault(value, _string(value)) for value in batch.descriptions]
+    if column == 'category':
+        encoded = [_string(name) for name in batch.categories]
+        return [encoded[code] for code in batch.category_codes.tolist()]
+    if column == 'type':
+        credit, debit = _string(type_labels[0]), _string(type_labels[1])
+        return [debit if is_debit else credit for is_debit in batch.debits.tolist()]
+    raise ValueError(f"Unknown transaction column '{column}'")
+
+
+def record_fragments(batch: TransactionBatch, columns: Sequence[str] = RECORD_COLUMNS,
+                     date_format: str = ISO_DATETIME, type_labels: Tuple[str, str] = ('credit', 'debit'),
+                     extra: Optional[Dict[str, Any]] = None) -> List[str]:
+    """The JSON object of each row with `columns` (after the keys of `extra`, if given).
+
+    Dates are strings in `date_format`; 'type' is type_labels[0] for credits
+    and type_labels[1] for debits, as in TransactionBatch.to_records.
+    """
+    keyed = []
+    if extra:
+        constant = ','.join(f'{_string(key)}:{dumps(value)}' for key, value in extra.items())
+        keyed.append([constant] * len(batch))
+    for column in columns:
+        key = _string(column) + ':'
+        keyed.append([key + value for value in _column(batch, column, date_format, type_labels)])
+    return ['{' + ','.join(parts) + '}' for parts in zip(*keyed)]
+
+
+def records_json(batch: TransactionBatch, columns: Sequence[str] = RECORD_COLUMNS,
+                 date_format: str = ISO_DATETIME, type_labels: Tuple[str, str] = ('credit', 'debit')) -> RawJSON:
+    """The rows of `batch` as an encoded JSON array, for dumps()."""
+    return RawJSON('[' + ','.join(record_fragments(batch, columns, date_format, type_labels)) + ']')
@@ -0,0 +1,191 @@
+"""Statement totals, category breakdowns and chart series from one aggregation.
+
+Every endpoint used to walk its transactions several times: once for the
+money received, once for the money spent, once per count and once more
+(or once per category) for the breakdown and the chart. A StatementSummary
+folds a TransactionBatch into per-side and per-category accumulators with
+a handful of bincounts over its columns, and every figure the responses
+report is read from those:
+
+    totals        received, spent (negative), net, credit/debit counts
+    categories    signed amount, absolute amount, spending and row counts
+                  per category, in order of first appearance
+
+np.bincount adds each bin's weights in row order, so sums are the same
+floats as a running Python sum over the rows. update() continues the sums
+of earlier batches exactly, for responses that stream page by page.
+"""
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+import numpy as np
+
+from parsers.batch import TransactionBatch, column_sum
+
+CHART_COLORS = [
+    '#FF6384', '#36A2EB', '#FFCE56', '#4BC0C0', '#9966FF',
+    '#FF9F40', '#FF6384', '#36A2EB', '#FFCE56', '#4BC0C0'
+]
+
+# Side of each row: received, spent, or zero amount
+_CREDIT, _DEBIT, _ZERO = 0, 1, 2
+
+# First-row position of categories not seen (or not spent on) yet
+_NEVER = np.iinfo(np.int64).max
+
+
+def _continue_sums(sums: np.ndarray, bins: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """`sums` with each bin's weights added in row order after the bin's current value."""
+    size = len(sums)
+    return np.bincount(np.concatenate((np.arange(size), bins)), weights=np.concatenate((sums, weights)),
+                       minlength=size)
+
+
+class StatementSummary:
+    """Totals and per-category figures of the transactions folded in so far."""
+
+    def __init__(self):
+        self.categories: List[str] = []
+        self._codes: Dict[str, int] = {}
+        self._rows = 0
+        self._side_sums = np.zeros(3)
+        self._side_counts = np.zeros(3, dtype=np.int64)
+        self._amount = np.zeros(0)
+        self._magnitude = np.zeros(0)
+        self._spent = np.zeros(0)
+        self._count = np.zeros(0, dtype=np.int64)
+        self._first_row = np.zeros(0, dtype=np.int64)
+        self._first_spent = np.zeros(0, dtype=np.int64)
+
+    @classmethod
+    def of_records(cls, records: Iterable[Mapping[str, Any]], default_category: str = 'Others') -> 'StatementSummary':
+        """Summary of transaction dicts with 'amount' and, optionally, 'category'."""
+        records = list(records)
+        codes: Dict[str, int] = {}
+        category_codes = np.fromiter((codes.setdefault(record.get('category', default_category), len(codes))
+                                      for record in records), dtype=np.int16, count=len(records))
+        amounts = np.fromiter((record['amount'] for record in records), dtype=np.float64, count=len(records))
+        return cls()._fold(amounts, category_codes, list(codes))
+
+    def update(self, batch: TransactionBatch) -> 'StatementSummary':
+        """Fold in the rows of `batch`, after those already summarized."""
+        return self._fold(batch.amounts, batch.category_codes, batch.categories)
+
+    def _fold(self, amounts: np.ndarray, category_codes: np.ndarray, categories: List[str]) -> 'StatementSummary':
+        rows = len(amounts)
+        if not rows:
+            return self
+        mapping = np.array([self._code(name) for name in categories], dtype=np.intp)
+        codes = mapping[category_codes]
+        self._grow()
+
+        side = np.full(rows, _ZERO, dtype=np.intp)
+        side[amounts > 0] = _CREDIT
+        spent = amounts < 0
+        side[spent] = _DEBIT
+        self._side_sums = _continue_sums(self._side_sums, side, amounts)
+        self._side_counts += np.bincount(side, minlength=3)
+
+        self._amount = _continue_sums(self._amount, codes, amounts)
+        self._magnitude = _continue_sums(self._magnitude, codes, np.abs(amounts))
+        self._spent = _continue_sums(self._spent, codes[spent], amounts[spent])
+        self._count += np.bincount(codes, minlength=len(self.categories))
+
+        positions = self._rows + np.arange(rows, dtype=np.int64)
+        np.minimum.at(self._first_row, codes, positions)
+        np.minimum.at(self._first_spent, codes[spent], positions[spent])
+        self._rows += rows
+        return self
+
+    def _code(self, name: str) -> int:
+        return self._codes.setdefault(name, len(self._codes))
+
+    def _grow(self):
+        """Extend the per-category accumulators to newly seen categories."""
+        self.categories = list(self._codes)
+        extra = len(self.categories) - len(self._amount)
+        if extra:
+            self._amount = np.concatenate((self._amount, np.zeros(extra)))
+            self._magnitude = np.concatenate((self._magnitude, np.zeros(extra)))
+            self._spent = np.concatenate((self._spent, np.zeros(extra)))
+            self._count = np.concatenate((self._count, np.zeros(extra, dtype=np.int64)))
+            self._first_row = np.concatenate((self._first_row, np.full(extra, _NEVER)))
+            self._first_spent = np.concatenate((self._first_spent, np.full(extra, _NEVER)))
+
+    def __len__(self) -> int:
+        return self._rows
+
+    @property
+    def total_received(self) -> float:
+        return float(self._side_sums[_CREDIT])
+
+    @property
+    def total_spent(self) -> float:
+        """Sum of the debits, a negative number (0.0 without debits)."""
+        return float(self._side_sums[_DEBIT])
+
+    @property
+    def net(self) -> float:
+        return self.total_received + self.total_spent
+
+    @property
+    def credit_count(self) -> int:
+        return int(self._side_counts[_CREDIT])
+
+    @property
+    def debit_count(self) -> int:
+        return int(self._side_counts[_DEBIT])
+
+    def _ordered(self, first: np.ndarray) -> List[int]:
+        """Category codes with a first row in `first`, in order of that row."""
+        seen = np.flatnonzero(first != _NEVER)
+        return seen[np.argsort(first[seen], kind='stable')].tolist()
+
+    def _values(self, amounts: str) -> np.ndarray:
+        """Per-category 'amount' (signed sum) or 'magnitude' (sum of absolute amounts)."""
+        if amounts not in ('amount', 'magnitude'):
+            raise ValueError(f"Unknown category amounts '{amounts}'. Choose 'amount' or 'magnitude'")
+        return self._amount if amounts == 'amount' else self._magnitude
+
+    def spending_by_category(self) -> Dict[str, float]:
+        """Sum of the debits per category, in order of each category's first debit."""
+        return {self.categories[code]: float(self._spent[code]) for code in self._ordered(self._first_spent)}
+
+    def category_breakdown(self, amounts: str = 'magnitude',
+                           percent_of: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """Amount, row count and percentage per category, in order of first appearance.
+
+        Percentages are of the absolute `percent_of`, by default the total of
+        the category amounts; 0 when that is zero.
+        """
+        order = self._ordered(self._first_row)
+        values = self._values(amounts)
+        if percent_of is None:
+            percent_of = column_sum(values[order])
+        return {
+            self.categories[code]: {
+                'amount': float(values[code]),
+                'count': int(self._count[code]),
+                'percentage': abs(float(values[code])) / abs(percent_of) * 100 if percent_of else 0
+            }
+            for code in order
+        }
+
+    def chart_data(self, amounts: str = 'magnitude') -> Dict[str, Any]:
+        """Chart.js series of the absolute category amounts, in order of first appearance."""
+        order = self._ordered(self._first_row)
+        values = self._values(amounts)
+        labels = [self.categories[code] for code in order]
+        return {
+            'data': {
+                'labels': labels,
+                'datasets': [{
+                    'data': [abs(float(values[code])) for code in order],
+                    'backgroundColor': CHART_COLORS[:len(labels)]
+                }]
+            }
+        }
+
+
+def summarize(batch: TransactionBatch) -> StatementSummary:
+    """The StatementSummary of one batch."""
+    return StatementSummary().update(batch)
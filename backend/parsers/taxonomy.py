@@ -0,0 +1,277 @@
+"""Category taxonomies, compiled into one binary index shared by all processes.
+
+Every parser's keyword taxonomy lives in data/taxonomy.json: named entries
+of ordered categories, each with its keywords, and a default category.
+The file is compiled once into a binary index that holds a dense,
+byte-level Aho–Corasick automaton per taxonomy: a transition table, the
+best (lowest) category reachable in each state and the keywords ending
+there. Processes open the index lazily with mmap, so gunicorn workers
+share its pages instead of each building the automata in its own heap.
+
+    STATEMENT_TAXONOMY_PATH   taxonomy data file (default parsers/data/taxonomy.json)
+    STATEMENT_TAXONOMY_INDEX  compiled index (default next to the data file, else the temp dir)
+
+TAXONOMY_VERSION is a digest of the data file and the index format. It
+names the index, so an edited taxonomy compiles a fresh one, and goes into
+the page-cache keys of categorized rows. Compile ahead of time with:
+
+    python -m parsers.taxonomy
+"""
+import os
+import sys
+import json
+import mmap
+import struct
+import hashlib
+import logging
+import tempfile
+import threading
+from array import array
+from collections import deque
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the index layout changes
+INDEX_FORMAT = 1
+
+DATA_PATH = os.environ.get('STATEMENT_TAXONOMY_PATH') or os.path.join(os.path.dirname(__file__), 'data',
+                                                                       'taxonomy.json')
+INDEX_PATH = os.environ.get('STATEMENT_TAXONOMY_INDEX') or None
+
+_MAGIC = b'STXI'
+_HEADER = struct.Struct('<4sII')  # magic, format, directory length
+
+# best() value of a state that completes no keyword
+NO_MATCH = 0xFFFFFFFF
+
+
+def _read_data() -> bytes:
+    with open(DATA_PATH, 'rb') as f:
+        return f.read()
+
+
+TAXONOMY_VERSION = f"{INDEX_FORMAT}.{hashlib.blake2b(_read_data(), digest_size=8).hexdigest()}"
+
+
+def is_word_char(char: str) -> bool:
+    return char.isalnum() or char == '_'
+
+
+def load_taxonomies() -> Dict[str, Tuple[Optional[str], List[Tuple[str, List[str]]]]]:
+    """The data file as {name: (default category, [(category, keywords), ...])}, in file order."""
+    data = json.loads(_read_data().decode('utf-8'))
+    return {
+        name: (entry.get('default'), [(category, list(keywords)) for category, keywords in entry['categories'].items()])
+        for name, entry in data.items()
+    }
+
+
+class TaxonomyTables(NamedTuple):
+    """One taxonomy's automaton, as views into the mapped index.
+
+    Byte b of a description moves state s to delta[s * width + table[b]]
+    (16-bit states where they fit, else 32-bit);
+    best[s] is the lowest category index completed in s (NO_MATCH if none),
+    and outputs[2 * i], outputs[2 * i + 1] for out_start[s] <= i < out_start[s + 1]
+    are that state's keywords as (category index, byte length << 2 | needs a
+    boundary before << 1 | needs a boundary after), lowest category first.
+    """
+    name: str
+    default: Optional[str]
+    categories: List[str]
+    size: int
+    width: int
+    table: bytes
+    delta: memoryview
+    best: memoryview
+    out_start: memoryview
+    outputs: memoryview
+
+
+def _compile_taxonomy(categories: List[Tuple[str, List[str]]]) -> Dict[str, Any]:
+    """Dense automaton arrays for one taxonomy."""
+    # keyword bytes -> (lowest category index it is listed under, keyword text)
+    keywords: Dict[bytes, Tuple[int, str]] = {}
+    for priority, (_category, words) in enumerate(categories):
+        for word in words:
+            word = word.lower()
+            encoded = word.encode('utf-8')
+            if encoded and (encoded not in keywords or priority < keywords[encoded][0]):
+                keywords[encoded] = (priority, word)
+
+    # Bytes that occur in no keyword share symbol 0
+    alphabet = sorted({byte for encoded in keywords for byte in encoded})
+    table = bytearray(256)
+    for code, byte in enumerate(alphabet, 1):
+        table[byte] = code
+    width = len(alphabet) + 1
+
+    goto: List[Dict[int, int]] = [{}]
+    outputs: List[List[Tuple[int, int]]] = [[]]
+    for encoded, (priority, word) in keywords.items():
+        state = 0
+        for byte in encoded:
+            code = table[byte]
+            following = goto[state].get(code)
+            if following is None:
+                following = len(goto)
+                goto[state][code] = following
+                goto.append({})
+                outputs.append([])
+            state = following
+        flags = len(encoded) << 2 | is_word_char(word[0]) << 1 | is_word_char(word[-1])
+        outputs[state].append((priority, flags))
+
+    # Breadth-first, so a state's failure state is complete before it is
+    delta = array('H' if len(goto) <= 0xFFFF else 'I', [0]) * (len(goto) * width)
+    for code, following in goto[0].items():
+        delta[code] = following
+    fail = [0] * len(goto)
+    queue = deque(goto[0].values())
+    while queue:
+        state = queue.popleft()
+        outputs[state] = sorted(outputs[state] + outputs[fail[state]])
+        row, fail_row = state * width, fail[state] * width
+        for code in range(width):
+            following = goto[state].get(code)
+            if following is None:
+                delta[row + code] = delta[fail_row + code]
+            else:
+                fail[following] = delta[fail_row + code]
+                delta[row + code] = following
+                queue.append(following)
+
+    best = array('I', (found[0][0] if found else NO_MATCH for found in outputs))
+    out_start = array('I', [0])
+    flat = array('I')
+    for found in outputs:
+        for priority, flags in found:
+            flat.extend((priority, flags))
+        out_start.append(len(flat) // 2)
+    return {'size': len(keywords), 'width': width, 'table': bytes(table), 'delta': delta, 'best': best,
+            'outStart': out_start, 'outputs': flat}
+
+
+def compile_index(path: str) -> str:
+    """Compile the data file into an index at `path`, atomically; returns `path`."""
+    directory: Dict[str, Any] = {'version': TAXONOMY_VERSION, 'byteorder': sys.byteorder, 'taxonomies': {}}
+    blobs = []
+    offset = 0
+    for name, (default, categories) in load_taxonomies().items():
+        compiled = _compile_taxonomy(categories)
+        entry = {'default': default, 'categories': [category for category, _words in categories],
+                 'size': compiled['size'], 'width': compiled['width'], 'deltaType': compiled['delta'].typecode}
+        for field in ('table', 'delta', 'best', 'outStart', 'outputs'):
+            blob = compiled[field] if isinstance(compiled[field], bytes) else compiled[field].tobytes()
+            # [offset, length] in the data section; blobs are padded to 8 bytes
+            entry[field] = [offset, len(blob)]
+            blob += b'\0' * (-len(blob) % 8)
+            blobs.append(blob)
+            offset += len(blob)
+        directory['taxonomies'][name] = entry
+
+    encoded = json.dumps(directory).encode('utf-8')
+    encoded += b' ' * (-(len(encoded) + _HEADER.size) % 8)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, INDEX_FORMAT, len(encoded)))
+        f.write(encoded)
+        for blob in blobs:
+            f.write(blob)
+    # Atomic rename so workers compiling at once never read a partial index
+    os.replace(tmp_path, path)
+    logger.info(f"Compiled taxonomy index {path} ({_HEADER.size + len(encoded) + offset} bytes)")
+    return path
+
+
+class TaxonomyIndex:
+    """A compiled index mapped read-only into memory."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        magic, index_format, length = _HEADER.unpack_from(view)
+        directory = json.loads(bytes(view[_HEADER.size:_HEADER.size + length])) if magic == _MAGIC else {}
+        if (index_format != INDEX_FORMAT or directory.get('version') != TAXONOMY_VERSION
+                or directory.get('byteorder') != sys.byteorder):
+            self._mmap.close()
+            raise ValueError(f"{path} is not a current taxonomy index")
+        self._view = view[_HEADER.size + length:]
+        self._entries = directory['taxonomies']
+        self._tables: Dict[str, TaxonomyTables] = {}
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._entries)
+
+    def tables(self, name: str) -> TaxonomyTables:
+        tables = self._tables.get(name)
+        if tables is None:
+            entry = self._entries.get(name)
+            if entry is None:
+                raise KeyError(f"Unknown taxonomy '{name}'. Choose one of: {', '.join(self._entries)}")
+            tables = TaxonomyTables(
+                name=name,
+                default=entry['default'],
+                categories=entry['categories'],
+                size=entry['size'],
+                width=entry['width'],
+                table=bytes(self._slice(entry['table'])),
+                delta=self._slice(entry['delta']).cast(entry['deltaType']),
+                best=self._slice(entry['best']).cast('I'),
+                out_start=self._slice(entry['outStart']).cast('I'),
+                outputs=self._slice(entry['outputs']).cast('I')
+            )
+            self._tables[name] = tables
+        return tables
+
+    def _slice(self, span: List[int]) -> memoryview:
+        offset, length = span
+        return self._view[offset:offset + length]
+
+
+def _index_paths() -> List[str]:
+    """Where the index may live, in order of preference."""
+    name = f'taxonomy-{TAXONOMY_VERSION}.idx'
+    if INDEX_PATH:
+        return [INDEX_PATH]
+    return [os.path.join(os.path.dirname(DATA_PATH), name), os.path.join(tempfile.gettempdir(), name)]
+
+
+def open_index() -> TaxonomyIndex:
+    """Map the current index, compiling it first if it is missing or stale."""
+    last_error: Optional[Exception] = None
+    for path in _index_paths():
+        try:
+            return TaxonomyIndex(path)
+        except (OSError, ValueError):
+            pass
+        try:
+            return TaxonomyIndex(compile_index(path))
+        except OSError as e:
+            logger.warning(f"Could not write taxonomy index {path}: {e}")
+            last_error = e
+    raise RuntimeError(f"No usable taxonomy index: {last_error}")
+
+
+_index: Optional[TaxonomyIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> TaxonomyIndex:
+    """The process-wide taxonomy index, mapped on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = open_index()
+        return _index
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    index = open_index()
+    print(f"{index.path}: version {TAXONOMY_VERSION}, taxonomies {', '.join(index.names)}")
@@ -0,0 +1,204 @@
+"""Size and page limits for uploaded statements, and zero-copy access to spooled uploads.
+
+The web frameworks already stream multipart uploads in chunks into a
+spooled file: in memory while small, in an anonymous temporary file once
+larger (Starlette's UploadFile, Werkzeug's FileStorage). The endpoints
+used to undo that with file.read(), holding every upload in memory in
+full, with nothing capping its size or page count.
+
+upload_buffer() instead exposes the spooled data as a buffer the parsers
+read in place: the in-memory bytes themselves, or a read-only mmap of the
+temporary file. A parse in another process gets the upload as a
+SharedUpload: copied once into shared memory, which the worker maps
+rather than receiving a pickled copy. Limits are enforced as early as
+each stage allows:
+
+    bytes   from Content-Length before the body is read, and as the body
+            streams in (UploadSizeLimit, for ASGI apps)
+    pages   as soon as the document is opened, before any page is parsed
+
+    STATEMENT_MAX_UPLOAD_BYTES   largest accepted request body
+    STATEMENT_MAX_PAGES          most pages accepted in one statement
+    STATEMENT_UPLOAD_SPOOL_BYTES uploads above this spill to a temporary file
+"""
+import io
+import os
+import json
+import mmap
+import logging
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import Iterator, Optional
+
+from parsers.document import Buffer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = int(os.environ.get('STATEMENT_MAX_UPLOAD_BYTES', str(25 * 1024 * 1024)))
+DEFAULT_MAX_PAGES = int(os.environ.get('STATEMENT_MAX_PAGES', '500'))
+DEFAULT_SPOOL_BYTES = int(os.environ.get('STATEMENT_UPLOAD_SPOOL_BYTES', str(1024 * 1024)))
+
+
+class UploadTooLarge(ValueError):
+    """The upload has more bytes or pages than the configured limit."""
+
+    status = 413
+
+
+def check_upload_size(size: Optional[int], max_bytes: Optional[int] = None):
+    """Raise UploadTooLarge when `size` bytes (None: unknown) exceed the byte limit."""
+    max_bytes = DEFAULT_MAX_BYTES if max_bytes is None else max_bytes
+    if size is not None and max_bytes > 0 and size > max_bytes:
+        raise UploadTooLarge(f"Upload is larger than the {_megabytes(max_bytes)} limit")
+
+
+def check_page_count(document, max_pages: Optional[int] = None):
+    """Raise UploadTooLarge when an opened StatementDocument has more pages than the limit."""
+    max_pages = DEFAULT_MAX_PAGES if max_pages is None else max_pages
+    if max_pages > 0 and document.page_count > max_pages:
+        raise UploadTooLarge(f"Statement has {document.page_count} pages; at most {max_pages} are accepted")
+
+
+def _megabytes(size: int) -> str:
+    return f"{size / (1024 * 1024):.3g} MB"
+
+
+def upload_buffer(file) -> Buffer:
+    """The contents of a spooled upload as a buffer, without copying it.
+
+    In-memory uploads (BytesIO, or a SpooledTemporaryFile not rolled over
+    yet) return their bytes, which BytesIO shares rather than copies and
+    which hold no export on the upload, so it can still be closed. Uploads
+    on disk return a read-only mmap of the file. Anything else is read once.
+    """
+    spooled = getattr(file, '_file', None)
+    if spooled is not None and not getattr(file, '_rolled', True):
+        # SpooledTemporaryFile still in memory
+        file = spooled
+    if isinstance(file, io.BytesIO):
+        return file.getvalue()
+    try:
+        fileno = file.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        fileno = None
+    if fileno is not None:
+        file.flush()
+        if os.fstat(fileno).st_size:
+            return mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+        return b''
+    file.seek(0)
+    return file.read()
+
+
+class UploadSizeLimit:
+    """ASGI middleware answering 413 to request bodies over the byte limit.
+
+    Bodies with a larger Content-Length are refused before they are read;
+    others are counted as they stream in and cut off once over the limit,
+    so an oversized upload is never spooled in full.
+    """
+
+    def __init__(self, app, max_bytes: Optional[int] = None):
+        self.app = app
+        self.max_bytes = DEFAULT_MAX_BYTES if max_bytes is None else max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or self.max_bytes <= 0:
+            await self.app(scope, receive, send)
+            return
+        declared = dict(scope.get('headers') or []).get(b'content-length', b'')
+        try:
+            check_upload_size(int(declared) if declared.isdigit() else None, self.max_bytes)
+        except UploadTooLarge as e:
+            await self._reject(send, str(e))
+            return
+
+        received = 0
+        rejection: Optional[str] = None
+        responded = False
+
+        async def limited_receive():
+            nonlocal received, rejection
+            if rejection is not None:
+                return {'type': 'http.disconnect'}
+            message = await receive()
+            if message['type'] == 'http.request':
+                received += len(message.get('body', b''))
+                try:
+                    check_upload_size(received, self.max_bytes)
+                except UploadTooLarge as e:
+                    # Stop reading; the app sees a disconnected client and its response is replaced
+                    rejection = str(e)
+                    return {'type': 'http.disconnect'}
+            return message
+
+        async def limited_send(message):
+            nonlocal responded
+            if rejection is not None:
+                if not responded:
+                    responded = True
+                    await self._reject(send, rejection)
+                return
+            responded = responded or message['type'] == 'http.response.start'
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, limited_send)
+        except Exception:
+            if rejection is None:
+                raise
+        if rejection is not None and not responded:
+            await self._reject(send, rejection)
+
+    async def _reject(self, send, error: str):
+        body = json.dumps({'error': error}).encode('utf-8')
+        await send({'type': 'http.response.start', 'status': UploadTooLarge.status,
+                    'headers': [(b'content-type', b'application/json'),
+                                (b'content-length', str(len(body)).encode('ascii')),
+                                (b'connection', b'close')]})
+        await send({'type': 'http.response.body', 'body': body})
+
+
+class SharedUpload:
+    """An upload copied into shared memory, for a worker process to parse in place.
+
+    The copy is the only one made: the temporary file behind a spilled
+    upload has no name another process could open, but the shared memory
+    segment does. Pickling sends just that name and the size, and open()
+    maps the segment in the worker. The creating process calls release()
+    once the worker is done.
+    """
+
+    def __init__(self, buffer: Buffer):
+        self.size = len(buffer)
+        # Segments cannot be empty
+        self._shm = shared_memory.SharedMemory(create=True, size=max(1, self.size))
+        self._shm.buf[:self.size] = buffer
+        self.name = self._shm.name
+
+    def __getstate__(self):
+        return {'name': self.name, 'size': self.size, '_shm': None}
+
+    @contextmanager
+    def open(self) -> Iterator[memoryview]:
+        """The upload's bytes, mapped from the segment; close what reads them before leaving the block."""
+        shm = shared_memory.SharedMemory(name=self.name)
+        view = shm.buf[:self.size]
+        try:
+            yield view
+        finally:
+            view.release()
+            shm.close()
+
+    def release(self):
+        """Free the segment; workers that still have it open keep their mapping."""
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+
+def release_buffer(buffer: Buffer):
+    """Unmap a buffer from upload_buffer() once the parsers are done with it."""
+    if isinstance(buffer, mmap.mmap):
+        buffer.close()
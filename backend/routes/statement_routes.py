@@ -1,17 +1,26 @@
-from flask import Blueprint, request, jsonify
-from werkzeug.utils import secure_filename
-import os
+from flask import Blueprint, Response, request, jsonify
+from parsers.document import StatementDocument
 from parsers.kotak_parser import parse_kotak_statement
+from parsers.serialize import dumps
 from parsers.statement_parser import detect_statement_type, parse_statement
+from parsers.summary import StatementSummary
+from parsers.uploads import UploadTooLarge, check_page_count, check_upload_size, release_buffer, upload_buffer
 
 statement_routes = Blueprint('statement_routes', __name__)
 
-UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS = {'pdf'}
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+@statement_routes.before_request
+def limit_upload_size():
+    """Refuse uploads over STATEMENT_MAX_UPLOAD_BYTES from their Content-Length, before the body is read."""
+    try:
+        check_upload_size(request.content_length)
+    except UploadTooLarge as e:
+        return jsonify({'error': str(e)}), e.status
+
 @statement_routes.route('/analyze-statement', methods=['POST'])
 def analyze_statement():
     if 'file' not in request.files:
@@ -24,81 +33,59 @@ def analyze_statement():
     if not allowed_file(file.filename):
         return jsonify({'error': 'Invalid file type. Please upload a PDF file'}), 400
 
+    # Parse the spooled upload in place instead of reading it into memory
+    pdf_bytes = upload_buffer(file.stream)
     try:
-        # Save the uploaded file
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(UPLOAD_FOLDER, filename)
-        os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-        file.save(filepath)
+        # Password-protected statements are decrypted in memory by the parser
+        password = request.form.get('password') or None
 
-        # Detect statement type
-        statement_type = detect_statement_type(filepath)
-        
-        try:
-            # Parse based on statement type
-            if statement_type == 'kotak':
-                result = parse_kotak_statement(filepath)
-            else:
-                result = parse_statement(filepath, statement_type)
+        with StatementDocument(pdf_bytes, password=password) as document:
+            # Reject statements over the page limit before parsing any page
+            check_page_count(document)
 
-            # Format the response
-            response = {
-                'transactions': result['transactions'],
-                'summary': {
-                    'totalReceived': result['summary']['total_credit'],
-                    'totalSpent': result['summary']['total_debit'],
-                    'balance': result['summary']['net_balance'],
-                    'creditCount': result['summary']['credit_count'],
-                    'debitCount': result['summary']['debit_count'],
-                    'totalTransactions': result['summary']['total_transactions']
-                },
-                'categoryBreakdown': calculate_category_breakdown(result['transactions']),
-                'pageCount': len(result.get('pages', [])) if 'pages' in result else 1,
-                'accounts': extract_accounts_info(result)
-            }
+            # Detect statement type
+            statement_type = detect_statement_type(pdf_bytes)
 
-            # Clean up
-            os.remove(filepath)
-            
-            return jsonify(response)
+            # Parse based on statement type; the Kotak parser reads the document opened above
+            if statement_type == 'kotak':
+                result = parse_kotak_statement(document)
+            else:
+                result = parse_statement(pdf_bytes, statement_type)
 
-        except Exception as e:
-            # Clean up on error
-            os.remove(filepath)
-            raise e
+        # Format the response
+        response = {
+            'transactions': result['transactions'],
+            'summary': {
+                'totalReceived': result['summary']['total_credit'],
+                'totalSpent': result['summary']['total_debit'],
+                'balance': result['summary']['net_balance'],
+                'creditCount': result['summary']['credit_count'],
+                'debitCount': result['summary']['debit_count'],
+                'totalTransactions': result['summary']['total_transactions']
+            },
+            'categoryBreakdown': calculate_category_breakdown(result['transactions']),
+            'pageCount': len(result.get('pages', [])) if 'pages' in result else 1,
+            'accounts': extract_accounts_info(result)
+        }
+        
+        return Response(dumps(response), mimetype='application/json')
 
+    except UploadTooLarge as e:
+        return jsonify({'error': str(e)}), e.status
+    except ValueError as e:
+        # Wrong passwords, unreadable PDFs and statements without a text layer
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({
             'error': 'Failed to analyze statement',
             'details': str(e)
         }), 500
+    finally:
+        release_buffer(pdf_bytes)
 
 def calculate_category_breakdown(transactions):
-    """Calculate spending breakdown by category."""
-    categories = {}
-    
-    for transaction in transactions:
-        category = transaction.get('category', 'Others')
-        amount = abs(transaction['amount'])
-        
-        if category not in categories:
-            categories[category] = {
-                'amount': 0,
-                'count': 0,
-                'percentage': 0
-            }
-            
-        categories[category]['amount'] += amount
-        categories[category]['count'] += 1
-    
-    # Calculate total amount for percentage calculation
-    total_amount = sum(cat['amount'] for cat in categories.values())
-    
-    # Calculate percentages
-    for category in categories.values():
-        category['percentage'] = (category['amount'] / total_amount * 100) if total_amount > 0 else 0
-    
-    return categories
+    """Calculate spending breakdown by category: absolute amounts, counts and share of the total."""
+    return StatementSummary.of_records(transactions).category_breakdown('magnitude')
 
 def extract_accounts_info(result):
     """Extract accounts information from the parsing result."""
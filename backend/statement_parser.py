@@ -1,5 +1,4 @@
 import pandas as pd
-import pdfplumber
 from pathlib import Path
 import io
 import re
@@ -9,15 +8,60 @@ import sys
 import argparse
 import traceback
 import logging
+from parsers.batch import ReprintFilter, TransactionBatch, TransactionBuilder
+from parsers.categorizer import Categorizer
+from parsers.dates import statement_date_parser
+from parsers.document import PasswordError, StatementDocument
+from parsers.pdf_engine import ExtractionReport, resolve_engine
+from parsers.patterns import STATEMENT_PATTERNS, MatchBudget
+from parsers.parallel import iter_page_results, resolve_workers
+from parsers.serialize import dumps, record_fragments, records_json
+from parsers.summary import StatementSummary, summarize
+from parsers.uploads import SharedUpload
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Basic categories from the shared taxonomy index; the first category with a keyword in the description wins
+_CATEGORIZER = Categorizer('statement')
+
 class StatementParser:
-    def __init__(self, file_obj):
+    def __init__(self, file_obj, engine=None, workers=None, password=None, filename=None):
+        # A file object, or a buffer (bytes, mmap) read in place; `filename` defaults to the file's name
         self.file_obj = file_obj
-        self.filename = file_obj.name if hasattr(file_obj, 'name') else 'statement.pdf'
+        self.filename = filename or (file_obj.name if hasattr(file_obj, 'name') else 'statement.pdf')
+        self.engine = resolve_engine(engine)
+        self.workers = resolve_workers(workers)
+        self.password = password
+        self.report = None
+        self.document = None
+
+    def __getstate__(self):
+        # Page workers get the PDF bytes separately; don't ship the upload or password with every shard
+        state = self.__dict__.copy()
+        state['file_obj'] = None
+        state['password'] = None
+        state['document'] = None
+        return state
+
+    def open(self):
+        """Open (and, given a password, decrypt in memory) the statement ahead of parsing.
+
+        Raises PasswordError for encrypted statements without the right
+        password, so callers can reject the request before streaming.
+        """
+        if not self.filename.endswith('.pdf'):
+            raise ValueError("Unsupported file format")
+        if self.document is None:
+            self.document = StatementDocument(self.file_obj, password=self.password)
+        return self.document
+
+    def close(self):
+        """Close the statement opened by open(), if it is open"""
+        if self.document is not None:
+            self.document.close()
+            self.document = None
 
     def parse(self):
         """Parse the file into a standardized DataFrame"""
@@ -26,157 +70,154 @@ class StatementParser:
         else:
             raise ValueError("Unsupported file format")
 
-    def _parse_pdf(self):
-        """Handle PDF parsing with comprehensive extraction"""
+    def iter_batches(self, on_page=None):
+        """Yield a TransactionBatch per page as pages are extracted.
+
+        Zero-amount rows and rows reprinted from earlier pages are skipped on
+        the fly, so the first transactions are available after the first page
+        instead of after the whole document. on_page(page_number, page_count,
+        batch) is called after each transaction page, also when it has no rows.
+        """
+        if not self.filename.endswith('.pdf'):
+            raise ValueError("Unsupported file format")
+
+        self.report = ExtractionReport(self.engine)
+        reprints = ReprintFilter()
+        # The date format is inferred from the first page's dates and reused for the rest
+        dates = statement_date_parser()
+        document = self.open()
+        try:
+            page_count = document.page_count
+            for page_number, page_rows in iter_page_results(document, self._extract_page_transactions,
+                                                            engine=self.engine, workers=self.workers,
+                                                            report=self.report):
+                batch = self._convert_dates(page_rows, dates)
+                batch = reprints.drop(batch.take(batch.amounts != 0))
+                if on_page is not None:
+                    on_page(page_number, page_count, batch)
+                if len(batch):
+                    yield batch
+        finally:
+            self.close()
+        self.report.log_summary()
+
+    def iter_transactions(self):
+        """Yield transaction dicts page by page as they are extracted (see iter_batches)."""
+        for batch in self.iter_batches():
+            yield from batch.to_records()
+
+    def parse_batch(self, on_page=None, raise_errors=False):
+        """Parse the file into one TransactionBatch ordered by date (on_page as in iter_batches).
+
+        A parse error gives an empty batch unless `raise_errors` is set;
+        PasswordError is always raised.
+        """
         try:
-            transactions = []
-            with pdfplumber.open(self.file_obj) as pdf:
-                # Transaction patterns
-                transaction_patterns = [
-                    # Kotak Format: Date Narration Chq/RefNo Withdrawal(Dr)/Deposit(Cr) Balance
-                    re.compile(
-                        r'(?P<date>\d{2}-\d{2}-\d{4})\s+'  # Date (DD-MM-YYYY)
-                        r'(?P<narration>.*?)\s+' # Narration/Description (non-greedy match)
-                        r'(?:.*?)\s+' # Skip Chq/Ref No column (non-capturing, non-greedy)
-                        r'(?P<amount>[\d,]+\.?\d{2})\((?P<type>Cr|Dr)\)', # Amount with Dr/Cr type
-                        re.IGNORECASE
-                    ),
-                    # Pattern 1: Standard format
-                    re.compile(
-                        r'(?P<date>(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s*\d{1,2},\s*\d{4})\s*'
-                        r'(?P<description>.*?)'
-                        r'(?P<type>DEBIT|CREDIT|Dr|Cr)?\s*'
-                        r'(?:₹|Rs\.?)\s*(?P<amount>[\d,]+\.?\d*)',
-                        re.IGNORECASE | re.MULTILINE | re.DOTALL
-                    ),
-                    # Pattern 2: Alternative format
-                    re.compile(
-                        r'(?P<date>\d{1,2}\s*(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s*\d{4})\s*'
-                        r'(?P<description>.*?)'
-                        r'(?P<amount>[-+]?₹?\s*[\d,]+\.?\d*)',
-                        re.IGNORECASE | re.MULTILINE | re.DOTALL
-                    )
-                ]
-
-                # Process each page individually
-                for page in pdf.pages:
-                    text = page.extract_text()
-                    if text and text.strip():
-                        # Apply patterns to the current page's text
-                        for pattern in transaction_patterns:
-                            for match in pattern.finditer(text):
-                                try:
-                                    date_str = match.group('date').strip()
-                                    date = self._parse_date(date_str)
-                                    
-                                    # Use 'narration' group for the new pattern, 'description' for others
-                                    if 'narration' in match.groupdict():
-                                        description = match.group('narration').strip()
-                                    else:
-                                        description = match.group('description').strip()
-
-                                    amount_str = match.group('amount')
-                                    amount_str = re.sub(r'[₹,\s]', '', amount_str)
-                                    amount = float(amount_str)
-                                    
-                                    # Determine transaction type and adjust amount
-                                    if 'type' in match.groupdict():
-                                        txn_type = match.group('type').upper()
-                                        if txn_type in ['DR', 'DEBIT']:
-                                            amount = -abs(amount)
-                                    elif amount < 0:
-                                         txn_type = 'DR'
-                                    else:
-                                         txn_type = 'CR'
-
-                                    transactions.append({
-                                        'date': date,
-                                        'amount': amount,
-                                        'description': description,
-                                        'category': self._categorize_transaction(description)
-                                    })
-                                except Exception as e:
-                                    logger.warning(f"Could not process transaction on page {page.page_number} with pattern {pattern.pattern}: {e}")
-
-            if transactions:
-                df = pd.DataFrame(transactions)
-                df = df[df['amount'].abs() > 0]
-                df = df.drop_duplicates(subset=['date', 'amount', 'description'])
-                df = df.sort_values('date')
-                return df
-            else:
+            batch = TransactionBatch.concat(list(self.iter_batches(on_page)))
+            if not len(batch):
                 logger.warning("No transactions found after parsing all pages.")
-                return pd.DataFrame(columns=['date', 'amount', 'description', 'category'])
+            return batch.sort_by_date()
 
+        except PasswordError:
+            raise
         except Exception as e:
+            if raise_errors:
+                raise
             logger.error(f"PDF parsing error: {str(e)}\n{traceback.format_exc()}")
-            return pd.DataFrame(columns=['date', 'amount', 'description', 'category'])
+            return TransactionBatch.empty()
 
-    def _parse_date(self, date_str):
-        """Parse date string into datetime object"""
-        try:
-            if not date_str:
-                return datetime.now()
-
-            date_str = date_str.strip()
-            date_formats = [
-                '%d %b %Y',      # 06 Nov 2024
-                '%b %d %Y',      # Nov 06 2024
-                '%d %B %Y',      # 06 November 2024
-                '%B %d %Y',      # November 06 2024
-                '%m/%d/%Y',      # 11/06/2024
-                '%d/%m/%Y',      # 06/11/2024
-                '%Y-%m-%d',      # 2024-11-06
-                '%d-%m-%Y',      # 06-11-2024
-                '%b %d, %Y',     # Nov 06, 2024
-                '%d %b, %Y',     # 06 Nov, 2024
-                '%d-%b-%Y',      # 06-Nov-2024
-                '%b-%d-%Y'       # Nov-06-2024
-            ]
-            
-            for fmt in date_formats:
-                try:
-                    parsed_date = datetime.strptime(date_str, fmt)
-                    if parsed_date.year > datetime.now().year:
-                        parsed_date = parsed_date.replace(year=datetime.now().year)
-                    return parsed_date
-                except ValueError:
-                    continue
-            
-            # Fallback: try to extract components
-            components = re.findall(r'\d+', date_str)
-            if len(components) >= 3:
-                day, month, year = map(int, components[:3])
-                if year < 100:
-                    year += 2000 if year < 50 else 1900
-                return datetime(year, month, day)
-            
-            return datetime.now()
-            
-        except Exception as e:
-            logger.error(f"Date parsing error: {str(e)}")
-            return datetime.now()
+    def _parse_pdf(self):
+        """Handle PDF parsing with comprehensive extraction"""
+        return self.parse_batch().to_frame()
+
+    def _extract_page_transactions(self, page_number, text):
+        """Apply the transaction patterns to the text of one page; raises MatchBudgetExceeded when over budget"""
+        transactions = TransactionBuilder()
+        if not text or not text.strip():
+            return transactions
+
+        matches = STATEMENT_PATTERNS.findall(text, MatchBudget())
+
+        for match in matches:
+            try:
+                # Raw date text; the document's dates are converted together once extracted
+                date = match.date.strip()
+                description = match.description.strip()
+
+                amount_str = re.sub(r'[₹,\s]', '', match.amount)
+                amount = float(amount_str)
+
+                # Determine transaction type and adjust amount
+                if match.type and match.type.upper() in ['DR', 'DEBIT']:
+                    amount = -abs(amount)
+
+                transactions.append(date, amount, description, self._categorize_transaction(description))
+            except Exception as e:
+                logger.warning(f"Could not process transaction on page {page_number} with pattern {match.pattern}: {e}")
+        return transactions
+
+    def _convert_dates(self, transactions, dates):
+        """Build the batch of a TransactionBuilder, converting its raw dates with the document's DateParser"""
+        now = datetime.now()
+        return transactions.build([date if date is not None else now
+                                   for date in dates.parse_many(transactions.raw_dates)])
 
     def _categorize_transaction(self, description):
         """Categorize transaction based on description"""
-        description = description.lower()
-        
-        # Basic categories for now
-        categories = {
-            'food': ['restaurant', 'food', 'cafe', 'coffee', 'swiggy', 'zomato'],
-            'shopping': ['amazon', 'flipkart', 'myntra', 'shop', 'store'],
-            'transport': ['uber', 'ola', 'metro', 'bus', 'train', 'flight'],
-            'utilities': ['electricity', 'water', 'gas', 'internet', 'mobile'],
-            'entertainment': ['movie', 'theatre', 'concert', 'netflix', 'prime'],
-            'health': ['hospital', 'doctor', 'pharmacy', 'medical'],
-            'education': ['school', 'college', 'university', 'course'],
-            'investment': ['mutual fund', 'stock', 'investment', 'sip'],
-            'salary': ['salary', 'income', 'credit'],
-            'transfer': ['transfer', 'neft', 'imps', 'rtgs']
-        }
-        
-        for category, keywords in categories.items():
-            if any(keyword in description for keyword in keywords):
-                return category
-        
-        return 'other' 
\ No newline at end of file
+        return _CATEGORIZER.categorize(description) 
+
+def parse_upload(content, filename='statement.pdf', engine=None, workers=None, password=None):
+    """Parse uploaded PDF bytes into (TransactionBatch, parse report dict).
+
+    Module-level so a process pool can run it. The bytes, or the shared
+    memory of a SharedUpload, are parsed in place. Raises ValueError (and
+    PasswordError) for unsupported files and missing or wrong passwords.
+    """
+    if isinstance(content, SharedUpload):
+        with content.open() as buffer:
+            return parse_upload(buffer, filename, engine, workers, password)
+    parser = StatementParser(content, engine=engine, workers=workers, password=password, filename=filename)
+    parser.open()
+    batch = parser.parse_batch()
+    return batch, parser.report.as_dict() if parser.report else None
+
+
+def stream_upload(emit, content, filename='statement.pdf', engine=None, workers=None, password=None):
+    """Parse uploaded PDF bytes page by page, passing NDJSON to emit(): each page's transactions, then a summary.
+
+    Module-level so a process pool can stream it (ParsePool.stream). Each
+    call to emit() gets one page's records as a string of lines; the
+    summary line comes last. Parse errors are raised, after the pages
+    already emitted.
+    """
+    if isinstance(content, SharedUpload):
+        with content.open() as buffer:
+            return stream_upload(emit, buffer, filename, engine, workers, password)
+    parser = StatementParser(content, engine=engine, workers=workers, password=password, filename=filename)
+    summary = StatementSummary()
+    for batch in parser.iter_batches():
+        summary.update(batch)
+        # Rows are encoded from the batch columns, dates as ISO datetimes
+        emit(''.join(record + "\n" for record in record_fragments(batch, extra={"type": "transaction"})))
+    emit(dumps({
+        "type": "summary",
+        "transactionCount": len(summary),
+        "totalSpent": summary.total_spent,
+        "totalReceived": summary.total_received,
+        "categoryBreakdown": summary.spending_by_category(),
+        "parseReport": parser.report.as_dict() if parser.report else None
+    }) + "\n")
+
+
+def analysis_json(batch, report=None):
+    """The /analyze response body for a parsed batch: its transactions, totals and spending per category."""
+    # Totals and category breakdown in one aggregation over the batch columns
+    summary = summarize(batch)
+    # Encoded from the batch columns rather than by a generic encoder
+    return dumps({
+        "transactions": records_json(batch),
+        "totalSpent": summary.total_spent,
+        "totalReceived": summary.total_received,
+        "categoryBreakdown": summary.spending_by_category(),
+        "parseReport": report
+    })
@@ -0,0 +1,26 @@
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from api_server import MAX_REQUEST_WORKERS, app, request_workers
+from parsers.document import StatementDocument, UnreadableDocument
+
+
+def test_requested_workers_are_honoured_up_to_the_cap():
+    assert request_workers(None) == 1
+    assert request_workers(MAX_REQUEST_WORKERS) == MAX_REQUEST_WORKERS
+    for workers in (0, -1, MAX_REQUEST_WORKERS + 1):
+        with pytest.raises(HTTPException) as error:
+            request_workers(workers)
+        assert error.value.status_code == 400
+
+
+@pytest.mark.parametrize('content', [b'', b'not a pdf', b'%PDF-1.4 truncated'])
+def test_corrupt_upload_is_a_bad_request(content):
+    with pytest.raises(UnreadableDocument):
+        StatementDocument(content)
+    for path in ('/analyze', '/jobs'):
+        response = TestClient(app).post(path, files={'file': ('statement.pdf', content, 'application/pdf')},
+                                        data={'platform': 'kotak'})
+        assert response.status_code == 400
+        assert 'Could not open the PDF' in response.json()['error']
@@ -0,0 +1,75 @@
+import re
+
+import pytest
+
+from benchmarks.sample import NARRATIONS
+from parsers.categorizer import Categorizer
+from parsers.merchants import CategoryCache, merchant_key
+from parsers.taxonomy import load_taxonomies
+
+TAXONOMIES = load_taxonomies()
+
+DESCRIPTIONS = NARRATIONS + [
+    'UPI/412345678901',
+    'UPI-412345678901-PAYTM',
+    'NEFT/123456789012',
+    'NEFT N123456789012 ACME CORP',
+    'pos 123456789',
+    'POS/123456789 BIG BAZAAR',
+    'ATM/CASH 123456',
+    'SAL/OCT 2024',
+    'Paid to Swiggy on Nov 01, 2024',
+    'Bill  pay Airtel  postpaid',
+    'Maximum Retail Bandra',
+    'Chai point',
+    '',
+]
+
+
+def first_category(taxonomy, description, word_boundary=False):
+    """The loops categorizers used before the automaton: first category with a keyword in the description."""
+    default, categories = TAXONOMIES[taxonomy]
+    text = description.lower()
+    for category, keywords in categories:
+        for keyword in keywords:
+            keyword = keyword.lower()
+            if not word_boundary:
+                if keyword in text:
+                    return category
+                continue
+            pattern = re.escape(keyword)
+            if re.match(r'\w', keyword):
+                pattern = r'(?<!\w)' + pattern
+            if re.search(r'\w$', keyword):
+                pattern += r'(?!\w)'
+            if re.search(pattern, text):
+                return category
+    return default
+
+
+@pytest.mark.parametrize('word_boundary', [False, True])
+@pytest.mark.parametrize('taxonomy', sorted(TAXONOMIES))
+def test_matches_keyword_loops(taxonomy, word_boundary):
+    uncached = Categorizer(taxonomy, word_boundary=word_boundary, cache=None)
+    cached = Categorizer(taxonomy, word_boundary=word_boundary, cache=CategoryCache(100))
+    expected = [first_category(taxonomy, description, word_boundary) or uncached.default
+                for description in DESCRIPTIONS]
+    assert uncached.categorize_many(DESCRIPTIONS) == expected
+    # Twice: the second pass is answered from the merchant cache
+    assert cached.categorize_many(DESCRIPTIONS) == expected
+    assert cached.categorize_many(DESCRIPTIONS) == expected
+
+
+def test_mapping_taxonomy():
+    categorizer = Categorizer({'food': ['swiggy', 'chai'], 'transfer': ['upi/']}, default='other', cache=None)
+    assert categorizer.categorize('UPI/412345678901/swiggy@axis/Swiggy') == 'food'
+    assert categorizer.categorize('UPI/412345678901') == 'transfer'
+    assert categorizer.categorize('NEFT/123456789012') == 'other'
+
+
+def test_merchant_key_keeps_separators():
+    assert merchant_key('UPI/412345678901/swiggy@axis/Swiggy') == 'upi//swiggy@axis/swiggy'
+    assert merchant_key('UPI/498877665544/swiggy@axis/Swiggy') == merchant_key('UPI/412345678901/swiggy@axis/Swiggy')
+    assert merchant_key('UPI/412345678901') == 'upi/'
+    assert merchant_key('pos 123456789') == 'pos '
+    assert merchant_key('IMPS-554433221100-Ramesh') == 'imps--ramesh'
@@ -0,0 +1,75 @@
+import re
+from datetime import datetime, timedelta
+
+import pytest
+
+from parsers.dates import KOTAK_DATE_FORMATS, STATEMENT_DATE_FORMATS, DateParser, statement_date_parser
+
+DAYS = [datetime(2023, 1, 1) + timedelta(days=11 * n) for n in range(40)]
+ODD_VALUES = ['', '  ', 'not a date', '5-6-24', '31/02/2024', '06 Nov 2099', '07.11.2024']
+
+
+def old_statement_date(value):
+    """StatementParser._parse_date before per-document inference, with None for its datetime.now()."""
+    try:
+        if not value:
+            return None
+        value = value.strip()
+        for fmt in STATEMENT_DATE_FORMATS:
+            try:
+                parsed = datetime.strptime(value, fmt)
+                if parsed.year > datetime.now().year:
+                    parsed = parsed.replace(year=datetime.now().year)
+                return parsed
+            except ValueError:
+                continue
+        components = re.findall(r'\d+', value)
+        if len(components) >= 3:
+            day, month, year = map(int, components[:3])
+            if year < 100:
+                year += 2000 if year < 50 else 1900
+            return datetime(year, month, day)
+        return None
+    except Exception:
+        return None
+
+
+def old_kotak_date(value):
+    """KotakParser._parse_date before per-document inference, with None for its datetime.now()."""
+    for fmt in KOTAK_DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+@pytest.mark.parametrize('fmt', STATEMENT_DATE_FORMATS)
+def test_statement_dates_match_per_string_parsing(fmt):
+    values = [day.strftime(fmt) for day in DAYS] + ODD_VALUES
+    parsed = statement_date_parser().parse_many(values)
+    old = [old_statement_date(value) for value in values]
+    assert parsed[:len(DAYS)] == DAYS
+    differing = {value for value, new, before in zip(values, parsed, old) if new != before}
+    if fmt == '%d/%m/%Y':
+        # The old loop read DD/MM dates with a day up to 12 as MM/DD, against the rest of the document
+        assert differing == {day.strftime(fmt) for day in DAYS if day.day <= 12 and day.day != day.month}
+    else:
+        assert not differing
+
+
+def test_mixed_statement_formats_match_per_string_parsing():
+    formats = ['%d %b %Y', '%Y-%m-%d', '%b %d, %Y', '%d-%b-%Y']
+    values = [day.strftime(formats[n % len(formats)]) for n, day in enumerate(DAYS)] + ODD_VALUES
+    dates = statement_date_parser()
+    # Converted in page-sized pieces, as documents are
+    parsed = dates.parse_many(values[:10]) + dates.parse_many(values[10:])
+    assert parsed == [old_statement_date(value) for value in values]
+
+
+def test_kotak_dates_match_per_string_parsing():
+    values = [day.strftime(KOTAK_DATE_FORMATS[n % 3]) for n, day in enumerate(DAYS)] + ODD_VALUES
+    dates = DateParser(KOTAK_DATE_FORMATS)
+    assert dates.parse_many(values) == [old_kotak_date(value.strip()) for value in values]
+    assert dates.format_many(values) == [
+        old.strftime('%Y-%m-%d') if old else None for old in map(old_kotak_date, (value.strip() for value in values))]
@@ -0,0 +1,93 @@
+import sqlite3
+import threading
+
+import fitz  # PyMuPDF
+import pytest
+
+import statement_parser
+from job_worker import run_job, work
+from parsers import jobs
+from parsers.jobs import DONE, FAILED, JobStore
+
+LINES = ['Date Description Debit Credit',
+         'Nov 06, 2024 Chai point DEBIT Rs 20.00',
+         'Nov 07, 2024 Salary CREDIT Rs 900.00']
+
+
+def statement(password=None):
+    doc = fitz.open()
+    page = doc.new_page()
+    for number, line in enumerate(LINES):
+        page.insert_text((40, 60 + 16 * number), line, fontsize=9)
+    if password is None:
+        return doc.tobytes()
+    return doc.tobytes(encryption=fitz.PDF_ENCRYPT_AES_256, user_pw=password, owner_pw=password)
+
+
+def stored_password(store, job_id):
+    with sqlite3.connect(store.path) as db:
+        return db.execute('SELECT password FROM jobs WHERE id = ?', (job_id,)).fetchone()[0]
+
+
+def test_password_is_sealed_and_cleared(tmp_path):
+    store = JobStore(str(tmp_path / 'jobs.db'), secret='s3cret')
+    job_id = store.submit('statement.pdf', statement('hunter2'), 'hunter2', {'workers': 1})
+    assert 'hunter2' not in stored_password(store, job_id)
+
+    job = store.claim('worker')
+    assert job.password == 'hunter2'
+    run_job(store, job, 'worker')
+    assert store.result(job_id)['status'] == DONE
+    assert stored_password(store, job_id) is None
+
+
+def test_password_needs_a_secret(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, 'DEFAULT_SECRET', None)
+    store = JobStore(str(tmp_path / 'jobs.db'))
+    with pytest.raises(ValueError):
+        store.submit('statement.pdf', statement('hunter2'), 'hunter2')
+    assert store.counts()['queued'] == 0
+
+
+def test_other_secret_cannot_unseal(tmp_path):
+    path = str(tmp_path / 'jobs.db')
+    job_id = JobStore(path, secret='s3cret').submit('statement.pdf', statement('hunter2'), 'hunter2', {'workers': 1})
+    store = JobStore(path, secret='other')
+    job = store.claim('worker')
+    assert job.password is None
+    run_job(store, job, 'worker')
+    assert store.result(job_id)['error_status'] == 400
+
+
+def test_parse_error_fails_the_job(tmp_path, monkeypatch):
+    store = JobStore(str(tmp_path / 'jobs.db'))
+    job_id = store.submit('statement.pdf', statement(), options={'workers': 1})
+
+    def broken(self, transactions, dates):
+        raise RuntimeError('extraction broke')
+
+    monkeypatch.setattr(statement_parser.StatementParser, '_convert_dates', broken)
+    run_job(store, store.claim('worker'), 'worker')
+    result = store.result(job_id)
+    assert result['status'] == FAILED
+    assert result['error_status'] == 500
+    assert 'extraction broke' in result['error']
+
+
+def test_corrupt_upload_fails_the_job_and_the_worker_goes_on(tmp_path, monkeypatch):
+    store = JobStore(str(tmp_path / 'jobs.db'))
+    corrupt = store.submit('statement.pdf', b'%PDF-1.4 not really a pdf', options={'workers': 1})
+    valid = store.submit('statement.pdf', statement(), options={'workers': 1})
+    stop = threading.Event()
+    finish = store.finish
+
+    def finish_and_stop(job_id, worker, result):
+        finish(job_id, worker, result)
+        stop.set()
+
+    monkeypatch.setattr(store, 'finish', finish_and_stop)
+    work(store, 'worker', stop)
+    result = store.result(corrupt)
+    assert result['status'] == FAILED
+    assert result['error_status'] == 400
+    assert store.result(valid)['status'] == DONE
@@ -0,0 +1,40 @@
+import fitz  # PyMuPDF
+import pytest
+
+from benchmarks.sample import make_statement
+from parsers.document import StatementDocument
+from parsers.kotak_parser import parse_kotak_statement
+
+
+def parse(content, mode):
+    result = parse_kotak_statement(content, workers=1, mode=mode)
+    result.pop('parseReport')
+    return result
+
+
+@pytest.mark.parametrize('seed', [1, 2])
+@pytest.mark.parametrize('mode', ['vectorized', 'columns'])
+def test_mode_matches_regex_mode(mode, seed):
+    content = make_statement(3, seed)
+    expected = parse(content, 'regex')
+    assert len(expected['transactions']) > 0
+    assert parse(content, mode) == expected
+
+
+def test_open_document_is_parsed_without_reopening(monkeypatch):
+    content = make_statement(3, 1)
+    with StatementDocument(content) as document:
+        monkeypatch.setattr(StatementDocument, 'open_counts', {'pymupdf': 0, 'pdfplumber': 0})
+        result = parse_kotak_statement(document, workers=1)
+        assert StatementDocument.open_counts['pymupdf'] == 0
+        # The caller's document stays open
+        assert document.page_count == 3
+    result.pop('parseReport')
+    assert result == parse(content, 'regex')
+
+
+def test_statement_without_text_is_a_value_error():
+    doc = fitz.open()
+    doc.new_page()
+    with pytest.raises(ValueError, match='Could not extract text'):
+        parse_kotak_statement(doc.tobytes(), workers=1)
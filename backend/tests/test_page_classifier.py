@@ -0,0 +1,35 @@
+from parsers.page_classifier import BOILERPLATE, SUMMARY, TRANSACTION, classify_text
+
+KOTAK_PAGE = """Date Narration Chq/Ref No Withdrawal(Dr)/Deposit(Cr) Balance
+01-11-2024 UPI/123456789012/swiggy@axis/Swiggy REF1234 250.00(Dr) 9,750.00
+02-11-2024 NEFT-HDFC0001-ACME CORP SALARY REF5678 50,000.00(Cr) 59,750.00
+"""
+
+# Wallet rows with the date in the middle of the line
+WALLET_PAGE = """Transaction history
+Paid to Swiggy on Nov 01, 2024 DEBIT Rs 250.00
+Received from Ramesh on Nov 02, 2024 CREDIT Rs 1,200.00
+Paid to Airtel on 03/11/2024 DEBIT Rs 299.00
+"""
+
+SUMMARY_PAGE = """Account summary for the period
+Opening balance 10,000.00 and closing balance 59,750.00
+Total withdrawal 250.00 Total deposit 50,000.00
+"""
+
+TERMS_PAGE = """Terms and conditions apply to all accounts held with the bank.
+Call 1800-209-0000 for assistance. Version 12.03.2024 updated for fees and charges.
+"""
+
+
+def test_line_leading_dates():
+    assert classify_text(KOTAK_PAGE) == TRANSACTION
+
+
+def test_mid_line_dates():
+    assert classify_text(WALLET_PAGE) == TRANSACTION
+
+
+def test_pages_without_transactions():
+    assert classify_text(SUMMARY_PAGE) == SUMMARY
+    assert classify_text(TERMS_PAGE) == BOILERPLATE
@@ -0,0 +1,68 @@
+import io
+
+import fitz  # PyMuPDF
+import pytest
+
+from parsers import parallel
+from parsers.merchants import merchant_cache_stats
+from parsers.page_cache import PageCache
+from parsers.parallel import OVER_BUDGET
+from parsers.patterns import MatchBudget, MatchBudgetExceeded
+from statement_parser import StatementParser
+
+LINES = ['Date Description Debit Credit',
+         'Nov 05, 2024 Swiggy order DEBIT Rs 250.00',
+         'Nov 06, 2024 Chai point DEBIT Rs 20.00']
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = PageCache(directory=str(tmp_path))
+    monkeypatch.setattr(parallel, 'get_page_cache', lambda: cache)
+    return cache
+
+
+def statement():
+    doc = fitz.open()
+    page = doc.new_page()
+    for number, line in enumerate(LINES):
+        page.insert_text((40, 60 + 16 * number), line, fontsize=9)
+    source = io.BytesIO(doc.tobytes())
+    source.name = 'statement.pdf'
+    return source
+
+
+def parse(source):
+    parser = StatementParser(source, workers=1)
+    return parser.parse_batch(), parser.report
+
+
+def test_page_over_budget_is_skipped_and_not_cached(cache, monkeypatch):
+    def over_budget(self):
+        raise MatchBudgetExceeded("pattern matching took too long")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(MatchBudget, 'check', over_budget)
+        batch, report = parse(statement())
+    assert len(batch) == 0
+    assert report.skipped == {OVER_BUDGET: 1}
+
+    # The next parse, in memory or from the disk tier, matches the page again
+    for current in (cache, PageCache(directory=cache.directory)):
+        monkeypatch.setattr(parallel, 'get_page_cache', lambda: current)
+        batch, report = parse(statement())
+        assert batch.descriptions.tolist() == ['Swiggy order', 'Chai point']
+        assert report.skipped == {}
+
+    # Once matched, the page's rows are cached
+    batch, report = parse(statement())
+    assert report.cached_pages == 1
+    assert len(batch) == 2
+
+
+def test_report_carries_the_merchant_cache_stats(cache):
+    batch, report = parse(statement())
+    assert len(batch) == 2
+    stats = report.as_dict()['merchantCache']
+    assert stats == merchant_cache_stats()
+    assert stats['hits'] + stats['misses'] >= 2
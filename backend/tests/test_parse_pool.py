@@ -0,0 +1,92 @@
+import asyncio
+import json
+
+import pytest
+
+from benchmarks.sample import make_statement
+from parsers.parse_pool import ParsePool, PoolSaturated
+from statement_parser import analysis_json, parse_upload, stream_upload
+
+
+def test_acquire_counts_against_the_bound():
+    async def scenario():
+        pool = ParsePool(size=1, queue_depth=0)
+        release = await pool.acquire()
+        with pytest.raises(PoolSaturated):
+            await pool.acquire()
+        with pytest.raises(PoolSaturated):
+            await pool.run(len, 'abc')
+        release()
+        release()
+        assert await pool.run(len, 'abc') == 3
+        pool.shutdown()
+        return pool.stats()
+
+    stats = asyncio.run(scenario())
+    assert (stats['running'], stats['completed'], stats['rejected']) == (0, 2, 2)
+
+
+def test_waiting_job_gets_the_released_slot():
+    async def scenario():
+        pool = ParsePool(size=1, queue_depth=1)
+        release = await pool.acquire()
+        waiting = asyncio.ensure_future(pool.acquire())
+        await asyncio.sleep(0)
+        assert pool.stats()['queued'] == 1
+        release()
+        (await waiting)(failed=True)
+        return pool.stats()
+
+    stats = asyncio.run(scenario())
+    assert (stats['running'], stats['queued'], stats['completed'], stats['failed']) == (0, 0, 1, 1)
+
+
+def emit_numbers(emit, count, error=None):
+    for number in range(count):
+        emit(number)
+    if error:
+        raise ValueError(error)
+
+
+def test_stream_relays_pieces_from_a_worker():
+    async def scenario():
+        pool = ParsePool(size=1, queue_depth=0)
+        try:
+            pieces = await pool.stream(emit_numbers, 3)
+            assert [piece async for piece in pieces] == [0, 1, 2]
+
+            received = []
+            with pytest.raises(ValueError, match='corrupt page'):
+                async for piece in await pool.stream(emit_numbers, 2, 'corrupt page'):
+                    received.append(piece)
+            assert received == [0, 1]
+
+            release = await pool.acquire()
+            with pytest.raises(PoolSaturated):
+                await pool.stream(emit_numbers, 1)
+            release()
+            return pool.stats()
+        finally:
+            pool.shutdown()
+
+    stats = asyncio.run(scenario())
+    assert (stats['running'], stats['completed'], stats['failed'], stats['rejected']) == (0, 2, 1, 1)
+
+
+def test_streamed_parse_matches_the_whole_parse():
+    content = make_statement(3, 1)
+    pages = []
+    stream_upload(pages.append, content, workers=1)
+    lines = [json.loads(line) for page in pages for line in page.splitlines()]
+    analysis = json.loads(analysis_json(*parse_upload(content, workers=1)))
+    summary = lines.pop()
+    assert len(pages) == 4
+    # Streamed rows come in page order; the whole parse sorts them by date
+    streamed = sorted((dict(line, type=None) for line in lines), key=lambda row: row['date'])
+    assert streamed == [dict(row, type=None) for row in analysis['transactions']]
+    assert summary['type'] == 'summary'
+    assert summary['transactionCount'] == len(analysis['transactions'])
+    # Summed in page order rather than date order, so equal up to rounding
+    assert summary['totalSpent'] == pytest.approx(analysis['totalSpent'])
+    assert summary['totalReceived'] == pytest.approx(analysis['totalReceived'])
+    assert summary['categoryBreakdown'] == pytest.approx(analysis['categoryBreakdown'])
@@ -0,0 +1,106 @@
+import pytest
+
+from parsers.patterns import (_HORIZONTAL_SPACE, KOTAK_LINE_PATTERNS, KOTAK_TEXT_PATTERNS, STATEMENT_PATTERNS,
+                              WALLET_LINE_PATTERNS, _to_match, get_pattern)
+
+KOTAK_PAGE = """Date Narration Chq/Ref No Withdrawal(Dr)/Deposit(Cr) Balance
+01-11-2024 UPI/123456789012/swiggy@axis/Swiggy REF1234 250.00(Dr) 9,750.00
+02-11-2024 NEFT-HDFC0001-ACME CORP SALARY REF5678 50,000.00(Cr) 59,750.00
+03-11-2024 POS/AMAZON RETAIL REF9012 1,499.00(Dr) 58,251.00
+"""
+
+WALLET_PAGE = """Nov 06, 2024 Paid to Swiggy DEBIT ₹250.00
+Nov 07, 2024 10:30 AM Received from Ramesh Rs 1,200.00
+12/11/2024 Mobile recharge Airtel INR 299
+06 Nov 2024 Zomato order 450.00
+Paid to Swiggy on Nov 08, 2024 DEBIT Rs 649.00
+"""
+
+# Records with the date, time, payee and amount on lines of their own
+MULTI_LINE_PAGES = [
+    "Nov 06, 2024\n10:30 am\nPaid to SWIGGY\nDEBIT ₹250",
+    "06 Nov 2024\nSwiggy order\n-₹250.00",
+    "Nov 06, 2024\n10:30 am\nPaid to SWIGGY\nDEBIT ₹250\nNov 07, 2024\nReceived from Ramesh\nCREDIT ₹1,200.00\n",
+]
+
+
+def fields(matches):
+    # Offsets differ between modes: safe mode collapses runs of spaces before matching
+    return [match[:9] for match in matches]
+
+
+@pytest.mark.parametrize('patterns', [STATEMENT_PATTERNS, KOTAK_TEXT_PATTERNS, KOTAK_LINE_PATTERNS],
+                         ids=lambda patterns: '+'.join(patterns.names))
+@pytest.mark.parametrize('text', [KOTAK_PAGE, WALLET_PAGE] + MULTI_LINE_PAGES)
+def test_safe_mode_matches_standard_mode(patterns, text):
+    assert fields(patterns.with_mode('safe').findall(text)) == fields(patterns.with_mode('standard').findall(text))
+
+
+@pytest.mark.parametrize('text', MULTI_LINE_PAGES[:2])
+def test_multi_line_records(text):
+    matches = STATEMENT_PATTERNS.with_mode('safe').findall(text)
+    assert len(matches) == 1
+    assert 'swiggy' in matches[0].description.lower()
+    assert matches[0].amount.lstrip('-₹') in ('250', '250.00')
+
+
+def test_wallet_lines():
+    for line in WALLET_PAGE.splitlines():
+        safe = WALLET_LINE_PATTERNS.with_mode('safe').match(line)
+        standard = WALLET_LINE_PATTERNS.with_mode('standard').match(line)
+        assert (safe and safe[:9]) == (standard and standard[:9])
+
+
+def test_one_match_per_line():
+    matches = STATEMENT_PATTERNS.findall(KOTAK_PAGE)
+    assert [match.date for match in matches] == ['01-11-2024', '02-11-2024', '03-11-2024']
+
+
+def every_match(patterns, text):
+    """What finditer yielded before span claims: every match of every pattern, in pattern order."""
+    text = _HORIZONTAL_SPACE.sub(' ', text) if patterns.mode == 'safe' else text
+    return [_to_match(name, found) for name in patterns.names
+            for found in get_pattern(name, patterns.mode).finditer(text)]
+
+
+def first_occurrences(matches):
+    """The old row dedupe: the first match of each (date, amount, description)."""
+    seen = set()
+    kept = []
+    for match in matches:
+        key = (match.date, match.amount, match.description)
+        if key not in seen:
+            seen.add(key)
+            kept.append(match)
+    return kept
+
+
+def unclaimed(matches):
+    """Matches in order, skipping any that overlaps one kept before it."""
+    kept = []
+    for match in matches:
+        if all(match.end <= other.start or match.start >= other.end for other in kept):
+            kept.append(match)
+    return kept
+
+
+@pytest.mark.parametrize('text', [KOTAK_PAGE, WALLET_PAGE] + MULTI_LINE_PAGES)
+def test_span_claims_match_old_dedupe(text):
+    assert STATEMENT_PATTERNS.findall(text) == first_occurrences(every_match(STATEMENT_PATTERNS, text))
+
+
+def test_span_claims_drop_rows_matched_twice():
+    old = every_match(KOTAK_TEXT_PATTERNS, KOTAK_PAGE)
+    new = KOTAK_TEXT_PATTERNS.findall(KOTAK_PAGE)
+    # kotak_upi used to add a stub row for each line kotak_drcr had already matched
+    assert [match.description for match in first_occurrences(old)][3:] == ['UPI', 'NEFT', 'POS']
+    assert new == unclaimed(old)
+    assert len(new) == 3
+
+
+def test_identical_rows_on_a_page_are_kept():
+    text = KOTAK_PAGE + KOTAK_PAGE.splitlines()[1] + '\n'
+    matches = STATEMENT_PATTERNS.findall(text)
+    # The old dedupe took the repeated line for a duplicate of the first
+    assert len(first_occurrences(matches)) == 3
+    assert len(matches) == 4
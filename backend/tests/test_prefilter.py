@@ -0,0 +1,28 @@
+from parsers.kotak_parser import extract_transactions_from_text
+from parsers.pdf_engine import ExtractionReport
+from parsers.prefilter import KOTAK_LINE_PREFILTER, WALLET_LINE_PREFILTER, prefilter_stats
+
+ROW = '02-11-2024 UPI/123456789012/swiggy@axis/Swiggy REF1234 250.00(Dr) 9,750.00'
+
+
+def test_date_only_line_does_not_take_the_next_line():
+    text = f"01-11-2024\n{ROW}\n"
+    assert KOTAK_LINE_PREFILTER.filter(text) == [ROW]
+    rows = extract_transactions_from_text(1, text)
+    assert rows.raw_dates == ['02-11-2024']
+    assert rows.descriptions == ['UPI/123456789012/swiggy@axis/Swiggy REF1234']
+
+
+def test_candidate_lines():
+    text = f"Date Narration Balance\n  {ROW}\nOpening balance 10,000.00\n{ROW}"
+    assert KOTAK_LINE_PREFILTER.filter(text) == [f"  {ROW}", ROW]
+    assert WALLET_LINE_PREFILTER.filter("Statement\nPaid to Swiggy on Nov 08, 2024 DEBIT Rs 649.00\n") == [
+        'Paid to Swiggy on Nov 08, 2024 DEBIT Rs 649.00']
+
+
+def test_report_carries_the_prefilter_stats():
+    report = ExtractionReport('pymupdf')
+    KOTAK_LINE_PREFILTER.filter('01-02-2024 ROW\nfooter')
+    stats = report.as_dict()['prefilter']
+    assert stats == prefilter_stats()
+    assert stats['kotak_line']['lines'] >= 2
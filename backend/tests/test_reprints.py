@@ -0,0 +1,61 @@
+import io
+import math
+from datetime import date
+
+import fitz  # PyMuPDF
+import numpy as np
+
+from parsers.batch import ReprintFilter, TransactionBuilder
+from statement_parser import StatementParser
+
+
+def page_batch(rows):
+    builder = TransactionBuilder()
+    for description, amount, balance in rows:
+        builder.append('06-11-2024', amount, description, 'food', balance=balance)
+    return builder.build([date(2024, 11, 6)] * len(rows))
+
+
+def pdf_source(pages):
+    doc = fitz.open()
+    for lines in pages:
+        page = doc.new_page()
+        for number, line in enumerate(lines):
+            page.insert_text((40, 60 + 16 * number), line, fontsize=9)
+    source = io.BytesIO(doc.tobytes())
+    source.name = 'statement.pdf'
+    return source
+
+
+def test_identical_rows_without_balance_are_kept():
+    reprints = ReprintFilter()
+    tea = ('Chai point', -20.0, None)
+    assert len(reprints.drop(page_batch([tea, tea]))) == 2
+    assert len(reprints.drop(page_batch([tea]))) == 1
+
+
+def test_rows_reprinted_with_their_balance_are_dropped():
+    reprints = ReprintFilter()
+    first = page_batch([('Chai point', -20.0, 980.0), ('Chai point', -20.0, 960.0)])
+    second = page_batch([('Chai point', -20.0, 960.0), ('Chai point', -20.0, 940.0)])
+    assert len(reprints.drop(first)) == 2
+    kept = reprints.drop(second)
+    assert kept.balances.tolist() == [940.0]
+
+
+def test_pages_of_one_batch():
+    batch = page_batch([('Chai point', -20.0, 980.0), ('Chai point', -20.0, math.nan),
+                        ('Chai point', -20.0, 980.0), ('Chai point', -20.0, math.nan)])
+    kept = ReprintFilter().drop(batch, np.array([0, 0, 1, 1]))
+    assert len(kept) == 3
+    assert np.isnan(kept.balances).sum() == 2
+
+
+def test_same_transaction_on_adjacent_pages():
+    header = 'Date Description Debit Credit'
+    tea = 'Nov 06, 2024 Chai point DEBIT Rs 20.00'
+    parser = StatementParser(pdf_source([[header, 'Nov 05, 2024 Swiggy order DEBIT Rs 250.00', tea],
+                                         [header, tea]]))
+    batch = parser.parse_batch()
+    assert batch.descriptions.tolist().count('Chai point') == 2
+    assert batch.amounts.sum() == -290.0
@@ -0,0 +1,60 @@
+import itertools
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from parsers.kotak_parser import _KOTAK_POST_RULES
+from parsers.rules import Rule, RuleEngine, description_contains
+
+AMOUNTS = [0.0, -199.0, 203.5, -296.0, 404.01, 995.0, 1004.0, 9999.0, 10000.0, 10000.5, 25000.0, -25000.0, np.nan]
+DAYS = [1, 7, 8, 15, 24, 25, 31, None]
+DESCRIPTIONS = ['Netflix MONTHLY plan', 'annual renewal', 'Subscription', 'NEFT ACME PAYROLL', 'chai', '', None]
+CATEGORIES = ['entertainment', 'salary', 'income', 'food', 'miscellaneous expenses', 'salary credit']
+
+
+def old_post_process_category(row):
+    """KotakParser._post_process_category before the rules engine, applied row by row."""
+    description = row['description'].lower() if isinstance(row['description'], str) else ''
+    amount = row['amount']
+    category = row['category']
+
+    if any(abs(abs(amount) - bill) < 5 for bill in [199, 299, 399, 499, 999]):
+        if 'entertainment' not in category:
+            if any(x in description for x in ['subscription', 'monthly', 'renewal']):
+                return 'entertainment'
+
+    if amount > 10000 and amount > 0:
+        day = row['date'].day
+        if day >= 25 or day <= 7:
+            if 'salary' not in category:
+                return 'income'
+
+    return category
+
+
+def transactions():
+    rows = [(datetime(2024, 3, day) if day else None, amount, description, category)
+            for amount, day, description, category in itertools.product(AMOUNTS, DAYS, DESCRIPTIONS, CATEGORIES)]
+    frame = pd.DataFrame(rows, columns=['date', 'amount', 'description', 'category'])
+    frame['date'] = pd.to_datetime(frame['date'])
+    return frame
+
+
+def test_kotak_rules_match_row_wise_post_processing():
+    frame = transactions()
+    expected = frame.apply(old_post_process_category, axis=1)
+    result = _KOTAK_POST_RULES.apply(frame)
+    assert result.tolist() == expected.tolist()
+    # Both rules fire somewhere in the grid, and most rows keep their category
+    assert {'entertainment', 'income'} <= set(result[result != frame['category']])
+
+
+def test_first_rule_wins_and_index_is_kept():
+    frame = pd.DataFrame({'description': ['swiggy order', 'uber swiggy', 'rent'], 'category': ['a', 'b', 'c']},
+                         index=[10, 20, 30])
+    engine = RuleEngine([Rule('food', description_contains(('swiggy',))),
+                         Rule('transport', description_contains(('uber',)))])
+    result = engine.apply(frame)
+    assert result.tolist() == ['food', 'food', 'c']
+    assert result.index.tolist() == [10, 20, 30]
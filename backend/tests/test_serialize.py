@@ -0,0 +1,75 @@
+import json
+import math
+from datetime import datetime
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+
+from parsers import serialize
+from parsers.batch import TransactionBatch, TransactionBuilder
+from parsers.serialize import ISO_DATETIME, dumps, record_fragments, records_json
+from statement_parser import analysis_json
+
+ROWS = [
+    ('06 Nov 2024', -450.5, 'UPI/412345678901/swiggy@axis/Swiggy', 'food', 10000.0),
+    ('06 Nov 2024', 0.1 + 0.2, 'Café "Mocha" – ₹ refund', 'food', math.nan),
+    ('07 Nov 2024', -1e-7, 'line\nbreak\tand \\ backslash', 'other', math.inf),
+    ('08 Nov 2024', 125000.0, 'NEFT-HDFC0001234-ACME CORP SALARY', 'salary', 135000.25),
+    ('09 Nov 2024', -20.0, '\u2028 unicode separator', 'other', None),
+]
+
+
+@pytest.fixture(params=['orjson', 'json'])
+def encoder(request, monkeypatch):
+    if request.param == 'json':
+        monkeypatch.setattr(serialize, 'orjson', None)
+    elif serialize.orjson is None:
+        pytest.skip('orjson is not installed')
+    return request.param
+
+
+def make_batch():
+    builder = TransactionBuilder()
+    for raw_date, amount, description, category, balance in ROWS:
+        builder.append(raw_date, amount, description, category, balance=balance)
+    return builder.build([datetime.strptime(row[0], '%d %b %Y') for row in ROWS])
+
+
+def old_response(batch):
+    """The /analyze body as the endpoint built it: frame records, Python totals, FastAPI's encoder."""
+    transactions = batch.to_frame().to_dict('records')
+    breakdown = {}
+    for t in transactions:
+        if t['amount'] < 0:
+            breakdown[t['category']] = breakdown.get(t['category'], 0) + t['amount']
+    return jsonable_encoder({
+        'transactions': transactions,
+        'totalSpent': sum(t['amount'] for t in transactions if t['amount'] < 0),
+        'totalReceived': sum(t['amount'] for t in transactions if t['amount'] > 0),
+        'categoryBreakdown': breakdown,
+        'parseReport': None
+    })
+
+
+def test_analysis_matches_old_response(encoder):
+    batch = make_batch()
+    assert json.loads(analysis_json(batch)) == old_response(batch)
+
+
+def test_fragments_match_generic_encoder(encoder):
+    batch = make_batch()
+    columns = ('date', 'amount', 'description', 'category', 'balance', 'type')
+    records = batch.to_records(columns, date_format=ISO_DATETIME)
+    for record in records:
+        record['balance'] = record['balance'] if math.isfinite(record['balance']) else None
+    fragments = record_fragments(batch, columns)
+    assert [json.loads(fragment) for fragment in fragments] == records
+    # Keys in column order, as json.dumps writes them
+    assert fragments == [json.dumps(record, ensure_ascii=False, separators=(',', ':')) for record in records]
+
+
+def test_records_splice_into_responses(encoder):
+    batch = make_batch()
+    body = json.loads(dumps({'page': 2, 'rows': records_json(batch, ('description',)),
+                             'empty': records_json(TransactionBatch.empty())}))
+    assert body == {'page': 2, 'rows': [{'description': row[2]} for row in ROWS], 'empty': []}
@@ -0,0 +1,75 @@
+import random
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import pytest
+
+from benchmarks.sample import NARRATIONS
+from parsers.batch import TransactionBatch, TransactionBuilder
+from parsers.summary import CHART_COLORS, StatementSummary, summarize
+
+CATEGORIES = ['food', 'transport', 'transfer', 'shopping', 'other', 'salary']
+
+
+def make_batch(rows=600, seed=3):
+    rng = random.Random(seed)
+    builder = TransactionBuilder()
+    for _ in range(rows):
+        amount = rng.choice([0.0, round(rng.uniform(-20000, 20000), 2), round(rng.uniform(-50, 50), 2)])
+        builder.append('', amount, rng.choice(NARRATIONS), rng.choice(CATEGORIES))
+    start = datetime(2024, 1, 1)
+    return builder.build([start + timedelta(days=rng.randrange(90)) for _ in range(rows)])
+
+
+def old_totals(records):
+    """The /analyze figures as the endpoint computed them from transaction dicts."""
+    total_spent = sum(t['amount'] for t in records if t['amount'] < 0)
+    total_received = sum(t['amount'] for t in records if t['amount'] > 0)
+    category_breakdown = {}
+    for t in records:
+        if t['amount'] < 0:
+            category_breakdown[t['category']] = category_breakdown.get(t['category'], 0) + t['amount']
+    return total_spent, total_received, category_breakdown
+
+
+def old_chart_data(records):
+    """build_chart_data as the Kotak parser computed it from transaction dicts."""
+    category_totals = defaultdict(float)
+    for txn in records:
+        category_totals[txn['category']] += abs(txn['amount'])
+    labels = list(category_totals.keys())
+    return {'data': {'labels': labels, 'datasets': [{'data': [category_totals[label] for label in labels],
+                                                     'backgroundColor': CHART_COLORS[:len(labels)]}]}}
+
+
+@pytest.mark.parametrize('pages', [1, 7])
+def test_summary_matches_per_row_loops(pages):
+    batch = make_batch()
+    records = batch.to_records()
+    summary = StatementSummary()
+    # Folded page by page, as streamed responses do
+    size = -(-len(batch) // pages)
+    for start in range(0, len(batch), size):
+        summary.update(batch.take(slice(start, start + size)))
+
+    total_spent, total_received, category_breakdown = old_totals(records)
+    # The same floats, not just close ones: sums run in row order
+    assert summary.total_spent == total_spent
+    assert summary.total_received == total_received
+    assert summary.spending_by_category() == category_breakdown
+    assert list(summary.spending_by_category()) == list(category_breakdown)
+    assert summary.chart_data() == old_chart_data(records)
+    assert len(summary) == len(records)
+    assert summary.credit_count == sum(t['amount'] > 0 for t in records)
+    assert summary.debit_count == sum(t['amount'] < 0 for t in records)
+
+
+def test_summary_of_records_matches_batch():
+    batch = make_batch(seed=5)
+    assert StatementSummary.of_records(batch.to_records()).chart_data() == summarize(batch).chart_data()
+
+
+def test_empty_summary():
+    summary = summarize(TransactionBatch.empty())
+    assert (summary.total_spent, summary.total_received, summary.spending_by_category()) == (0.0, 0.0, {})
+    assert old_totals([]) == (0, 0, {})
@@ -0,0 +1,49 @@
+import mmap
+import pickle
+import tempfile
+from multiprocessing import shared_memory
+
+import pytest
+
+from benchmarks.sample import make_statement
+from parsers.uploads import SharedUpload, release_buffer, upload_buffer
+from statement_parser import parse_upload
+
+
+@pytest.fixture(scope='module')
+def content():
+    return make_statement(3, 1)
+
+
+def spilled(content):
+    spooled = tempfile.SpooledTemporaryFile(max_size=1024)
+    spooled.write(content)
+    return spooled
+
+
+def test_shared_upload_pickles_as_a_handle(content):
+    with spilled(content) as spooled:
+        buffer = upload_buffer(spooled)
+        assert isinstance(buffer, mmap.mmap)
+        shared = SharedUpload(buffer)
+        release_buffer(buffer)
+    try:
+        handle = pickle.dumps(shared)
+        assert len(handle) < 200
+        with pickle.loads(handle).open() as view:
+            assert view == content
+    finally:
+        shared.release()
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=shared.name)
+
+
+def test_shared_upload_parses_like_bytes(content):
+    shared = SharedUpload(content)
+    try:
+        batch, _ = parse_upload(pickle.loads(pickle.dumps(shared)), workers=1)
+    finally:
+        shared.release()
+    expected, _ = parse_upload(content, workers=1)
+    assert len(batch) == len(expected) > 0
+    assert batch.to_records() == expected.to_records()
@@ -7,4 +7,7 @@ python -m pip install --upgrade pip
 pip install -r backend/requirements.txt
 
 # Create necessary directories
-mkdir -p backend/__pycache__ 
\ No newline at end of file
+mkdir -p backend/__pycache__
+
+# Compile the category taxonomy index shared by the workers
+(cd backend && python -m parsers.taxonomy) 
\ No newline at end of file
@@ -1,27 +1,51 @@
 import pandas as pd
 import plotly.express as px
-import pdfplumber
 from pathlib import Path
 import io
 import re
 from pdfminer.layout import LAParams
-import PyPDF2
-import fitz  #  PyMuPDF
 import traceback  # Import traceback for detailed error logging
 import logging  # Import logging for error handling
 import plotly.graph_objects as go
 from datetime import datetime
 import json
 import sys
+import argparse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+from parsers.batch import TransactionBatch, TransactionBuilder
+from parsers.categorizer import Categorizer
+from parsers.dates import WALLET_DATE_FORMATS, DateParser, date_from_text
+from parsers.document import PasswordError, StatementDocument
+from parsers.pdf_engine import ExtractionReport, resolve_engine
+from parsers.patterns import WALLET_LINE_PATTERNS, MatchBudget, MatchBudgetExceeded
+from parsers.prefilter import WALLET_LINE_PREFILTER
+from parsers.serialize import dumps, records_json
+from parsers.summary import summarize
+from parsers.parallel import parse_pages, resolve_workers
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Wallet categories from the shared taxonomy index; the first category with a keyword in the description wins
+_CATEGORIZER = Categorizer('wallet')
+
 class StatementParser:
-    def __init__(self, file_path):
+    def __init__(self, file_path, engine=None, workers=None, password=None):
         self.file_path = file_path
         self.filename = Path(file_path).name
+        self.engine = resolve_engine(engine)
+        self.workers = resolve_workers(workers)
+        self.password = password
+        self.report = None
+        self.page_count = 0
+
+    def __getstate__(self):
+        # Page workers reopen the PDF themselves; keep the password out of every shard
+        state = self.__dict__.copy()
+        state['password'] = None
+        return state
 
     def parse(self):
         """Parse the uploaded file into a standardized DataFrame"""
@@ -30,172 +54,120 @@ class StatementParser:
         else:
             raise ValueError("Unsupported file format")
 
-    def _parse_pdf(self):
-        """Handle PDF parsing with extra security checks"""
-        debug_info = []
-        
+    def parse_batch(self):
+        """Parse the uploaded file into a TransactionBatch, newest first; empty when nothing could be extracted"""
+        if not self.filename.endswith('.pdf'):
+            raise ValueError("Unsupported file format")
         try:
-            # First try to validate if it's a valid PDF
+            # First try to validate if it's a valid PDF; the same handle is used for parsing
             try:
-                pdf_reader = PyPDF2.PdfReader(self.file_path)
-                num_pages = len(pdf_reader.pages)
+                # Encrypted statements are decrypted in memory, no unlocked copy is written
+                document = StatementDocument(self.file_path, password=self.password)
+                num_pages = document.page_count
+                self.page_count = num_pages
                 logger.info(f"PDF has {num_pages} pages")
+            except PasswordError:
+                raise
             except Exception as e:
                 logger.error(f"PDF validation error: {str(e)}")
-                return pd.DataFrame({
-                    'date': [pd.Timestamp.now()], 
-                    'amount': [0.0],
-                    'category': ['Others']
-                })
+                return TransactionBatch.empty()
 
-            # Process in chunks of 10 pages to avoid memory issues
-            all_transactions = []
+            page_rows = []
             parsing_errors = []
-            chunk_size = 10
-            
-            with pdfplumber.open(self.file_path) as pdf:
-                total_pages = len(pdf.pages)
-                
-                if total_pages == 0:
-                    logger.error("The PDF file appears to be empty.")
-                    return pd.DataFrame({
-                        'date': [pd.Timestamp.now()], 
-                        'amount': [0.0],
-                        'category': ['Others']
-                    })
 
-                logger.info(f"Processing PDF with {total_pages} pages")
-                
-                # Process pages in chunks
-                for start_page in range(0, total_pages, chunk_size):
-                    end_page = min(start_page + chunk_size, total_pages)
-                    logger.info(f"Processing pages {start_page + 1} to {end_page}")
-                    
-                    chunk_text = ""
-                    chunk_transactions = []
-                    
-                    # Extract text from current chunk of pages
-                    for page_num in range(start_page, end_page):
-                        try:
-                            page = pdf.pages[page_num]
-                            text = page.extract_text()
-                            
-                            if not text:
-                                logger.info(f"No text on page {page_num + 1}, trying PyMuPDF")
-                                text = self._extract_text_with_pymupdf(self.file_path, page_num + 1)
-                            
-                            if text:
-                                chunk_text += text + "\n"
-                            else:
-                                parsing_errors.append(f"Page {page_num + 1}: No text could be extracted")
-                                continue
-                                
-                        except Exception as e:
-                            logger.error(f"Error on page {page_num + 1}: {str(e)}")
-                            parsing_errors.append(f"Page {page_num + 1}: {str(e)}")
-                            continue
-                    
-                    # Process the chunk text
-                    if chunk_text:
-                        lines = chunk_text.split('\n')
-                        logger.info(f"Processing {len(lines)} lines from pages {start_page + 1}-{end_page}")
-                        
-                        for line_num, line in enumerate(lines, 1):
-                            line = line.strip()
-                            if not line:
-                                continue
-                            
-                            # Skip header lines
-                            if any(header in line.lower() for header in ['statement', 'page', 'date', 'time', 'transaction id']):
-                                continue
-                            
-                            try:
-                                # Try to extract transaction details
-                                transaction = self._extract_transaction_from_line(line)
-                                if transaction:
-                                    chunk_transactions.append(transaction)
-                            except Exception as e:
-                                logger.error(f"Error processing line {line_num}: {str(e)}")
-                                continue
-                    
-                    # Add chunk transactions to main list
-                    all_transactions.extend(chunk_transactions)
-                    logger.info(f"Added {len(chunk_transactions)} transactions from chunk")
-                    
-                    # Clear chunk data to free memory
-                    chunk_text = ""
-                    chunk_transactions = []
+            if num_pages == 0:
+                document.close()
+                logger.error("The PDF file appears to be empty.")
+                return TransactionBatch.empty()
+
+            logger.info(f"Processing PDF with {num_pages} pages")
+
+            # Extract and match page ranges, in parallel when workers > 1
+            self.report = ExtractionReport(self.engine)
+            with document:
+                for page_transactions, page_errors in parse_pages(document, self._extract_page_transactions,
+                                                                  engine=self.engine, workers=self.workers,
+                                                                  report=self.report):
+                    page_rows.append(page_transactions)
+                    parsing_errors.extend(page_errors)
+            self.report.log_summary()
+            batch = self._convert_dates(TransactionBuilder.concat(page_rows), parsing_errors)
 
-                if not all_transactions:
-                    if parsing_errors:
-                        error_msg = "\n".join(parsing_errors)
-                        logger.error(f"Could not extract transactions. Errors encountered:\n{error_msg}")
-                    else:
-                        logger.error("No valid transactions found in the PDF.")
-                    return pd.DataFrame({
-                        'date': [pd.Timestamp.now()], 
-                        'amount': [0.0],
-                        'category': ['Others']
-                    })
+            if not len(batch):
+                if parsing_errors:
+                    error_msg = "\n".join(parsing_errors)
+                    logger.error(f"Could not extract transactions. Errors encountered:\n{error_msg}")
+                else:
+                    logger.error("No valid transactions found in the PDF.")
+                return batch
 
-                # Create DataFrame and sort by date
-                df = pd.DataFrame(all_transactions)
-                df = df.sort_values('date', ascending=False)
-                
-                # Log summary
-                logger.info(f"Successfully extracted {len(df)} transactions")
-                logger.info(f"Total credits: {df[df['amount'] > 0]['amount'].sum():.2f}")
-                logger.info(f"Total debits: {df[df['amount'] < 0]['amount'].sum():.2f}")
-                
-                return df
+            batch = batch.sort_by_date(descending=True)
 
+            # Log summary
+            logger.info(f"Successfully extracted {len(batch)} transactions")
+            logger.info(f"Total credits: {batch.amounts[batch.amounts > 0].sum():.2f}")
+            logger.info(f"Total debits: {batch.amounts[batch.amounts < 0].sum():.2f}")
+
+            return batch
+
+        except PasswordError:
+            raise
         except Exception as e:
             error_msg = f"Error processing PDF: {str(e)}"
             logger.error(error_msg)
+            return TransactionBatch.empty()
+
+    def _parse_pdf(self):
+        """Handle PDF parsing with extra security checks"""
+        batch = self.parse_batch()
+        if not len(batch):
             return pd.DataFrame({
                 'date': [pd.Timestamp.now()], 
                 'amount': [0.0],
                 'category': ['Others']
             })
+        return batch.to_frame(('date', 'amount', 'description', 'category', 'type'), type_labels=('CREDIT', 'DEBIT'))
 
-    def _extract_transaction_from_line(self, line):
+    def _extract_page_transactions(self, page_number, text):
+        """Extract transactions from the text of one page, returning (transactions, errors)"""
+        transactions = TransactionBuilder()
+        if not text:
+            return transactions, [f"Page {page_number}: No text could be extracted"]
+
+        budget = MatchBudget()
+        # Only lines carrying a date can match the wallet patterns; find them in one pass over the page
+        for line in WALLET_LINE_PREFILTER.filter(text):
+            line = line.strip()
+            
+            # Skip header lines
+            if any(header in line.lower() for header in ['statement', 'page', 'date', 'time', 'transaction id']):
+                continue
+            
+            try:
+                # Try to extract transaction details
+                transaction = self._extract_transaction_from_line(line, budget)
+                if transaction:
+                    transactions.append(*transaction)
+            except MatchBudgetExceeded as e:
+                logger.warning(f"Skipping page {page_number}: {e}")
+                return TransactionBuilder(), [f"Page {page_number}: skipped, {e}"]
+            except Exception as e:
+                logger.error(f"Error processing line '{line}' on page {page_number}: {str(e)}")
+                continue
+
+        return transactions, []
+
+    def _extract_transaction_from_line(self, line, budget=None):
         """Extract transaction details from a single line of text"""
-        # Pattern 1: Date at start, amount at end
-        pattern1 = r'((?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s+\d{1,2},?\s+\d{4}).*?((?:CREDIT|DEBIT|Paid|Received)).*?(?:₹|Rs|INR)\s*(\d+(?:,\d+)*(?:\.\d{2})?)'
-        
-        # Pattern 2: Date with time
-        pattern2 = r'((?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s+\d{1,2},?\s+\d{4})\s+(\d{1,2}:\d{2}\s*(?:AM|PM)?)\s*(.*?)(?:₹|Rs|INR)\s*(\d+(?:,\d+)*(?:\.\d{2})?)'
-        
-        # Pattern 3: Simplified date and amount
-        pattern3 = r'(\d{1,2}/\d{1,2}/\d{4}).*?(?:₹|Rs|INR)\s*(\d+(?:,\d+)*(?:\.\d{2})?)'
-        
-        match = None
-        amount_str = None
-        date_str = None
-        description = None
-        txn_type = None
-        
-        # Try each pattern
-        if re.search(pattern1, line, re.IGNORECASE):
-            match = re.search(pattern1, line, re.IGNORECASE)
-            date_str = match.group(1)
-            txn_type = match.group(2)
-            amount_str = match.group(3)
-            description = line
-        elif re.search(pattern2, line, re.IGNORECASE):
-            match = re.search(pattern2, line, re.IGNORECASE)
-            date_str = match.group(1)
-            description = match.group(3)
-            amount_str = match.group(4)
-            txn_type = 'CREDIT' if 'credit' in line.lower() else 'DEBIT'
-        elif re.search(pattern3, line, re.IGNORECASE):
-            match = re.search(pattern3, line, re.IGNORECASE)
-            date_str = match.group(1)
-            amount_str = match.group(2)
-            description = line
-            txn_type = 'CREDIT' if 'credit' in line.lower() else 'DEBIT'
-        
+        # Registered wallet patterns, first match wins; each is searched once
+        match = WALLET_LINE_PATTERNS.match(line, budget)
+        amount_str = match.amount if match else None
+
         if match and amount_str:
+            date_str = match.date
+            # Patterns without a description group describe the transaction by the whole line
+            description = match.description if match.description is not None else line
+            
             # Clean amount string
             amount = float(amount_str.replace(',', ''))
             
@@ -204,135 +176,89 @@ class StatementParser:
             if is_debit:
                 amount = -amount
             
-            # Parse date
-            if '/' in date_str:
-                date = pd.to_datetime(date_str, format='%d/%m/%Y')
-            else:
-                date = pd.to_datetime(date_str)
+            # The raw date is converted with the rest of the document's, see _convert_dates
+            date = date_str
             
-            return {
-                'date': date,
-                'amount': amount,
-                'description': description.strip() if description else 'Transaction',
-                'category': self._categorize_transaction(description if description else ''),
-                'type': 'DEBIT' if is_debit else 'CREDIT'
-            }
+            # TransactionBuilder.append arguments: date, amount, description, category, balance, debit
+            return (
+                date,
+                amount,
+                description.strip() if description else 'Transaction',
+                self._categorize_transaction(description if description else ''),
+                None,
+                is_debit
+            )
         
         return None
 
-    def _extract_text_with_pymupdf(self, pdf_path, page_num):
-        """Extract text from a specific page using PyMuPDF"""
-        try:
-            doc = fitz.open(pdf_path)
-            page = doc[page_num - 1]
-            text = page.get_text()
-            doc.close()
-            return text
-        except Exception as e:
-            logger.error(f"PyMuPDF extraction error: {str(e)}")
-            return ""
+    def _convert_dates(self, transactions, errors):
+        """Build the batch of a TransactionBuilder with one inferred date format per document; rows whose date does not parse are dropped"""
+        dates = DateParser(WALLET_DATE_FORMATS, fallback=date_from_text).parse_many(transactions.raw_dates)
+        for raw_date, description, date in zip(transactions.raw_dates, transactions.descriptions, dates):
+            if date is None:
+                errors.append(f"Unparseable date '{raw_date}' in: {description}")
+        return transactions.build(dates)
 
     def _categorize_transaction(self, description):
         """Categorize transaction based on description"""
-        description = description.lower()
-        
-        categories = {
-            'Food & Dining': ['food', 'restaurant', 'cafe', 'coffee', 'swiggy', 'zomato', 'hotel'],
-            'Shopping': ['amazon', 'flipkart', 'myntra', 'shop', 'store', 'retail'],
-            'Transportation': ['uber', 'ola', 'metro', 'bus', 'train', 'flight', 'airline'],
-            'Entertainment': ['movie', 'theatre', 'netflix', 'prime', 'hotstar'],
-            'Bills & Utilities': ['electricity', 'water', 'gas', 'internet', 'mobile', 'phone'],
-            'Health & Medical': ['hospital', 'clinic', 'pharmacy', 'medical', 'doctor'],
-            'Education': ['school', 'college', 'university', 'course', 'training'],
-            'Travel': ['hotel', 'booking', 'trip', 'travel', 'tour'],
-            'Personal Care': ['salon', 'spa', 'beauty', 'gym', 'fitness'],
-            'Investments': ['investment', 'mutual fund', 'stock', 'share', 'equity'],
-            'Insurance': ['insurance', 'policy', 'premium'],
-            'Rent': ['rent', 'lease', 'property'],
-            'Salary': ['salary', 'income', 'payment received'],
-            'Others': []
-        }
-        
-        for category, keywords in categories.items():
-            if any(keyword in description for keyword in keywords):
-                return category
-        
-        return 'Others'
+        return _CATEGORIZER.categorize(description)
 
 def main():
-    if len(sys.argv) != 2:
+    arg_parser = argparse.ArgumentParser(description='Parse bank statements')
+    arg_parser.add_argument('file_path', nargs='?', help='Path to the PDF statement file')
+    arg_parser.add_argument('--engine', default=None,
+                            help='Text extraction engine: auto, pymupdf or pdfplumber')
+    arg_parser.add_argument('--workers', type=int, default=None,
+                            help='Worker processes for page-parallel parsing (0 = all CPUs)')
+    arg_parser.add_argument('--password', default=None,
+                            help='Password of an encrypted statement (decrypted in memory)')
+    args = arg_parser.parse_args()
+
+    if not args.file_path:
         print(json.dumps({"error": "Please provide a PDF file path"}))
         sys.exit(1)
 
-    file_path = sys.argv[1]
+    file_path = args.file_path
     try:
-        parser = StatementParser(file_path)
-        df = parser.parse()
+        parser = StatementParser(file_path, engine=args.engine, workers=args.workers, password=args.password)
+        batch = parser.parse_batch()
         
-        if df.empty or len(df) == 1 and df.iloc[0]['amount'] == 0:
+        if not len(batch):
             print(json.dumps({"error": "No valid transactions found in the PDF"}))
             sys.exit(1)
         
         logger.info("Calculating summary statistics...")
-        # Calculate summary statistics
-        total_received = df[df['amount'] > 0]['amount'].sum()
-        total_spent = df[df['amount'] < 0]['amount'].sum()
-        credit_count = len(df[df['amount'] > 0])
-        debit_count = len(df[df['amount'] < 0])
+        # Totals, counts, category breakdown and chart series in one aggregation
+        summary = summarize(batch)
+        total_received = summary.total_received
+        total_spent = summary.total_spent
+        # Net amount per category, as a percentage of the money spent
+        category_breakdown = summary.category_breakdown('amount', percent_of=total_spent)
+        chart_data = summary.chart_data('amount')
         logger.info("Summary statistics calculated.")
-        
-        logger.info("Calculating category breakdown...")
-        # Calculate category breakdown
-        category_breakdown = {}
-        for category in df['category'].unique():
-            logger.info(f"Processing category: {category}")
-            category_amount = df[df['category'] == category]['amount'].sum()
-            category_count = len(df[df['category'] == category])
-            category_breakdown[category] = {
-                'amount': category_amount,
-                'percentage': (abs(category_amount) / abs(total_spent)) * 100 if total_spent != 0 else 0,
-                'count': category_count
-            }
-        logger.info("Category breakdown calculated.")
-
-        logger.info("Preparing chart data...")
-        # Prepare chart data
-        chart_data = {
-            'data': {
-                'labels': list(category_breakdown.keys()),
-                'datasets': [{
-                    'data': [abs(cat['amount']) for cat in category_breakdown.values()],
-                    'backgroundColor': [
-                        '#FF6384', '#36A2EB', '#FFCE56', '#4BC0C0', '#9966FF',
-                        '#FF9F40', '#FF6384', '#36A2EB', '#FFCE56', '#4BC0C0'
-                    ]
-                }]
-            }
-        }
-        logger.info("Chart data prepared.")
 
         logger.info("Preparing final response...")
-        # Convert Timestamp objects to ISO format strings
-        df['date'] = df['date'].dt.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
-        # Prepare response
+        # Prepare response; transactions are encoded from the batch columns, dates as ISO strings
         response = {
-            'transactions': df.to_dict('records'),
+            'transactions': records_json(batch, ('date', 'amount', 'description', 'category', 'type'),
+                                         date_format='%Y-%m-%dT%H:%M:%S.%fZ', type_labels=('CREDIT', 'DEBIT')),
             'summary': {
                 'totalReceived': total_received,
                 'totalSpent': total_spent,
                 'balance': total_received + total_spent,
-                'creditCount': credit_count,
-                'debitCount': debit_count,
-                'totalTransactions': len(df)
+                'creditCount': summary.credit_count,
+                'debitCount': summary.debit_count,
+                'totalTransactions': len(batch)
             },
             'categoryBreakdown': category_breakdown,
             'chartData': chart_data,
-            'pageCount': len(PyPDF2.PdfReader(file_path).pages)
+            'pageCount': parser.page_count,
+            'parseReport': parser.report.as_dict() if parser.report else None
         }
         logger.info("Final response prepared.")
 
         logger.info("Printing JSON response...")
-        print(json.dumps(response))
+        print(dumps(response))
         logger.info("JSON response printed.")
         
     except Exception as e: